@@ -0,0 +1,374 @@
+"""Response assertions, compiled once and evaluated where the response lands.
+
+Definitions are a JSON list (stored in SavedRequest.assertions and
+Template.assertions)::
+
+    [{"type": "status", "equals": 200},
+     {"type": "status", "in": [200, 201]},
+     {"type": "header", "name": "Content-Type", "contains": "json"},
+     {"type": "jsonpath", "path": "$.items[0].id", "equals": 7},
+     {"type": "jsonpath", "path": "$.token", "exists": true},
+     {"type": "schema", "schema": {"type": "object", "required": ["id"]}},
+     {"type": "latency", "max_ms": 250},
+     {"type": "body", "matches": "\\"ok\\":\\\\s*true"}]
+
+``header`` and ``jsonpath`` take one comparison: ``equals``, ``contains``,
+``matches`` (regex search), ``exists``, ``lt`` or ``gt``. The body is only
+decoded (and parsed as JSON) if a check needs it, and at most once.
+
+Without a ``status`` check any status of 400 or above fails the request;
+with one, the checks alone decide (so a negative test can expect a 404).
+"""
+import json
+import re
+from functools import lru_cache
+from jsonpath import compile_path
+
+try:
+    import jsonschema  # optional: full JSON Schema support
+except ImportError:
+    jsonschema = None
+
+
+class AssertionDefinitionError(ValueError):
+    pass
+
+
+class BodyTooLarge(Exception):
+    """Raised instead of loading a body over the limit; the check needing it fails."""
+
+
+# Larger bodies are not loaded for body/JSON checks; those checks fail instead
+BODY_CHECK_LIMIT = 16 * 1024 * 1024
+
+_MISSING = object()
+
+
+class ResponseContext:
+    """What a check can look at; body text and JSON are decoded lazily.
+
+    Pass ``body_size`` when the body is not in memory yet (a spool file):
+    above ``body_limit`` bytes the loader is never called and checks that
+    need the body fail with a "too large" message.
+    """
+
+    def __init__(self, status_code, headers, elapsed, body_loader=None, encoding=None, body_size=None,
+                 body_limit=BODY_CHECK_LIMIT):
+        self.status_code = status_code
+        self.headers = headers or {}
+        self.elapsed = elapsed
+        self._body_loader = body_loader
+        self._body_size = body_size
+        self._body_limit = body_limit
+        self._encoding = encoding or 'utf-8'
+        self._text = None
+        self._json = _MISSING
+
+    @classmethod
+    def from_response(cls, resp, elapsed):
+        """Wrap a requests/httpx response whose body has already been read."""
+        return cls(resp.status_code, resp.headers, elapsed, lambda: resp.content, getattr(resp, 'encoding', None))
+
+    def header(self, name):
+        value = self.headers.get(name)
+        if value is None and isinstance(self.headers, dict):
+            lower = name.lower()
+            value = next((v for k, v in self.headers.items() if k.lower() == lower), None)
+        return value
+
+    @property
+    def text(self):
+        if self._text is None:
+            if self._body_size is not None and self._body_size > self._body_limit:
+                raise BodyTooLarge(f"body is {self._body_size} bytes, over the {self._body_limit} byte limit "
+                                 "for body checks")
+            raw = self._body_loader() if self._body_loader else b''
+            self._text = raw.decode(self._encoding, errors='replace') if isinstance(raw, bytes) else (raw or '')
+        return self._text
+
+    @property
+    def json(self):
+        """Decoded JSON body; raises ValueError if the body is not JSON."""
+        if self._json is _MISSING:
+            try:
+                self._json = json.loads(self.text)
+            except ValueError as e:
+                self._json = e
+        if isinstance(self._json, ValueError):
+            raise self._json
+        return self._json
+
+
+class _Comparison:
+    OPS = ('equals', 'contains', 'matches', 'exists', 'lt', 'gt')
+
+    def __init__(self, definition):
+        ops = [op for op in self.OPS if op in definition]
+        if len(ops) != 1:
+            raise AssertionDefinitionError(f"expected exactly one of {', '.join(self.OPS)} in {definition!r}")
+        self.op = ops[0]
+        self.expected = definition[self.op]
+        self._regex = re.compile(self.expected) if self.op == 'matches' else None
+
+    def __str__(self):
+        return f"{self.op} {json.dumps(self.expected)}"
+
+    def check(self, value):
+        """None if ``value`` passes, else a failure message (``_MISSING`` = absent)."""
+        if self.op == 'exists':
+            present = value is not _MISSING
+            return None if present == bool(self.expected) else ("missing" if self.expected else "present")
+        if value is _MISSING:
+            return "missing"
+        if self.op == 'equals':
+            ok = value == self.expected
+        elif self.op == 'contains':
+            ok = self.expected in value if isinstance(value, (str, list, dict)) else False
+        elif self.op == 'matches':
+            ok = self._regex.search(value if isinstance(value, str) else json.dumps(value)) is not None
+        else:
+            try:
+                ok = value < self.expected if self.op == 'lt' else value > self.expected
+            except TypeError:
+                ok = False
+        return None if ok else f"got {json.dumps(value, default=str)[:200]}"
+
+
+class StatusCheck:
+    def __init__(self, definition):
+        if 'in' in definition:
+            self.allowed = frozenset(int(c) for c in definition['in'])
+        elif 'equals' in definition:
+            self.allowed = frozenset([int(definition['equals'])])
+        else:
+            raise AssertionDefinitionError("status check needs 'equals' or 'in'")
+        self.description = f"status in {sorted(self.allowed)}" if len(self.allowed) > 1 else f"status {next(iter(self.allowed))}"
+
+    def check(self, ctx):
+        return None if ctx.status_code in self.allowed else f"got {ctx.status_code}"
+
+
+class HeaderCheck:
+    def __init__(self, definition):
+        if not definition.get('name'):
+            raise AssertionDefinitionError("header check needs 'name'")
+        self.name = definition['name']
+        self.comparison = _Comparison(definition)
+        self.description = f"header {self.name} {self.comparison}"
+
+    def check(self, ctx):
+        value = ctx.header(self.name)
+        return self.comparison.check(_MISSING if value is None else value)
+
+
+class JsonPathCheck:
+    def __init__(self, definition):
+        if not definition.get('path'):
+            raise AssertionDefinitionError("jsonpath check needs 'path'")
+        self.path = compile_path(definition['path'])
+        self.comparison = _Comparison(definition)
+        self.description = f"{definition['path']} {self.comparison}"
+
+    def check(self, ctx):
+        try:
+            found = self.path.find(ctx.json)
+        except ValueError:
+            return "body is not JSON"
+        return self.comparison.check(found[0] if found else _MISSING)
+
+
+class SchemaCheck:
+    def __init__(self, definition):
+        schema = definition.get('schema')
+        if not isinstance(schema, dict):
+            raise AssertionDefinitionError("schema check needs a 'schema' object")
+        self.description = "matches JSON schema"
+        if jsonschema is not None:
+            cls = jsonschema.validators.validator_for(schema)
+            try:
+                cls.check_schema(schema)
+            except jsonschema.SchemaError as e:
+                raise AssertionDefinitionError(f"invalid schema: {e.message}")
+            self._validator = cls(schema)
+        else:
+            self._validator = None
+            self.schema = schema
+
+    def check(self, ctx):
+        try:
+            data = ctx.json
+        except ValueError:
+            return "body is not JSON"
+        if self._validator is not None:
+            error = jsonschema.exceptions.best_match(self._validator.iter_errors(data))
+            if error is None:
+                return None
+            where = '$' + ''.join(f"[{p!r}]" if isinstance(p, str) else f"[{p}]" for p in error.absolute_path)
+            return f"{where}: {error.message}"
+        return _validate(self.schema, data, '$')
+
+
+class LatencyCheck:
+    def __init__(self, definition):
+        if 'max_ms' not in definition:
+            raise AssertionDefinitionError("latency check needs 'max_ms'")
+        self.max_ms = float(definition['max_ms'])
+        self.description = f"latency <= {self.max_ms:g} ms"
+
+    def check(self, ctx):
+        ms = ctx.elapsed * 1000
+        return None if ms <= self.max_ms else f"took {ms:.1f} ms"
+
+
+class BodyCheck:
+    def __init__(self, definition):
+        if 'matches' in definition:
+            self._regex = re.compile(definition['matches'])
+            self.description = f"body matches {definition['matches']!r}"
+        elif 'contains' in definition:
+            self._regex = re.compile(re.escape(definition['contains']))
+            self.description = f"body contains {definition['contains']!r}"
+        else:
+            raise AssertionDefinitionError("body check needs 'matches' or 'contains'")
+
+    def check(self, ctx):
+        return None if self._regex.search(ctx.text) else "no match"
+
+
+CHECK_TYPES = {
+    'status': StatusCheck,
+    'header': HeaderCheck,
+    'jsonpath': JsonPathCheck,
+    'schema': SchemaCheck,
+    'latency': LatencyCheck,
+    'body': BodyCheck,
+}
+
+
+class AssertionSet:
+    def __init__(self, checks):
+        self.checks = checks
+        self.checks_status = any(isinstance(c, StatusCheck) for c in checks)
+
+    def __len__(self):
+        return len(self.checks)
+
+    def evaluate(self, ctx):
+        """[(description, failure message or None)] for every check."""
+        out = []
+        for c in self.checks:
+            try:
+                out.append((c.description, c.check(ctx)))
+            except Exception as e:
+                out.append((c.description, f"{type(e).__name__}: {e}"))
+        return out
+
+    def failures(self, ctx):
+        return [f"{desc}: {msg}" for desc, msg in self.evaluate(ctx) if msg is not None]
+
+
+def status_ok(assertions, status_code):
+    """Whether ``status_code`` passes on its own: below 400 unless the assertions check the status."""
+    if assertions is not None and assertions.checks_status:
+        return True
+    return status_code < 400
+
+
+def _compile(definitions):
+    if not isinstance(definitions, list):
+        raise AssertionDefinitionError("assertions must be a JSON list")
+    checks = []
+    for d in definitions:
+        kind = d.get('type') if isinstance(d, dict) else None
+        if kind not in CHECK_TYPES:
+            raise AssertionDefinitionError(f"unknown assertion type {kind!r}")
+        try:
+            checks.append(CHECK_TYPES[kind](d))
+        except re.error as e:
+            raise AssertionDefinitionError(f"bad regex in {kind} assertion: {e}")
+    return AssertionSet(checks)
+
+
+@lru_cache(maxsize=512)
+def _compile_text(text):
+    try:
+        definitions = json.loads(text)
+    except ValueError as e:
+        raise AssertionDefinitionError(f"assertions are not valid JSON: {e}")
+    return _compile(definitions)
+
+
+def compile_assertions(definitions):
+    """AssertionSet from a JSON string (cached by text) or a list; None if empty."""
+    if definitions is None or isinstance(definitions, AssertionSet):
+        return definitions or None
+    if isinstance(definitions, str):
+        if not definitions.strip():
+            return None
+        compiled = _compile_text(definitions.strip())
+    else:
+        compiled = _compile(definitions)
+    return compiled or None
+
+
+_SCHEMA_TYPES = {
+    'object': dict, 'array': list, 'string': str, 'boolean': bool, 'null': type(None),
+}
+
+
+def _is_type(value, name):
+    if name == 'integer':
+        return isinstance(value, int) and not isinstance(value, bool)
+    if name == 'number':
+        return isinstance(value, (int, float)) and not isinstance(value, bool)
+    return isinstance(value, _SCHEMA_TYPES.get(name, object))
+
+
+def _validate(schema, value, where):
+    """Minimal JSON Schema subset used when jsonschema is not installed."""
+    types = schema.get('type')
+    if types is not None:
+        types = types if isinstance(types, list) else [types]
+        if not any(_is_type(value, t) for t in types):
+            return f"{where}: expected {' or '.join(types)}"
+    if 'enum' in schema and value not in schema['enum']:
+        return f"{where}: not one of {schema['enum']}"
+    if 'const' in schema and value != schema['const']:
+        return f"{where}: expected {schema['const']!r}"
+    if isinstance(value, dict):
+        for key in schema.get('required', ()):
+            if key not in value:
+                return f"{where}: missing required {key!r}"
+        props = schema.get('properties', {})
+        for key, sub in props.items():
+            if key in value:
+                err = _validate(sub, value[key], f"{where}.{key}")
+                if err:
+                    return err
+        if schema.get('additionalProperties') is False:
+            extra = [k for k in value if k not in props]
+            if extra:
+                return f"{where}: unexpected {extra[0]!r}"
+    elif isinstance(value, list):
+        if len(value) < schema.get('minItems', 0):
+            return f"{where}: fewer than {schema['minItems']} items"
+        if 'maxItems' in schema and len(value) > schema['maxItems']:
+            return f"{where}: more than {schema['maxItems']} items"
+        if isinstance(schema.get('items'), dict):
+            for i, item in enumerate(value):
+                err = _validate(schema['items'], item, f"{where}[{i}]")
+                if err:
+                    return err
+    elif isinstance(value, str):
+        if len(value) < schema.get('minLength', 0):
+            return f"{where}: shorter than {schema['minLength']}"
+        if 'maxLength' in schema and len(value) > schema['maxLength']:
+            return f"{where}: longer than {schema['maxLength']}"
+        if 'pattern' in schema and not re.search(schema['pattern'], value):
+            return f"{where}: does not match {schema['pattern']!r}"
+    elif _is_type(value, 'number'):
+        if 'minimum' in schema and value < schema['minimum']:
+            return f"{where}: below {schema['minimum']}"
+        if 'maximum' in schema and value > schema['maximum']:
+            return f"{where}: above {schema['maximum']}"
+    return None
@@ -0,0 +1,364 @@
+"""Benchmarks for the request pipeline, storage and rendering, with stored results.
+
+Each benchmark is a generator that does its setup, yields the callable to
+time and cleans up afterwards. The callable is run in rounds long enough
+to time reliably (asv style), and the per-call minimum and median are
+reported. ``--save NAME`` stores a run under ``bench_results/NAME.json``;
+``--compare NAME`` checks the run against a stored one and exits with 1
+when a benchmark's median got slower than ``--threshold`` allows.
+
+    python bench.py --save baseline
+    python bench.py --compare baseline --threshold 0.2
+    python bench.py -k storage --full      # history at 10k, 100k and 1M rows
+"""
+import argparse
+import contextlib
+import itertools
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+RESULTS_DIR = 'bench_results'
+HISTORY_SIZES = (10_000, 100_000)
+FULL_HISTORY_SIZES = HISTORY_SIZES + (1_000_000,)
+
+BENCHMARKS = {}
+
+
+class SkipBenchmark(Exception):
+    """Raised from a benchmark's setup when it cannot run here (no display, say)."""
+
+
+def benchmark(name):
+    def register(fn):
+        BENCHMARKS[name] = contextlib.contextmanager(fn)
+        return fn
+    return register
+
+
+def time_callable(fn, rounds=5, min_time=0.05):
+    """Per-call timings: ``rounds`` rounds of enough calls to last ``min_time``."""
+    number = 1
+    while True:
+        started = time.perf_counter()
+        for _ in range(number):
+            fn()
+        elapsed = time.perf_counter() - started
+        if elapsed >= min_time or number >= 1 << 20:
+            break
+        number *= 2 if elapsed * 10 > min_time else 10
+    samples = [elapsed / number]
+    for _ in range(rounds - 1):
+        started = time.perf_counter()
+        for _ in range(number):
+            fn()
+        samples.append((time.perf_counter() - started) / number)
+    return {'min': min(samples), 'median': statistics.median(samples), 'rounds': rounds, 'number': number}
+
+
+# ---------- request pipeline ----------
+
+@benchmark('requester.send')
+def bench_requester_send():
+    from mockserver import MockRoute, MockServer
+    from requester import Requester
+
+    server = MockServer([MockRoute('GET', '/items', 200, {'Content-Type': 'application/json'}, '{"ok": true}')])
+    url = server.start_in_thread() + '/items'
+    requester = Requester()
+    try:
+        yield lambda: requester.send('GET', url)
+    finally:
+        requester.close()
+        server.stop()
+
+
+# ---------- storage ----------
+
+def _history_rows(count, start=0):
+    now = datetime.utcnow()
+    return [{'created_at': now - timedelta(seconds=i), 'method': 'GET', 'url': f'https://api.local/items/{i}',
+             'headers': '{}', 'body': None, 'response_code': 200, 'response_body': '{"id": %d}' % i, 'duration_ms': 12.5, 'response_size': 9}
+            for i in range(start, start + count)]
+
+
+_filled_templates = {}
+
+
+def _filled_template(rows):
+    """Path of a database holding ``rows`` history rows, built once per process.
+
+    Every backend reads the same schema, so one file serves them all.
+    """
+    path = _filled_templates.get(rows)
+    if path is None:
+        from storage_base import open_storage
+
+        path = os.path.join(tempfile.mkdtemp(prefix='bench-'), f'history-{rows}.db')
+        storage = open_storage(path, backend='sqlite')
+        for start in range(0, rows, 10_000):
+            storage._write_history(_history_rows(min(10_000, rows - start), start))
+        storage.close()  # the last connection to close checkpoints the WAL into the main file
+        _filled_templates[rows] = path
+    return path
+
+
+@contextlib.contextmanager
+def _filled_storage(rows, backend=None):
+    from storage_base import open_storage
+
+    directory = tempfile.mkdtemp(prefix='bench-')
+    path = os.path.join(directory, 'bench.db')
+    shutil.copyfile(_filled_template(rows), path)
+    storage = open_storage(path, backend=backend)
+    try:
+        yield storage
+    finally:
+        storage.close()
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+def _remove_templates():
+    for path in _filled_templates.values():
+        shutil.rmtree(os.path.dirname(path), ignore_errors=True)
+    _filled_templates.clear()
+
+
+def _register_history_benchmarks(sizes):
+    from storage_base import STORAGE_BACKENDS
+
+    for rows, backend in itertools.product(sizes, sorted(STORAGE_BACKENDS)):
+        label = f'{rows // 1000}k' if rows < 1_000_000 else f'{rows // 1_000_000}M'
+
+        def add(rows=rows, backend=backend):
+            with _filled_storage(rows, backend) as storage:
+                yield lambda: storage.add_to_history('GET', 'https://api.local/items/new', '{}', None, 200,
+                                                     '{"id": 0}', duration_ms=3.0, response_size=9)
+
+        def get(rows=rows, backend=backend):
+            with _filled_storage(rows, backend) as storage:
+                yield lambda: storage.get_history()
+
+        BENCHMARKS[f'storage.{backend}.add_to_history[{label}]'] = contextlib.contextmanager(add)
+        BENCHMARKS[f'storage.{backend}.get_history[{label}]'] = contextlib.contextmanager(get)
+
+
+_register_history_benchmarks(HISTORY_SIZES)
+
+
+# ---------- environment rendering ----------
+
+def _environment(size):
+    variables = {f'VAR_{i}': f'value-{i}' for i in range(size)}
+    text = '\n'.join(f'"field{i}": "{{{{VAR_{i * 37 % size}}}}}"' for i in range(500))
+    return variables, text
+
+
+@benchmark('environment.render[10k vars]')
+def bench_render():
+    # what App._apply_environment_to_string does for the selected environment
+    from environment import Interpolator
+
+    variables, text = _environment(10_000)
+    interpolator = Interpolator(variables)
+    yield lambda: interpolator.render(text)
+
+
+@benchmark('environment.render_uncached[10k vars]')
+def bench_render_uncached():
+    from environment import Interpolator
+
+    variables, text = _environment(10_000)
+    yield lambda: Interpolator(variables).render(text)
+
+
+# ---------- parsing helpers ----------
+
+def _new_ui_helpers():
+    try:
+        from new_ui import parse_kv_or_json, pretty_json_if_possible
+    except ImportError as e:
+        raise SkipBenchmark(f'new_ui not importable: {e}')
+    return parse_kv_or_json, pretty_json_if_possible
+
+
+@benchmark('pretty_json_if_possible[5MB]')
+def bench_pretty_json():
+    _, pretty_json_if_possible = _new_ui_helpers()
+    text = json.dumps([{'id': i, 'name': f'item {i}', 'tags': ['a', 'b'], 'price': i * 1.5} for i in range(70_000)])
+    yield lambda: pretty_json_if_possible(text)
+
+
+@benchmark('parse_kv_or_json[50k lines]')
+def bench_parse_kv():
+    parse_kv_or_json, _ = _new_ui_helpers()
+    text = '\n'.join(f'Header-{i}: value {i}' if i % 2 else f'key{i}=value{i}' for i in range(50_000))
+    yield lambda: parse_kv_or_json(text)
+
+
+# ---------- response rendering ----------
+
+@benchmark('textbox.insert[1MB]')
+def bench_textbox_insert():
+    import tkinter as tk
+    from spool import CHUNK_SIZE
+
+    try:
+        root = tk.Tk()
+    except tk.TclError as e:
+        raise SkipBenchmark(f'no display: {e}')
+    root.withdraw()
+    text = tk.Text(root)
+    body = json.dumps({'items': [{'id': i, 'name': f'item {i}'} for i in range(40_000)]}, indent=2)[:1 << 20]
+
+    def insert():
+        # the chunked insertion App._stream_into_viewer performs
+        text.delete('1.0', tk.END)
+        for i in range(0, len(body), CHUNK_SIZE):
+            text.insert(tk.END, body[i:i + CHUNK_SIZE])
+        root.update_idletasks()
+
+    try:
+        yield insert
+    finally:
+        root.destroy()
+
+
+@benchmark('line_index.build[50MB]')
+def bench_line_index():
+    from virtual_viewer import LineIndex
+
+    fd, path = tempfile.mkstemp(suffix='.json')
+    with os.fdopen(fd, 'w', encoding='utf-8') as f:
+        line = json.dumps({'id': 0, 'name': 'x' * 80}) + '\n'
+        f.write(line * ((50 << 20) // len(line)))
+
+    def build():
+        index = LineIndex(path)
+        index.build()
+        index.close()
+
+    try:
+        yield build
+    finally:
+        os.remove(path)
+
+
+# ---------- running, storing and comparing ----------
+
+def run_benchmarks(names, rounds=5, min_time=0.05, on_result=None):
+    results = {}
+    for name in names:
+        try:
+            with BENCHMARKS[name]() as fn:
+                result = time_callable(fn, rounds=rounds, min_time=min_time)
+        except SkipBenchmark as e:
+            result = {'skipped': str(e)}
+        results[name] = result
+        if on_result:
+            on_result(name, result)
+    _remove_templates()
+    return results
+
+
+def _git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), timeout=5).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def machine_info():
+    return {'python': platform.python_version(), 'platform': platform.platform(),
+            'machine': platform.machine(), 'cpus': os.cpu_count()}
+
+
+def save_results(path, results):
+    data = {'created_at': datetime.utcnow().isoformat(timespec='seconds'), 'commit': _git_commit(),
+            'machine': machine_info(), 'benchmarks': results}
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=2)
+    return data
+
+
+def load_results(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)['benchmarks']
+
+
+def compare(baseline, current, threshold=0.2):
+    """Rows of (name, baseline median, current median, ratio, regressed) for benchmarks in both."""
+    rows = []
+    for name, result in current.items():
+        before = baseline.get(name)
+        if not before or 'median' not in before or 'median' not in result:
+            continue
+        ratio = result['median'] / before['median'] if before['median'] else float('inf')
+        rows.append((name, before['median'], result['median'], ratio, ratio > 1 + threshold))
+    return rows
+
+
+def _fmt(seconds):
+    for unit, scale in (('s', 1), ('ms', 1e-3), ('us', 1e-6)):
+        if seconds >= scale:
+            return f'{seconds / scale:.3g} {unit}'
+    return f'{seconds / 1e-9:.3g} ns'
+
+
+def build_parser(parser=None):
+    parser = parser or argparse.ArgumentParser(description="Run the benchmark suite.")
+    parser.add_argument('-k', '--filter', default='', help="only benchmarks whose name contains this")
+    parser.add_argument('--full', action='store_true', help="also run the 1M-row history benchmarks (slow)")
+    parser.add_argument('--rounds', type=int, default=5)
+    parser.add_argument('--min-time', type=float, default=0.05, help="seconds each round lasts at least")
+    parser.add_argument('--results-dir', default=RESULTS_DIR)
+    parser.add_argument('--save', metavar='NAME', help="store this run as NAME")
+    parser.add_argument('--compare', metavar='NAME', help="compare with the stored run NAME")
+    parser.add_argument('--threshold', type=float, default=0.2, help="allowed slowdown of the median (0.2 = 20%%)")
+    parser.add_argument('--list', action='store_true', help="list benchmark names and exit")
+    return parser
+
+
+def run_from_args(args):
+    if args.full:
+        _register_history_benchmarks(FULL_HISTORY_SIZES[len(HISTORY_SIZES):])
+    names = [n for n in BENCHMARKS if args.filter in n]
+    if args.list:
+        print('\n'.join(names))
+        return 0
+    baseline = load_results(os.path.join(args.results_dir, args.compare + '.json')) if args.compare else None
+
+    def report(name, result):
+        if 'skipped' in result:
+            print(f'{name:45} skipped: {result["skipped"]}', flush=True)
+        else:
+            print(f'{name:45} median {_fmt(result["median"]):>10}  min {_fmt(result["min"]):>10}', flush=True)
+
+    results = run_benchmarks(names, rounds=args.rounds, min_time=args.min_time, on_result=report)
+    if args.save:
+        save_results(os.path.join(args.results_dir, args.save + '.json'), results)
+    if baseline is None:
+        return 0
+    regressions = 0
+    print(f'\ncompared with {args.compare} (threshold {args.threshold:.0%}):')
+    for name, before, after, ratio, regressed in compare(baseline, results, args.threshold):
+        regressions += regressed
+        print(f'{name:45} {_fmt(before):>10} -> {_fmt(after):>10}  x{ratio:.2f}{"  REGRESSION" if regressed else ""}')
+    return 1 if regressions else 0
+
+
+def main(argv=None):
+    return run_from_args(build_parser().parse_args(argv))
+
+
+if __name__ == '__main__':
+    sys.exit(main())
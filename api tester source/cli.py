@@ -0,0 +1,199 @@
+"""Headless command-line runner (no customtkinter / PIL imports).
+
+    python cli.py run --collection "Smoke" --env staging --workers 8
+    python cli.py run --templates exported.json --env-file envs.json --format junit -o report.xml
+    python cli.py load https://api.local/orders -c 20 -d 30
+    python cli.py iterate --template 3 -i users.csv -w 8 -o results.jsonl
+    python cli.py workflow --file checkout.json --env staging
+    python cli.py trend /orders --days 7
+    python cli.py import openapi.json --collection Orders
+    python cli.py export --format postman -o templates.postman_collection.json
+    python cli.py export --history --days 1 -o capture.har
+    python cli.py replay capture.har --target https://staging.api.local --speed 2
+    python cli.py mock --collection Orders --port 8081 --latency-ms 20 --error-rate 0.01
+    python cli.py vacuum --db requests.db
+"""
+import argparse
+import json
+import sys
+from runner import RequestSpec, junit_xml, load_json_file, resolve_environment, run_specs
+
+
+def load_specs(args, storage=None):
+    """Return (suite name, specs) from --templates or --collection."""
+    if args.templates:
+        data = load_json_file(args.templates)
+        return args.templates, [RequestSpec.from_row(item) for item in data]
+    coll = None
+    for c in storage.get_collections():
+        if str(c.id) == args.collection or c.name == args.collection:
+            coll = c
+            break
+    if coll is None:
+        raise SystemExit(f"collection {args.collection!r} not found")
+    return coll.name, [RequestSpec.from_row(r) for r in storage.get_collection_requests(coll.id)]
+
+
+def cmd_run(args):
+    from requester import Requester
+
+    storage = None
+    if args.collection or (args.env and not args.env_file):
+        from storage_base import open_storage
+        storage = open_storage(args.db)
+    suite, specs = load_specs(args, storage)
+    vars_map = resolve_environment(args, storage)
+    requester = Requester(pool_maxsize=max(10, args.workers))
+
+    out = open(args.output, 'w', encoding='utf-8') if args.output else sys.stdout
+    try:
+        on_result = None
+        if args.format == 'jsonl':
+            def on_result(res):
+                out.write(json.dumps(res) + '\n')
+                out.flush()
+        results = run_specs(requester, specs, vars_map, workers=args.workers,
+                            timeout=args.timeout, on_result=on_result)
+        if args.format == 'junit':
+            out.write(junit_xml(suite, results) + '\n')
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    return 0 if all(r['ok'] for r in results) else 1
+
+
+def cmd_load(args):
+    from loadtest import exit_code, run_from_args
+    return exit_code(run_from_args(args))
+
+
+def cmd_iterate(args):
+    from iteration import run_from_args
+    summary = run_from_args(args)
+    return 1 if summary['failed'] else 0
+
+
+def cmd_workflow(args):
+    from workflow import run_from_args
+    summary = run_from_args(args)
+    return 0 if summary['ok'] else 1
+
+
+def cmd_trend(args):
+    from datetime import datetime, timedelta
+    from storage_base import open_storage
+
+    storage = open_storage(args.db)
+    since = datetime.utcnow() - timedelta(days=args.days)
+    endpoints = [e for e, _ in storage.get_endpoints(since=since) if args.endpoint in e]
+    if not endpoints:
+        print(f"no timed history matching {args.endpoint!r}", file=sys.stderr)
+        return 1
+    for endpoint in endpoints:
+        stats = storage.get_endpoint_summary(endpoint, since=since)
+        out = {'endpoint': endpoint, **stats}
+        if args.bucket:
+            out['trend'] = [dict(p, start=p['start'].isoformat())
+                            for p in storage.get_endpoint_trend(endpoint, since=since, bucket_minutes=args.bucket)]
+        print(json.dumps(out))
+    return 0
+
+
+def cmd_import(args):
+    from interchange import run_import
+    run_import(args)
+    return 0
+
+
+def cmd_export(args):
+    from interchange import run_export
+    run_export(args)
+    return 0
+
+
+def cmd_replay(args):
+    from replay import run_from_args
+    summary = run_from_args(args)
+    return 1 if summary['errors'] else 0
+
+
+def cmd_mock(args):
+    from mockserver import run_from_args
+    run_from_args(args)
+    return 0
+
+
+def cmd_vacuum(args):
+    from storage_base import open_storage
+
+    storage = open_storage(args.db)
+    before, after = storage.vacuum()
+    storage.close()
+    print(f"{args.db}: {before / 1e6:.1f} MB -> {after / 1e6:.1f} MB")
+    return 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='cli.py', description="Run saved API requests without the UI.")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    run = sub.add_parser('run', help="run every request of a collection or template export")
+    src = run.add_mutually_exclusive_group(required=True)
+    src.add_argument('--collection', help="collection name or id in the storage database")
+    src.add_argument('--templates', help="JSON file produced by Storage.export_templates")
+    run.add_argument('--db', default='requests.db')
+    run.add_argument('--env', help="environment name (from --env-file or the database)")
+    run.add_argument('--env-file', help="JSON file produced by Storage.export_environments")
+    run.add_argument('--var', action='append', default=[], help="KEY=VALUE override, repeatable")
+    run.add_argument('-w', '--workers', type=int, default=4)
+    run.add_argument('--timeout', type=float, default=30)
+    run.add_argument('--format', choices=['jsonl', 'junit'], default='jsonl')
+    run.add_argument('-o', '--output', help="write results to a file instead of stdout")
+    run.set_defaults(func=cmd_run)
+
+    from loadtest import build_parser as load_parser
+    load = load_parser(sub.add_parser('load', help="load-run a single request"))
+    load.set_defaults(func=cmd_load)
+
+    from iteration import build_parser as iterate_parser
+    iterate = iterate_parser(sub.add_parser('iterate', help="send a request once per row of a CSV/JSONL/JSON file"))
+    iterate.set_defaults(func=cmd_iterate)
+
+    from workflow import build_parser as workflow_parser
+    wf = workflow_parser(sub.add_parser('workflow', help="run a request-chaining workflow"))
+    wf.set_defaults(func=cmd_workflow)
+
+    trend = sub.add_parser('trend', help="latency percentiles per endpoint from stored rollups")
+    trend.add_argument('endpoint', nargs='?', default='', help="substring of the endpoint key, e.g. /orders")
+    trend.add_argument('--db', default='requests.db')
+    trend.add_argument('--days', type=float, default=7)
+    trend.add_argument('--bucket', type=int, help="also print a trend with points every N minutes")
+    trend.set_defaults(func=cmd_trend)
+
+    from interchange import export_parser, import_parser
+    imp = import_parser(sub.add_parser('import', help="import requests or environments (JSON, JSONL, Postman, OpenAPI, HAR)"))
+    imp.set_defaults(func=cmd_import)
+    exp = export_parser(sub.add_parser('export', help="export requests, environments or history (HAR)"))
+    exp.set_defaults(func=cmd_export)
+
+    from replay import build_parser as replay_parser
+    rep = replay_parser(sub.add_parser('replay', help="replay a HAR capture or stored history with its timing"))
+    rep.set_defaults(func=cmd_replay)
+
+    from mockserver import build_parser as mock_parser
+    mock = mock_parser(sub.add_parser('mock', help="serve recorded responses from a local mock server"))
+    mock.set_defaults(func=cmd_mock)
+
+    vacuum = sub.add_parser('vacuum', help="compact the database and enable incremental vacuum (locks it meanwhile)")
+    vacuum.add_argument('--db', default='requests.db')
+    vacuum.set_defaults(func=cmd_vacuum)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
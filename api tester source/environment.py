@@ -0,0 +1,182 @@
+import json
+import random
+import re
+import string
+import time
+import uuid
+from datetime import datetime, timezone
+from functools import lru_cache
+
+_TOKEN_RE = re.compile(r"\{\{\s*([^{}\s]+)\s*\}\}")
+
+# {{$name}} values generated fresh on every render
+DYNAMIC_VARIABLES = {
+    '$timestamp': lambda: str(int(time.time())),
+    '$timestampMs': lambda: str(int(time.time() * 1000)),
+    '$isoTimestamp': lambda: datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%S.%f')[:-3] + 'Z',
+    '$uuid': lambda: str(uuid.uuid4()),
+    '$randomInt': lambda: str(random.randint(0, 1000)),
+    '$randomHex': lambda: '%016x' % random.getrandbits(64),
+    '$randomString': lambda: ''.join(random.choices(string.ascii_letters + string.digits, k=16)),
+}
+
+# Rendered-output cache size per Interpolator (templates with no dynamic tokens)
+RENDER_CACHE_SIZE = 1024
+
+
+def load_variables(variables_json):
+    """Parse an Environment.variables JSON string into a dict ({} on bad input)."""
+    if not variables_json:
+        return {}
+    if isinstance(variables_json, dict):
+        return variables_json
+    try:
+        parsed = json.loads(variables_json)
+        return parsed if isinstance(parsed, dict) else {}
+    except Exception:
+        return {}
+
+
+class CompiledTemplate:
+    """Text split once into literal and ``{{name}}`` segments.
+
+    ``segments`` alternates literal text (even positions) and variable
+    names (odd positions), so rendering is a single join.
+    """
+
+    __slots__ = ('text', 'segments', 'tokens', 'names')
+
+    def __init__(self, text):
+        self.text = text
+        self.segments = []
+        self.tokens = []
+        pos = 0
+        for m in _TOKEN_RE.finditer(text):
+            self.segments.append(text[pos:m.start()])
+            self.segments.append(m.group(1))
+            self.tokens.append(m.group(0))
+            pos = m.end()
+        self.segments.append(text[pos:])
+        self.names = frozenset(self.segments[1::2])
+
+    def render(self, lookup):
+        """Join the segments, resolving names with ``lookup(name, token)``."""
+        if not self.tokens:
+            return self.text
+        parts = self.segments[:]
+        for i, token in enumerate(self.tokens):
+            parts[2 * i + 1] = lookup(parts[2 * i + 1], token)
+        return ''.join(parts)
+
+
+@lru_cache(maxsize=4096)
+def compile_template(text):
+    return CompiledTemplate(text)
+
+
+class Interpolator:
+    """Renders templates against one environment's variables.
+
+    Variables may reference other variables (``"url": "{{host}}/v1"``);
+    these are resolved once up front, except where they depend on a
+    dynamic ``{{$name}}`` value and must be re-rendered each time.
+    Reference cycles and unknown names are left as the literal token.
+    Build one per environment version and reuse it: output for templates
+    without dynamic values is cached by template text.
+    """
+
+    def __init__(self, vars_map=None):
+        self._raw = {str(k): '' if v is None else str(v) for k, v in (vars_map or {}).items()}
+        self._values = {}
+        self._derived = {}
+        self._cache = {}
+        for name in self._raw:
+            self._resolve(name, ())
+
+    @property
+    def variables(self):
+        """The raw (unrendered) variables, e.g. to layer more on top."""
+        return dict(self._raw)
+
+    def _resolve(self, name, stack):
+        """Fix ``name`` as a static value or a dynamic template; True if dynamic."""
+        if name in self._values:
+            return False
+        if name in self._derived:
+            return True
+        tpl = compile_template(self._raw[name])
+        dynamic = False
+        for ref in tpl.names:
+            if ref in self._raw:
+                if ref not in stack and ref != name:
+                    dynamic = self._resolve(ref, stack + (name,)) or dynamic
+            elif ref in DYNAMIC_VARIABLES:
+                dynamic = True
+        if dynamic:
+            self._derived[name] = tpl
+        else:
+            self._values[name] = tpl.render(lambda ref, token: self._values.get(ref, token))
+        return dynamic
+
+    def _lookup(self, name, token, stack=()):
+        value = self._values.get(name)
+        if value is not None:
+            return value
+        derived = self._derived.get(name)
+        if derived is not None:
+            if name in stack:
+                return token  # a cycle through a dynamic value
+            stack += (name,)
+            return derived.render(lambda ref, ref_token: self._lookup(ref, ref_token, stack))
+        gen = DYNAMIC_VARIABLES.get(name)
+        return gen() if gen is not None else token
+
+    def is_dynamic(self, text):
+        """True if rendering ``text`` can produce a different result each time."""
+        if not text:
+            return False
+        return any(n in self._derived or (n in DYNAMIC_VARIABLES and n not in self._values)
+                   for n in compile_template(text).names)
+
+    def render(self, text):
+        if not text or '{{' not in text:
+            return text
+        cached = self._cache.get(text)
+        if cached is not None:
+            return cached
+        tpl = compile_template(text)
+        out = tpl.render(self._lookup)
+        if not self.is_dynamic(text):
+            if len(self._cache) >= RENDER_CACHE_SIZE:
+                self._cache.clear()
+            self._cache[text] = out
+        return out
+
+
+def variable_text(value):
+    """Text form of a value bound as a variable (non-strings as JSON)."""
+    if value is None:
+        return ''
+    return value if isinstance(value, str) else json.dumps(value)
+
+
+def apply_environment(text, vars_map):
+    """Replace {{VAR}} tokens in text using vars_map (a dict or an Interpolator)."""
+    if not text:
+        return text
+    if not isinstance(vars_map, Interpolator):
+        vars_map = Interpolator(vars_map)
+    return vars_map.render(text)
+
+
+def parse_headers(headers):
+    """Saved headers are stored as a JSON string; tolerate dicts and blanks."""
+    if not headers:
+        return {}
+    if isinstance(headers, dict):
+        return headers
+    try:
+        parsed = json.loads(headers)
+        return parsed if isinstance(parsed, dict) else {}
+    except Exception:
+        return {}
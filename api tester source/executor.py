@@ -0,0 +1,108 @@
+import itertools
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+class Job:
+    """Handle for a piece of work submitted to a RequestExecutor.
+
+    The worker function receives the job as its first argument so it can
+    check ``job.cancelled`` between steps (e.g. while streaming a body).
+    """
+
+    def __init__(self, job_id, callback=None, tag=None, on_discard=None):
+        self.id = job_id
+        self.callback = callback
+        self.tag = tag
+        self.on_discard = on_discard
+        self.future = None
+        self._cancel_event = threading.Event()
+
+    @property
+    def cancelled(self):
+        return self._cancel_event.is_set()
+
+    def cancel(self):
+        self._cancel_event.set()
+        if self.future is not None:
+            self.future.cancel()
+
+    def wait_cancelled(self, timeout=None):
+        return self._cancel_event.wait(timeout)
+
+
+class RequestExecutor:
+    """Run blocking request work on a thread pool and hand results back to Tk.
+
+    Workers never touch widgets. Each finished job is pushed onto a queue and
+    ``poll()`` -- called from the Tk main loop via ``after()`` -- runs the
+    job's callback as ``callback(job, result, error)`` on the UI thread.
+    Results of cancelled jobs are dropped, after being passed to the job's
+    ``on_discard`` hook so resources such as temp files can be released.
+    """
+
+    def __init__(self, max_workers=4):
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="request")
+        self._results = queue.Queue()
+        self._jobs = {}
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def submit(self, fn, *args, callback=None, tag=None, on_discard=None, **kwargs):
+        """Schedule ``fn(job, *args, **kwargs)`` and return its Job."""
+        job = Job(next(self._ids), callback=callback, tag=tag, on_discard=on_discard)
+        with self._lock:
+            self._jobs[job.id] = job
+        job.future = self._pool.submit(self._run, job, fn, args, kwargs)
+        # a job cancelled before it starts never reaches _run; poll() still has to drop it
+        job.future.add_done_callback(lambda f: self._results.put((job, None, None)) if f.cancelled() else None)
+        return job
+
+    def _run(self, job, fn, args, kwargs):
+        if job.cancelled:
+            self._results.put((job, None, None))
+            return
+        try:
+            result = fn(job, *args, **kwargs)
+            self._results.put((job, result, None))
+        except Exception as e:
+            self._results.put((job, None, e))
+
+    def cancel(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if not job:
+            return False
+        job.cancel()
+        return True
+
+    def cancel_all(self, tag=None):
+        for job in self.active_jobs(tag):
+            job.cancel()
+
+    def active_jobs(self, tag=None):
+        with self._lock:
+            return [j for j in self._jobs.values() if tag is None or j.tag == tag]
+
+    def poll(self, max_items=50):
+        """Deliver finished jobs to their callbacks. Returns the number handled."""
+        handled = 0
+        while handled < max_items:
+            try:
+                job, result, error = self._results.get_nowait()
+            except queue.Empty:
+                break
+            with self._lock:
+                self._jobs.pop(job.id, None)
+            handled += 1
+            if job.cancelled or job.callback is None:
+                if result is not None and job.on_discard is not None:
+                    job.on_discard(result)
+                continue
+            job.callback(job, result, error)
+        return handled
+
+    def shutdown(self, wait=False):
+        self.cancel_all()
+        self._pool.shutdown(wait=wait, cancel_futures=True)
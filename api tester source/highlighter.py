@@ -0,0 +1,144 @@
+import queue
+import re
+import threading
+import time
+
+# Tag styles shared by the response viewers (colors match new_ui.JSON_TAGS)
+JSON_TAG_STYLES = {
+    "json_key": {"foreground": "#9CDCFE"},
+    "json_string": {"foreground": "#CE9178"},
+    "json_number": {"foreground": "#B5CEA8"},
+    "json_bool": {"foreground": "#569CD6"},
+    "json_null": {"foreground": "#569CD6"},
+}
+
+_TOKEN_RE = re.compile(
+    r'(?P<string>"(?:[^"\\]|\\.)*")(?P<colon>\s*:)?'
+    r'|(?P<number>-?\b\d+(?:\.\d+)?(?:[eE][+-]?\d+)?\b)'
+    r'|(?P<bool>\b(?:true|false)\b)'
+    r'|(?P<null>\bnull\b)'
+)
+
+
+def tokenize_line(line):
+    """Return (start_col, end_col, tag) spans for one line of JSON.
+
+    JSON strings cannot contain raw newlines, so lines can be tokenized
+    independently and in any order.
+    """
+    spans = []
+    for m in _TOKEN_RE.finditer(line):
+        kind = m.lastgroup
+        if m.group('string') is not None:
+            tag = "json_key" if m.group('colon') else "json_string"
+            spans.append((m.start('string'), m.end('string'), tag))
+        else:
+            spans.append((m.start(), m.end(), f"json_{kind}"))
+    return spans
+
+
+def configure_tags(text):
+    for tag, style in JSON_TAG_STYLES.items():
+        text.tag_configure(tag, **style)
+
+
+def tag_lines(text, lines, first_lineno):
+    """Synchronously tag ``lines`` displayed from ``first_lineno`` (1-based)."""
+    ranges = {tag: [] for tag in JSON_TAG_STYLES}
+    for n, line in enumerate(lines, first_lineno):
+        for start, end, tag in tokenize_line(line):
+            ranges[tag].extend((f"{n}.{start}", f"{n}.{end}"))
+    for tag, idx in ranges.items():
+        if idx:
+            text.tag_add(tag, *idx)
+
+
+class JsonHighlighter:
+    """Colour JSON in a Tk text widget without blocking the event loop.
+
+    A worker thread tokenizes the document -- lines currently on screen
+    first, then the rest -- and queues tag ranges in batches. The Tk side
+    applies queued batches from ``after()`` callbacks, stopping each time
+    ``frame_budget`` seconds have been spent so input is never starved.
+    """
+
+    def __init__(self, widget, frame_budget=0.008, batch_lines=400, margin=50):
+        # CTkTextbox wraps a tk.Text; use it directly for multi-range tag_add
+        self.text = getattr(widget, "_textbox", widget)
+        self.frame_budget = frame_budget
+        self.batch_lines = batch_lines
+        self.margin = margin
+        self._cancel = None
+        self._queue = None
+        self._job = None
+        configure_tags(self.text)
+
+    def visible_lines(self):
+        """1-based (first, last) line numbers currently on screen."""
+        first = int(self.text.index("@0,0").split(".")[0])
+        last = int(self.text.index(f"@0,{self.text.winfo_height()}").split(".")[0])
+        return first, last
+
+    def highlight(self, source):
+        """Start highlighting ``source``, which must match the widget's content."""
+        self.cancel()
+        first, last = self.visible_lines()
+        self._cancel = threading.Event()
+        self._queue = queue.Queue()
+        worker = threading.Thread(
+            target=self._tokenize,
+            args=(source, max(0, first - 1 - self.margin), last + self.margin, self._cancel, self._queue),
+            daemon=True,
+        )
+        worker.start()
+        self._job = self.text.after(1, self._apply, self._queue)
+
+    def cancel(self):
+        if self._cancel is not None:
+            self._cancel.set()
+            self._cancel = None
+        if self._job is not None:
+            try:
+                self.text.after_cancel(self._job)
+            except Exception:
+                pass
+            self._job = None
+        for tag in JSON_TAG_STYLES:
+            self.text.tag_remove(tag, "1.0", "end")
+
+    def _tokenize(self, source, vis_start, vis_end, cancel, out):
+        lines = source.split("\n")
+        vis_end = min(vis_end, len(lines))
+        order = (range(vis_start, vis_end), range(0, vis_start), range(vis_end, len(lines)))
+        batch = {tag: [] for tag in JSON_TAG_STYLES}
+        pending = 0
+        for block in order:
+            for i in block:
+                for start, end, tag in tokenize_line(lines[i]):
+                    batch[tag].extend((f"{i + 1}.{start}", f"{i + 1}.{end}"))
+                pending += 1
+                if pending >= self.batch_lines:
+                    if cancel.is_set():
+                        return
+                    out.put(batch)
+                    batch = {tag: [] for tag in JSON_TAG_STYLES}
+                    pending = 0
+        out.put(batch)
+        out.put(None)
+
+    def _apply(self, source_queue):
+        if source_queue is not self._queue:
+            return
+        started = time.perf_counter()
+        while time.perf_counter() - started < self.frame_budget:
+            try:
+                batch = source_queue.get_nowait()
+            except queue.Empty:
+                break
+            if batch is None:
+                self._job = None
+                return
+            for tag, idx in batch.items():
+                if idx:
+                    self.text.tag_add(tag, *idx)
+        self._job = self.text.after(16, self._apply, source_queue)
@@ -0,0 +1,121 @@
+import math
+import struct
+import threading
+
+# version, sub_bucket_bits, count, total_us, min_us, max_us, buckets
+_HEADER = struct.Struct('<BBQQQQI')
+
+
+class LatencyHistogram:
+    """Bounded-memory latency recorder in the style of HdrHistogram.
+
+    Values are recorded in microseconds into log-linear buckets: every power
+    of two is split into ``2 ** sub_bucket_bits`` linear sub-buckets, so the
+    relative error of a reported percentile is below ``2 ** -(sub_bucket_bits - 1)``
+    (under 1% with the default of 8 bits). Memory depends only on the range
+    of values seen, never on how many samples were recorded.
+    """
+
+    def __init__(self, sub_bucket_bits=8):
+        self.sub_bucket_bits = sub_bucket_bits
+        self.counts = {}
+        self.count = 0
+        self.total_us = 0
+        self.min_us = None
+        self.max_us = None
+        self._lock = threading.Lock()
+
+    def _index(self, value):
+        shift = max(0, value.bit_length() - self.sub_bucket_bits)
+        return (shift << self.sub_bucket_bits) | (value >> shift)
+
+    def _bucket_value(self, index):
+        """Highest value that falls into the bucket at ``index``."""
+        shift = index >> self.sub_bucket_bits
+        mantissa = index & ((1 << self.sub_bucket_bits) - 1)
+        return ((mantissa + 1) << shift) - 1
+
+    def record(self, seconds):
+        """Record one latency sample given in seconds."""
+        self.record_us(int(seconds * 1_000_000))
+
+    def record_us(self, value, count=1):
+        value = max(0, int(value))
+        idx = self._index(value)
+        with self._lock:
+            self.counts[idx] = self.counts.get(idx, 0) + count
+            self.count += count
+            self.total_us += value * count
+            if self.min_us is None or value < self.min_us:
+                self.min_us = value
+            if self.max_us is None or value > self.max_us:
+                self.max_us = value
+
+    def merge(self, other):
+        if other.sub_bucket_bits != self.sub_bucket_bits:
+            raise ValueError("cannot merge histograms with different precision")
+        with self._lock:
+            for idx, c in other.counts.items():
+                self.counts[idx] = self.counts.get(idx, 0) + c
+            self.count += other.count
+            self.total_us += other.total_us
+            if other.min_us is not None and (self.min_us is None or other.min_us < self.min_us):
+                self.min_us = other.min_us
+            if other.max_us is not None and (self.max_us is None or other.max_us > self.max_us):
+                self.max_us = other.max_us
+        return self
+
+    def to_bytes(self):
+        """Compact serialization: header plus (bucket, count) pairs."""
+        with self._lock:
+            items = sorted(self.counts.items())
+            header = _HEADER.pack(1, self.sub_bucket_bits, self.count, self.total_us,
+                                  self.min_us or 0, self.max_us or 0, len(items))
+            flat = [v for pair in items for v in pair]
+        return header + struct.pack(f'<{len(flat)}Q', *flat)
+
+    @classmethod
+    def from_bytes(cls, data):
+        version, bits, count, total, min_us, max_us, n = _HEADER.unpack_from(data)
+        if version != 1:
+            raise ValueError(f"unsupported histogram encoding {version}")
+        h = cls(sub_bucket_bits=bits)
+        flat = struct.unpack_from(f'<{2 * n}Q', data, _HEADER.size)
+        h.counts = dict(zip(flat[::2], flat[1::2]))
+        h.count = count
+        h.total_us = total
+        if count:
+            h.min_us, h.max_us = min_us, max_us
+        return h
+
+    def percentile_us(self, pct):
+        """Value (µs) at or below which ``pct`` percent of samples fall."""
+        with self._lock:
+            if not self.count:
+                return 0
+            if pct >= 100:
+                return self.max_us
+            target = max(1, math.ceil(self.count * pct / 100.0))
+            seen = 0
+            for idx in sorted(self.counts):
+                seen += self.counts[idx]
+                if seen >= target:
+                    return min(self._bucket_value(idx), self.max_us)
+            return self.max_us
+
+    def percentile(self, pct):
+        """Percentile in milliseconds."""
+        return self.percentile_us(pct) / 1000.0
+
+    @property
+    def mean(self):
+        """Mean in milliseconds."""
+        return (self.total_us / self.count) / 1000.0 if self.count else 0.0
+
+    @property
+    def max(self):
+        return (self.max_us or 0) / 1000.0
+
+    @property
+    def min(self):
+        return (self.min_us or 0) / 1000.0
@@ -0,0 +1,382 @@
+"""Client-side HTTP cache for Requester: memory plus disk, LRU and size bounded.
+
+Only GET responses are cached. Freshness follows ``Cache-Control``
+(max-age, no-cache, no-store, must-revalidate) and ``Expires``, falling
+back to 10% of the ``Last-Modified`` age. A stale entry with an ``ETag`` or
+``Last-Modified`` is revalidated with ``If-None-Match`` /
+``If-Modified-Since``; on 304 the entry is refreshed and its stored body
+returned. With ``serve_stale`` on, stale entries are returned without
+touching the network at all, unless the request sends ``no-cache``.
+Other methods (POST, PUT, ...) drop the entry for the URL they target.
+
+Cached responses are ordinary requests.Response objects with a
+``cache_status`` attribute: 'hit', 'revalidated', 'stale' or 'miss'.
+
+    requester = Requester(cache=HTTPCache('http_cache'))
+"""
+import hashlib
+import json
+import os
+import struct
+import threading
+import time
+from collections import OrderedDict
+from datetime import timedelta
+from email.utils import parsedate_to_datetime
+import requests
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+CACHEABLE_STATUS = frozenset((200, 203, 204, 300, 301, 308, 404, 410))
+# headers that describe the wire encoding, not the (decoded) body we keep
+_WIRE_HEADERS = frozenset(('content-encoding', 'content-length', 'transfer-encoding', 'connection', 'keep-alive'))
+# heuristic freshness (10% of the Last-Modified age) is capped at a day
+HEURISTIC_MAX_AGE = 24 * 3600
+_META = struct.Struct('<I')
+
+
+def parse_cache_control(value):
+    """{'max-age': '60', 'no-cache': True, ...} from a Cache-Control header."""
+    out = {}
+    for part in (value or '').split(','):
+        name, sep, arg = part.strip().partition('=')
+        if name:
+            out[name.lower()] = arg.strip().strip('"') if sep else True
+    return out
+
+
+def _header(headers, name):
+    if not headers:
+        return None
+    value = headers.get(name)
+    if value is None and not isinstance(headers, CaseInsensitiveDict):
+        lower = name.lower()
+        value = next((v for k, v in headers.items() if k.lower() == lower), None)
+    return value
+
+
+def _http_date(value):
+    try:
+        return parsedate_to_datetime(value).timestamp() if value else None
+    except (TypeError, ValueError):
+        return None
+
+
+def _seconds(value):
+    try:
+        return max(0, int(value))
+    except (TypeError, ValueError):
+        return None
+
+
+class CacheEntry:
+    def __init__(self, url, status, reason, headers, body, vary, stored_at, initial_age=0):
+        self.url = url
+        self.status = status
+        self.reason = reason
+        self.headers = dict(headers)
+        self.body = body
+        self.vary = vary  # {lowercased request header: value it had}
+        self.stored_at = stored_at
+        self.initial_age = initial_age
+
+    @property
+    def size(self):
+        return len(self.body) + 512
+
+    @property
+    def cache_control(self):
+        return parse_cache_control(_header(self.headers, 'Cache-Control'))
+
+    def lifetime(self):
+        cc = self.cache_control
+        if 'max-age' in cc:
+            return _seconds(cc['max-age']) or 0
+        date = _http_date(_header(self.headers, 'Date')) or self.stored_at
+        expires = _header(self.headers, 'Expires')
+        if expires is not None:
+            when = _http_date(expires)
+            return max(0, when - date) if when is not None else 0
+        modified = _http_date(_header(self.headers, 'Last-Modified'))
+        if modified is not None and self.status in (200, 203, 300, 301, 404, 410):
+            return min(HEURISTIC_MAX_AGE, max(0, (date - modified) / 10))
+        return 0
+
+    def is_fresh(self, now):
+        if 'no-cache' in self.cache_control:
+            return False
+        return self.initial_age + (now - self.stored_at) < self.lifetime()
+
+    def validators(self):
+        out = {}
+        etag = _header(self.headers, 'ETag')
+        if etag:
+            out['If-None-Match'] = etag
+        modified = _header(self.headers, 'Last-Modified')
+        if modified:
+            out['If-Modified-Since'] = modified
+        return out
+
+    def matches(self, request_headers):
+        return all((_header(request_headers, name) or '') == value for name, value in self.vary.items())
+
+    def refresh(self, headers, now):
+        """Take the new metadata of a 304 response."""
+        for k, v in headers.items():
+            if k.lower() not in _WIRE_HEADERS:
+                self.headers[k] = v
+        self.stored_at = now
+        self.initial_age = _seconds(_header(headers, 'Age')) or 0
+
+    def response(self, cache_status):
+        resp = requests.Response()
+        resp.status_code = self.status
+        resp.reason = self.reason
+        resp.url = self.url
+        resp.headers = CaseInsensitiveDict(self.headers)
+        resp.encoding = get_encoding_from_headers(resp.headers)
+        resp._content = self.body
+        resp._content_consumed = True  # iter_content() serves the stored bytes
+        resp.elapsed = timedelta(0)
+        resp.cache_status = cache_status
+        return resp
+
+    def to_bytes(self):
+        meta = json.dumps({'url': self.url, 'status': self.status, 'reason': self.reason, 'headers': self.headers,
+                           'vary': self.vary, 'stored_at': self.stored_at,
+                           'initial_age': self.initial_age}).encode('utf-8')
+        return _META.pack(len(meta)) + meta + self.body
+
+    @classmethod
+    def from_bytes(cls, data):
+        (n,) = _META.unpack_from(data)
+        meta = json.loads(data[_META.size:_META.size + n])
+        return cls(meta['url'], meta['status'], meta['reason'], meta['headers'], data[_META.size + n:],
+                   meta['vary'], meta['stored_at'], meta.get('initial_age', 0))
+
+
+class MemoryStore:
+    """LRU of CacheEntry objects bounded by total body size."""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._entries = OrderedDict()
+
+    def get(self, key):
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+        return entry
+
+    def put(self, key, entry):
+        self.delete(key)
+        if entry.size > self.max_bytes:
+            return
+        self._entries[key] = entry
+        self.size += entry.size
+        while self.size > self.max_bytes:
+            _, old = self._entries.popitem(last=False)
+            self.size -= old.size
+
+    def delete(self, key):
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self.size -= old.size
+
+    def clear(self):
+        self._entries.clear()
+        self.size = 0
+
+
+class DiskStore:
+    """One file per entry under ``directory``; least recently used files are evicted first.
+
+    File modification times carry the LRU order across restarts.
+    """
+
+    def __init__(self, directory, max_bytes):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._index = OrderedDict()  # file name -> size, least recently used first
+        os.makedirs(directory, exist_ok=True)
+        files = []
+        for item in os.scandir(directory):
+            if item.name.endswith('.cache') and item.is_file():
+                st = item.stat()
+                files.append((st.st_mtime, item.name, st.st_size))
+        for _, name, size in sorted(files):
+            self._index[name] = size
+            self.size += size
+
+    @staticmethod
+    def _name(key):
+        return hashlib.sha256(key.encode('utf-8')).hexdigest() + '.cache'
+
+    def get(self, key):
+        name = self._name(key)
+        if name not in self._index:
+            return None
+        path = os.path.join(self.directory, name)
+        try:
+            with open(path, 'rb') as f:
+                entry = CacheEntry.from_bytes(f.read())
+            os.utime(path)
+        except (OSError, ValueError, KeyError, struct.error):
+            self._drop(name)
+            return None
+        self._index.move_to_end(name)
+        return entry
+
+    def put(self, key, entry):
+        data = entry.to_bytes()
+        if len(data) > self.max_bytes:
+            return
+        name = self._name(key)
+        path = os.path.join(self.directory, name)
+        tmp = f"{path}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp, 'wb') as f:
+                f.write(data)
+            os.replace(tmp, path)
+        except OSError:
+            return
+        self.size += len(data) - self._index.pop(name, 0)
+        self._index[name] = len(data)
+        while self.size > self.max_bytes and self._index:
+            self._drop(next(iter(self._index)))
+
+    def _drop(self, name):
+        self.size -= self._index.pop(name, 0)
+        try:
+            os.remove(os.path.join(self.directory, name))
+        except OSError:
+            pass
+
+    def delete(self, key):
+        self._drop(self._name(key))
+
+    def clear(self):
+        for name in list(self._index):
+            self._drop(name)
+
+
+class HTTPCache:
+    """Two-tier response cache used by Requester.send (see module docstring).
+
+    ``directory`` enables the disk tier; entries read from disk are
+    promoted to memory. Bodies above ``max_entry_bytes`` are never cached.
+    """
+
+    def __init__(self, directory=None, memory_bytes=32 * 1024 * 1024, disk_bytes=256 * 1024 * 1024,
+                 max_entry_bytes=8 * 1024 * 1024, serve_stale=False):
+        self.memory = MemoryStore(memory_bytes)
+        self.disk = DiskStore(directory, disk_bytes) if directory else None
+        self.max_entry_bytes = max_entry_bytes
+        self.serve_stale = serve_stale
+        self.enabled = True
+        self._lock = threading.Lock()
+        self.counts = dict.fromkeys(('hit', 'revalidated', 'stale', 'miss'), 0)
+
+    def stats(self):
+        with self._lock:
+            out = dict(self.counts)
+            out['memory_bytes'] = self.memory.size
+            out['disk_bytes'] = self.disk.size if self.disk else 0
+        lookups = out['hit'] + out['revalidated'] + out['stale'] + out['miss']
+        out['hit_rate'] = round((lookups - out['miss']) / lookups, 4) if lookups else 0.0
+        return out
+
+    def clear(self):
+        with self._lock:
+            self.memory.clear()
+            if self.disk:
+                self.disk.clear()
+
+    def _count(self, status):
+        with self._lock:
+            self.counts[status] += 1
+
+    def _get(self, key):
+        with self._lock:
+            entry = self.memory.get(key)
+            if entry is None and self.disk is not None:
+                entry = self.disk.get(key)
+                if entry is not None:
+                    self.memory.put(key, entry)
+            return entry
+
+    def _put(self, key, entry):
+        with self._lock:
+            self.memory.put(key, entry)
+            if self.disk is not None:
+                self.disk.put(key, entry)
+
+    def invalidate(self, url):
+        with self._lock:
+            self.memory.delete(url)
+            if self.disk is not None:
+                self.disk.delete(url)
+
+    def send(self, fetch, method, url, headers=None, data=None, params=None, timeout=30, stream=False, timings=None):
+        """Answer from the cache or call ``fetch`` (Requester's network send) with the same arguments."""
+        if not self.enabled or method not in ('GET', 'HEAD'):
+            resp = fetch(method, url, headers, data, params, timeout, stream, timings)
+            if self.enabled and method not in ('HEAD', 'OPTIONS', 'TRACE'):
+                self.invalidate(resp.url or url)
+            return resp
+        request_cc = parse_cache_control(_header(headers, 'Cache-Control'))
+        if method == 'HEAD' or 'no-store' in request_cc:
+            return fetch(method, url, headers, data, params, timeout, stream, timings)
+        key = requests.Request(method, url, params=params).prepare().url if params else url
+        entry = self._get(key)
+        if entry is not None and not entry.matches(headers):
+            entry = None
+        now = time.time()
+        if entry is not None:
+            if entry.is_fresh(now) and 'no-cache' not in request_cc:
+                self._count('hit')
+                return entry.response('hit')
+            if self.serve_stale and 'must-revalidate' not in entry.cache_control and 'no-cache' not in request_cc:
+                self._count('stale')
+                return entry.response('stale')
+            conditional = entry.validators()
+            if conditional:
+                headers = {**(headers or {}), **conditional}
+        resp = fetch(method, url, headers, data, params, timeout, stream, timings)
+        if entry is not None and resp.status_code == 304:
+            resp.close()
+            entry.refresh(resp.headers, time.time())
+            self._put(key, entry)
+            self._count('revalidated')
+            return entry.response('revalidated')
+        self._count('miss')
+        resp.cache_status = 'miss'
+        self._store(key, headers, resp, stream, now)
+        return resp
+
+    def _store(self, key, request_headers, resp, stream, now):
+        if resp.status_code not in CACHEABLE_STATUS:
+            return
+        cc = parse_cache_control(_header(resp.headers, 'Cache-Control'))
+        vary = [v.strip().lower() for v in (_header(resp.headers, 'Vary') or '').split(',') if v.strip()]
+        if 'no-store' in cc or '*' in vary:
+            return
+        if not ('max-age' in cc or 'no-cache' in cc or
+                any(h in resp.headers for h in ('Expires', 'ETag', 'Last-Modified'))):
+            return  # could never be served or revalidated
+        if stream:
+            # the body is read here, so the caller's iter_content() replays it from memory
+            length = _seconds(resp.headers.get('Content-Length'))
+            if length is None or length > self.max_entry_bytes:
+                return
+        body = resp.content
+        if len(body) > self.max_entry_bytes:
+            return
+        headers = {k: v for k, v in resp.headers.items() if k.lower() not in _WIRE_HEADERS}
+        headers['Content-Length'] = str(len(body))
+        entry = CacheEntry(resp.url or key, resp.status_code, resp.reason, headers, body,
+                           {name: _header(request_headers, name) or '' for name in vary}, now,
+                           _seconds(resp.headers.get('Age')) or 0)
+        self._put(key, entry)
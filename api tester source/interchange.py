@@ -0,0 +1,460 @@
+"""Streaming import/export of requests and environments.
+
+Formats:
+
+- ``json``:    a JSON array of objects (what Storage.export_templates writes)
+- ``jsonl``:   one JSON object per line
+- ``postman``: Postman collection v2.1; folders are flattened
+- ``openapi``: OpenAPI 3 / Swagger 2, one request per operation; URLs start
+  with ``{{baseUrl}}`` and path parameters become ``{{variables}}``
+- ``har``:     HTTP Archive 1.2, one request per entry; history is exported
+  as HAR by ``write_har`` (and replayed by replay.py)
+
+Readers parse incrementally with ``JsonStream``, so only the item being
+read is held in memory however large the file is. Storage.import_requests
+then inserts items in executemany batches. Writers take any iterable of
+dicts (e.g. Storage.iter_requests, which streams rows from the database).
+
+    python cli.py import postman_collection.json --collection Imported
+    python cli.py export --format jsonl -o templates.jsonl
+    python cli.py export --history --days 1 -o capture.har
+"""
+import argparse
+import json
+import re
+import sys
+from datetime import datetime, timedelta, timezone
+from urllib.parse import parse_qsl, urlsplit
+
+READ_FORMATS = ('json', 'jsonl', 'postman', 'openapi', 'har')
+WRITE_FORMATS = ('json', 'jsonl', 'postman', 'har')
+# request headers a client recomputes; never replayed from a capture
+HAR_SKIP_HEADERS = frozenset(('host', 'content-length', 'connection'))
+READ_CHUNK = 64 * 1024
+HTTP_METHODS = ('get', 'put', 'post', 'delete', 'options', 'head', 'patch', 'trace')
+
+_WS_RE = re.compile(r'[ \t\n\r]*')
+_PATH_PARAM_RE = re.compile(r'\{([^{}/]+)\}')
+_decoder = json.JSONDecoder()
+
+
+class JsonStream:
+    """Incremental reader for one JSON document in a text file.
+
+    ``value()`` decodes the next complete value; ``items()`` and
+    ``members()`` walk an array or object one element at a time, and
+    ``enter(*keys)`` skips ahead to the value of a nested key.
+    """
+
+    def __init__(self, f, chunk_size=READ_CHUNK):
+        self.f = f
+        self.chunk_size = chunk_size
+        self.buf = ''
+        self.pos = 0
+        self.eof = False
+
+    def _fill(self):
+        if self.eof:
+            return False
+        # read at least as much as is buffered, so a large value is re-scanned O(log n) times
+        chunk = self.f.read(max(self.chunk_size, len(self.buf) - self.pos))
+        if not chunk:
+            self.eof = True
+            return False
+        self.buf = self.buf[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self):
+        """Next non-whitespace character ('' at the end of the file)."""
+        while True:
+            self.pos = _WS_RE.match(self.buf, self.pos).end()
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self._fill():
+                return ''
+
+    def _expect(self, chars):
+        c = self.peek()
+        if c == '' or c not in chars:
+            raise ValueError(f"expected {' or '.join(chars)!s} but found {c or 'end of file'!r}")
+        self.pos += 1
+        return c
+
+    def value(self):
+        self.peek()
+        while True:
+            try:
+                obj, end = _decoder.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError:
+                if self._fill():
+                    continue
+                raise
+            # a number at the end of the buffer may continue in the next chunk
+            if end == len(self.buf) and self._fill():
+                continue
+            self.pos = end
+            return obj
+
+    def items(self):
+        """Yield the elements of the array starting here."""
+        self._expect('[')
+        if self.peek() == ']':
+            self.pos += 1
+            return
+        while True:
+            yield self.value()
+            if self._expect(',]') == ']':
+                return
+
+    def members(self):
+        """Yield (key, value) pairs of the object starting here."""
+        for key in self._keys():
+            yield key, self.value()
+
+    def _keys(self):
+        self._expect('{')
+        if self.peek() == '}':
+            self.pos += 1
+            return
+        while True:
+            key = self.value()
+            self._expect(':')
+            yield key
+            if self._expect(',}') == '}':
+                return
+
+    def enter(self, *path):
+        """Move to the value of ``path`` (nested object keys); False if absent.
+
+        Keys before the wanted one are decoded and dropped, so documents
+        should keep large sections after the ones they skip past.
+        """
+        for key in path:
+            if self.peek() != '{':
+                return False
+            keys = self._keys()
+            for k in keys:
+                if k == key:
+                    break
+                self.value()
+            else:
+                return False
+        return True
+
+
+def detect_format(path):
+    lower = path.lower()
+    if lower.endswith(('.jsonl', '.ndjson')):
+        return 'jsonl'
+    if lower.endswith('.har'):
+        return 'har'
+    with open(path, 'r', encoding='utf-8-sig') as f:
+        head = f.read(READ_CHUNK)
+    stripped = head.lstrip()
+    if stripped.startswith('['):
+        return 'json'
+    if re.search(r'"(openapi|swagger)"\s*:', head):
+        return 'openapi'
+    if re.search(r'"log"\s*:', head) and '"entries"' in head:
+        return 'har'
+    if 'schema.getpostman.com' in head or re.search(r'"item"\s*:', head):
+        return 'postman'
+    first_line = stripped.split('\n', 1)[0].strip()
+    return 'jsonl' if first_line.startswith('{') and first_line.endswith('}') else 'json'
+
+
+def _headers_text(headers):
+    if not headers:
+        return None
+    return headers if isinstance(headers, str) else json.dumps(headers)
+
+
+def request_item(name, method, url, headers=None, body=None, assertions=None):
+    """The dict shape every reader yields and Storage.import_requests takes."""
+    if assertions is not None and not isinstance(assertions, str):
+        assertions = json.dumps(assertions)
+    return {'name': name or url or 'imported', 'method': (method or 'GET').upper(), 'url': url or '',
+            'headers': _headers_text(headers), 'body': body or None, 'assertions': assertions or None}
+
+
+def _plain(item):
+    return request_item(item.get('name'), item.get('method'), item.get('url'), item.get('headers'),
+                        item.get('body'), item.get('assertions'))
+
+
+def _postman_requests(item, prefix=''):
+    name = item.get('name') or ''
+    if 'item' in item:  # folder
+        for child in item['item'] or []:
+            yield from _postman_requests(child, f"{prefix}{name}/" if name else prefix)
+        return
+    req = item.get('request')
+    if req is None:
+        return
+    if isinstance(req, str):
+        req = {'url': req}
+    url = req.get('url') or ''
+    if isinstance(url, dict):
+        url = url.get('raw') or ''
+    headers = {h['key']: h.get('value', '') for h in req.get('header') or []
+               if isinstance(h, dict) and h.get('key') and not h.get('disabled')}
+    body = req.get('body') or {}
+    mode = body.get('mode')
+    if mode == 'raw':
+        text = body.get('raw')
+    elif mode == 'graphql':
+        text = json.dumps(body.get('graphql') or {})
+    elif mode == 'urlencoded':
+        text = '&'.join(f"{p['key']}={p.get('value', '')}" for p in body.get('urlencoded') or []
+                        if not p.get('disabled'))
+    else:
+        text = None
+    yield request_item(prefix + name, req.get('method'), url, headers, text)
+
+
+def _openapi_requests(stream):
+    if not stream.enter('paths'):
+        return
+    for path, operations in stream.members():
+        url = '{{baseUrl}}' + _PATH_PARAM_RE.sub(r'{{\1}}', path)
+        for method, op in (operations or {}).items():
+            if method not in HTTP_METHODS or not isinstance(op, dict):
+                continue
+            headers, body = {}, None
+            content = (op.get('requestBody') or {}).get('content') or {}
+            for media_type, media in content.items():
+                headers['Content-Type'] = media_type
+                example = (media or {}).get('example')
+                if example is None:
+                    example = next(iter(((media or {}).get('examples') or {}).values()), {}).get('value')
+                if example is not None:
+                    body = example if isinstance(example, str) else json.dumps(example)
+                break
+            name = op.get('summary') or op.get('operationId') or f"{method.upper()} {path}"
+            yield request_item(name, method, url, headers, body)
+
+
+def har_request(entry):
+    """(method, url, headers dict, body) of one HAR entry."""
+    req = entry.get('request') or {}
+    # HTTP/2 captures carry pseudo-headers (":authority") that cannot be sent as-is
+    headers = {h['name']: h.get('value', '') for h in req.get('headers') or []
+               if h.get('name') and not h['name'].startswith(':') and h['name'].lower() not in HAR_SKIP_HEADERS}
+    return (req.get('method') or 'GET').upper(), req.get('url') or '', headers, (req.get('postData') or {}).get('text')
+
+
+def _har_requests(stream):
+    if not stream.enter('log', 'entries'):
+        return
+    for entry in stream.items():
+        method, url, headers, body = har_request(entry)
+        yield request_item(f"{method} {urlsplit(url).path or '/'}", method, url, headers, body)
+
+
+def read_requests(f, fmt):
+    """Yield request items from the open text file ``f``."""
+    if fmt == 'jsonl':
+        for line in f:
+            if line.strip():
+                yield _plain(json.loads(line))
+        return
+    stream = JsonStream(f)
+    if fmt == 'json':
+        for item in stream.items():
+            yield _plain(item)
+    elif fmt == 'postman':
+        if stream.enter('item'):
+            for item in stream.items():
+                yield from _postman_requests(item)
+    elif fmt == 'openapi':
+        yield from _openapi_requests(stream)
+    elif fmt == 'har':
+        yield from _har_requests(stream)
+    else:
+        raise ValueError(f"unknown import format {fmt!r}")
+
+
+def read_environments(f, fmt):
+    """Yield {'name', 'variables'} dicts; ``postman`` reads a Postman environment file."""
+    if fmt == 'jsonl':
+        items = (json.loads(line) for line in f if line.strip())
+    elif fmt == 'json':
+        items = JsonStream(f).items()
+    elif fmt == 'postman':
+        env = json.load(f)
+        values = {v['key']: v.get('value', '') for v in env.get('values') or [] if v.get('enabled', True)}
+        items = [{'name': env.get('name'), 'variables': values}]
+    else:
+        raise ValueError(f"environments cannot be imported from {fmt!r}")
+    for item in items:
+        variables = item.get('variables') or '{}'
+        yield {'name': item.get('name') or 'imported',
+               'variables': variables if isinstance(variables, str) else json.dumps(variables)}
+
+
+def write_items(f, items, fmt, name='export'):
+    """Write dicts to ``f`` one at a time; returns how many were written."""
+    count = 0
+    if fmt == 'jsonl':
+        for item in items:
+            f.write(json.dumps(item) + '\n')
+            count += 1
+        return count
+    if fmt == 'json':
+        f.write('[')
+        for item in items:
+            f.write((',\n  ' if count else '\n  ') + json.dumps(item))
+            count += 1
+        f.write('\n]\n' if count else ']\n')
+        return count
+    if fmt != 'postman':
+        raise ValueError(f"unknown export format {fmt!r}")
+    f.write('{"info": ' + json.dumps({
+        'name': name, 'schema': 'https://schema.getpostman.com/json/collection/v2.1.0/collection.json'}))
+    f.write(', "item": [')
+    for item in items:
+        try:
+            headers = json.loads(item.get('headers') or '{}')
+        except ValueError:
+            headers = {}
+        request = {'method': item.get('method') or 'GET', 'url': item.get('url') or '',
+                   'header': [{'key': k, 'value': str(v)} for k, v in headers.items()]}
+        if item.get('body'):
+            request['body'] = {'mode': 'raw', 'raw': item['body']}
+        f.write((',\n  ' if count else '\n  ') + json.dumps({'name': item.get('name'), 'request': request}))
+        count += 1
+    f.write('\n]}\n')
+    return count
+
+
+def _name_values(pairs):
+    return [{'name': str(k), 'value': str(v)} for k, v in pairs]
+
+
+def har_entry(row):
+    """HAR 1.2 entry for a Storage.iter_history row."""
+    try:
+        headers = json.loads(row.get('headers') or '{}')
+    except ValueError:
+        headers = {}
+    try:
+        timings = json.loads(row.get('timings') or '{}')
+    except ValueError:
+        timings = {}
+    total = row.get('duration_ms') or timings.get('total_ms') or 0
+    # created_at is stamped when the response was stored, i.e. after the request
+    started = (row['created_at'] - timedelta(milliseconds=total)).replace(tzinfo=timezone.utc)
+    body = row.get('body')
+    content_type = next((v for k, v in headers.items() if k.lower() == 'content-type'), '')
+    request = {'method': row['method'], 'url': row['url'], 'httpVersion': 'HTTP/1.1', 'cookies': [],
+               'headers': _name_values(headers.items()), 'queryString': _name_values(parse_qsl(urlsplit(row['url']).query)),
+               'headersSize': -1, 'bodySize': len(body.encode('utf-8')) if body else 0}
+    if body:
+        request['postData'] = {'mimeType': content_type or 'application/octet-stream', 'text': body}
+    size = row.get('response_size')
+    content = {'size': size if size is not None else -1, 'mimeType': ''}
+    if row.get('response') is not None:
+        content['text'] = row['response']
+    return {
+        'startedDateTime': started.isoformat(timespec='milliseconds').replace('+00:00', 'Z'),
+        'time': total,
+        'request': request,
+        'response': {'status': row.get('response_code') or 0, 'statusText': '', 'httpVersion': 'HTTP/1.1',
+                     'cookies': [], 'headers': [], 'content': content, 'redirectURL': '', 'headersSize': -1,
+                     'bodySize': size if size is not None else -1},
+        'cache': {},
+        # HAR wants -1 for phases that did not apply (a reused connection)
+        'timings': {'blocked': -1, 'dns': timings.get('dns_ms') or -1, 'connect': timings.get('connect_ms') or -1,
+                    'ssl': timings.get('tls_ms') or -1, 'send': 0, 'wait': timings.get('ttfb_ms', total),
+                    'receive': timings.get('download_ms', 0)},
+    }
+
+
+def write_har(f, rows, creator='API Tester'):
+    """Write history rows as a HAR 1.2 log, one entry at a time; returns the count."""
+    f.write('{"log": {"version": "1.2", "creator": ' + json.dumps({'name': creator, 'version': '1.0'}))
+    f.write(', "entries": [')
+    count = 0
+    for row in rows:
+        f.write((',\n  ' if count else '\n  ') + json.dumps(har_entry(row)))
+        count += 1
+    f.write('\n]}}\n')
+    return count
+
+
+def import_parser(parser=None):
+    parser = parser or argparse.ArgumentParser(description="Import requests or environments into the database.")
+    parser.add_argument('path')
+    parser.add_argument('--format', choices=READ_FORMATS, help="default: detected from the file")
+    parser.add_argument('--db', default='requests.db')
+    parser.add_argument('--environments', action='store_true', help="import environments instead of requests")
+    parser.add_argument('--collection', help="import into this collection (created if missing) instead of templates")
+    parser.add_argument('--batch-size', type=int, default=1000)
+    return parser
+
+
+def run_import(args):
+    from storage_base import open_storage
+
+    storage = open_storage(args.db)
+    fmt = args.format or detect_format(args.path)
+    with open(args.path, 'r', encoding='utf-8-sig') as f:
+        if args.environments:
+            count = storage.import_environment_items(read_environments(f, fmt), batch_size=args.batch_size)
+        else:
+            collection_id = None
+            if args.collection:
+                existing = next((c for c in storage.get_collections()
+                                 if c.name == args.collection or str(c.id) == args.collection), None)
+                collection_id = existing.id if existing else storage.create_collection(args.collection)
+            count = storage.import_requests(read_requests(f, fmt), collection_id=collection_id,
+                                            batch_size=args.batch_size)
+    print(f"imported {count} {'environments' if args.environments else 'requests'} ({fmt})", file=sys.stderr)
+    return count
+
+
+def export_parser(parser=None):
+    parser = parser or argparse.ArgumentParser(description="Export requests or environments from the database.")
+    parser.add_argument('--format', choices=WRITE_FORMATS, help="default: json (har with --history)")
+    parser.add_argument('--db', default='requests.db')
+    parser.add_argument('--environments', action='store_true', help="export environments instead of requests")
+    parser.add_argument('--collection', help="export this collection instead of the templates")
+    parser.add_argument('--history', action='store_true', help="export request history as HAR")
+    parser.add_argument('--days', type=float, help="with --history: only the last N days")
+    parser.add_argument('--bodies', action='store_true', help="with --history: include response bodies")
+    parser.add_argument('-o', '--output', help="write to a file instead of stdout")
+    return parser
+
+
+def run_export(args):
+    from storage_base import open_storage
+
+    storage = open_storage(args.db)
+    name = 'templates'
+    fmt = args.format or ('har' if args.history else 'json')
+    if (fmt == 'har') != bool(args.history):
+        raise SystemExit("history exports as har, and har exports history")
+    if args.history:
+        since = datetime.utcnow() - timedelta(days=args.days) if args.days else None
+        items = storage.iter_history(since=since, with_bodies=args.bodies)
+    elif args.environments:
+        if fmt == 'postman':
+            raise SystemExit("environments export as json or jsonl")
+        items, name = storage.iter_environments(), 'environments'
+    elif args.collection:
+        coll = next((c for c in storage.get_collections()
+                     if c.name == args.collection or str(c.id) == args.collection), None)
+        if coll is None:
+            raise SystemExit(f"collection {args.collection!r} not found")
+        items, name = storage.iter_requests(collection_id=coll.id), coll.name
+    else:
+        items = storage.iter_requests()
+    out = open(args.output, 'w', encoding='utf-8') if args.output else sys.stdout
+    try:
+        if args.history:
+            return write_har(out, items)
+        return write_items(out, items, fmt, name=name)
+    finally:
+        if out is not sys.stdout:
+            out.close()
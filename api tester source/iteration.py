@@ -0,0 +1,180 @@
+"""Data-driven runs: send one request per row of a CSV, JSONL or JSON array file.
+
+    python cli.py iterate --template 3 -i users.csv -w 8 -o results.jsonl
+    python cli.py iterate "{{BASE}}/users/{{id}}" -i ids.jsonl --var BASE=https://api.local
+
+Rows are read lazily and results are written as they complete (in row
+order), so memory stays bounded by the number of requests in flight.
+"""
+import argparse
+import csv
+import json
+import sys
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from environment import Interpolator, variable_text
+from interchange import JsonStream
+from runner import RequestSpec, resolve_environment, run_one
+
+
+def detect_format(path):
+    lower = path.lower()
+    if lower.endswith(('.jsonl', '.ndjson')):
+        return 'jsonl'
+    if lower.endswith('.json'):
+        # a .json file is usually an array of rows, but may hold one object per line
+        with open(path, 'r', encoding='utf-8-sig') as f:
+            return 'json' if JsonStream(f).peek() == '[' else 'jsonl'
+    return 'csv'
+
+
+def iter_rows(path, fmt=None):
+    """Yield each row of a CSV (header line required), JSONL or JSON array file as a dict."""
+    fmt = fmt or detect_format(path)
+    with open(path, 'r', newline='', encoding='utf-8-sig') as f:
+        if fmt == 'csv':
+            for row in csv.DictReader(f):
+                # short rows get None, overlong rows a None key
+                yield {k: v for k, v in row.items() if k is not None and v is not None}
+            return
+        if fmt == 'json':
+            for index, row in enumerate(JsonStream(f).items()):
+                if not isinstance(row, dict):
+                    raise ValueError(f"{path}: element {index}: expected a JSON object")
+                yield row
+            return
+        for lineno, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            row = json.loads(line)
+            if not isinstance(row, dict):
+                raise ValueError(f"{path}:{lineno}: expected a JSON object per line")
+            yield row
+
+
+def row_variables(row):
+    """Row values as template variables; non-string JSON values are re-encoded."""
+    return {str(k): variable_text(v) for k, v in row.items()}
+
+
+class IterationRunner:
+    """Run one RequestSpec per data row with at most ``workers`` requests in flight.
+
+    Row fields override ``variables`` (the environment) of the same name.
+    """
+
+    def __init__(self, requester, spec, variables=None, workers=4, timeout=30):
+        self.requester = requester
+        self.spec = spec
+        self.variables = dict(variables or {})
+        self.workers = max(1, int(workers))
+        self.timeout = timeout
+
+    def _run_row(self, index, row):
+        env = Interpolator({**self.variables, **row_variables(row)})
+        result = run_one(self.requester, self.spec, env, self.timeout)
+        result['row'] = index
+        return result
+
+    def run(self, rows, on_result=None, should_stop=None, limit=None):
+        """Send a request per row; ``on_result`` gets each result in row order.
+
+        Returns a summary dict. Stops reading rows after ``limit`` rows or
+        once ``should_stop()`` is true; requests already sent still report.
+        """
+        summary = {'rows': 0, 'ok': 0, 'failed': 0}
+        started = time.perf_counter()
+        pending = deque()
+
+        def finish(fut):
+            res = fut.result()
+            summary['ok' if res['ok'] else 'failed'] += 1
+            if on_result:
+                on_result(res)
+
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            try:
+                for index, row in enumerate(rows):
+                    if (limit is not None and index >= limit) or (should_stop is not None and should_stop()):
+                        break
+                    pending.append(pool.submit(self._run_row, index, row))
+                    summary['rows'] += 1
+                    # keep the pool busy without queueing the whole file
+                    while len(pending) >= self.workers * 2 or (pending and pending[0].done()):
+                        finish(pending.popleft())
+            finally:
+                # also when reading a row fails: requests already sent still report
+                while pending:
+                    finish(pending.popleft())
+        summary['elapsed'] = round(time.perf_counter() - started, 3)
+        return summary
+
+
+def build_parser(parser=None):
+    parser = parser or argparse.ArgumentParser(description="Send a request once per row of a CSV/JSONL/JSON file.")
+    parser.add_argument('url', nargs='?', help="URL template (or use --template / --request)")
+    parser.add_argument('-X', '--method', default='GET')
+    parser.add_argument('-H', '--header', action='append', default=[], help="'Name: value', repeatable")
+    parser.add_argument('--data', help="request body template")
+    parser.add_argument('--db', default='requests.db')
+    parser.add_argument('--template', type=int, help="id of a saved Template to run")
+    parser.add_argument('--request', type=int, help="id of a SavedRequest to run")
+    parser.add_argument('-i', '--input', required=True, help="CSV (with header), JSONL or JSON array data file")
+    parser.add_argument('--input-format', choices=['csv', 'jsonl', 'json'], help="default: from the file extension")
+    parser.add_argument('--env', help="environment name (from --env-file or the database)")
+    parser.add_argument('--env-file', help="JSON file produced by Storage.export_environments")
+    parser.add_argument('--var', action='append', default=[], help="KEY=VALUE override, repeatable")
+    parser.add_argument('-w', '--workers', type=int, default=4)
+    parser.add_argument('--limit', type=int, help="stop after this many rows")
+    parser.add_argument('--timeout', type=float, default=30)
+    parser.add_argument('-o', '--output', help="write JSONL results to a file instead of stdout")
+    return parser
+
+
+def run_from_args(args):
+    from requester import Requester
+
+    storage = None
+    if args.template is not None or args.request is not None or (args.env and not args.env_file):
+        from storage_base import open_storage
+        storage = open_storage(args.db)
+    if args.template is not None or args.request is not None:
+        saved = storage.get_template(args.template) if args.template is not None else storage.get_saved_request(args.request)
+        if saved is None:
+            raise SystemExit("saved request not found")
+        spec = RequestSpec.from_row(saved)
+    elif args.url:
+        headers = {}
+        for h in args.header:
+            k, _, v = h.partition(':')
+            headers[k.strip()] = v.strip()
+        spec = RequestSpec(args.url, args.method, args.url, headers, args.data)
+    else:
+        raise SystemExit("a URL, --template or --request is required")
+
+    runner = IterationRunner(Requester(pool_maxsize=max(10, args.workers)), spec,
+                             variables=resolve_environment(args, storage),
+                             workers=args.workers, timeout=args.timeout)
+    out = open(args.output, 'w', encoding='utf-8') if args.output else sys.stdout
+    try:
+        def on_result(res):
+            out.write(json.dumps(res) + '\n')
+        summary = runner.run(iter_rows(args.input, args.input_format), on_result=on_result, limit=args.limit)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+        else:
+            out.flush()
+    print(json.dumps(summary), file=sys.stderr)
+    return summary
+
+
+def main(argv=None):
+    summary = run_from_args(build_parser().parse_args(argv))
+    return 1 if summary['failed'] else 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
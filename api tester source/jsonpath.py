@@ -0,0 +1,100 @@
+"""A small JSONPath subset for pulling values out of response bodies.
+
+Supported: ``$``, ``.key``, ``['key']``, ``[index]`` (negative allowed),
+``[*]`` / ``.*`` and recursive ``..key``. Paths are parsed once by
+``compile_path`` (cached) and then applied with ``JsonPath.find``.
+"""
+import re
+from functools import lru_cache
+
+_STEP_RE = re.compile(
+    r"\.\.(?P<deep>[A-Za-z_$][\w$-]*|\*)"
+    r"|\.(?P<key>[A-Za-z_$][\w$-]*|\*)"
+    r"|\[\s*(?P<index>-?\d+)\s*\]"
+    r"|\[\s*(?P<quote>['\"])(?P<qkey>(?:\\.|(?!(?P=quote)).)*)(?P=quote)\s*\]"
+    r"|\[\s*\*\s*\]"
+)
+
+_WILDCARD = object()
+
+
+class JsonPathError(ValueError):
+    pass
+
+
+class JsonPath:
+    def __init__(self, expr):
+        self.expr = expr
+        self.steps = []
+        text = expr.strip()
+        if text.startswith('$'):
+            text = text[1:]
+        elif text and text[0] not in '.[':
+            text = '.' + text  # allow the "a.b" shorthand
+        pos = 0
+        while pos < len(text):
+            m = _STEP_RE.match(text, pos)
+            if not m:
+                raise JsonPathError(f"invalid JSONPath {expr!r} at {text[pos:]!r}")
+            if m.group('deep') is not None:
+                name = m.group('deep')
+                self.steps.append(('deep', _WILDCARD if name == '*' else name))
+            elif m.group('key') is not None:
+                name = m.group('key')
+                self.steps.append(('child', _WILDCARD if name == '*' else name))
+            elif m.group('index') is not None:
+                self.steps.append(('index', int(m.group('index'))))
+            elif m.group('qkey') is not None:
+                self.steps.append(('child', re.sub(r"\\(.)", r"\1", m.group('qkey'))))
+            else:
+                self.steps.append(('child', _WILDCARD))
+            pos = m.end()
+
+    def find(self, data):
+        """All values matched by the path (an empty list if none)."""
+        current = [data]
+        for kind, arg in self.steps:
+            nxt = []
+            for node in current:
+                if kind == 'child':
+                    _children(node, arg, nxt)
+                elif kind == 'index':
+                    if isinstance(node, list) and -len(node) <= arg < len(node):
+                        nxt.append(node[arg])
+                else:
+                    _descend(node, arg, nxt)
+            current = nxt
+            if not current:
+                break
+        return current
+
+    def first(self, data, default=None):
+        found = self.find(data)
+        return found[0] if found else default
+
+
+def _children(node, name, out):
+    if name is _WILDCARD:
+        if isinstance(node, dict):
+            out.extend(node.values())
+        elif isinstance(node, list):
+            out.extend(node)
+    elif isinstance(node, dict) and name in node:
+        out.append(node[name])
+
+
+def _descend(node, name, out):
+    _children(node, name, out)
+    if isinstance(node, dict):
+        children = node.values()
+    elif isinstance(node, list):
+        children = node
+    else:
+        return
+    for child in children:
+        _descend(child, name, out)
+
+
+@lru_cache(maxsize=1024)
+def compile_path(expr):
+    return JsonPath(expr)
@@ -0,0 +1,306 @@
+"""Load-run a single request at a target concurrency or arrival rate.
+
+Usable from the UI (App's "Load Test" dialog) and headlessly:
+
+    python loadtest.py https://api.local/orders -c 20 -d 30
+    python loadtest.py --db requests.db --template 3 --rate 200 -d 60
+"""
+import argparse
+import json
+import queue
+import threading
+import time
+from histogram import LatencyHistogram
+from assertions import ResponseContext, compile_assertions, status_ok
+from environment import Interpolator, parse_headers
+
+
+class LoadReport:
+    """Aggregated outcome of a load run."""
+
+    def __init__(self):
+        self.histogram = LatencyHistogram()
+        self.requests = 0
+        self.errors = 0
+        self.status_counts = {}
+        self.error_messages = {}
+        self.failed_assertions = 0  # responses with at least one failing check
+        self.assertion_failures = {}  # check description -> failures
+        self.elapsed = 0.0
+        self._lock = threading.Lock()
+
+    def add_response(self, status_code, latency, ok=None):
+        """Record one response; ``ok`` defaults to status_code < 400."""
+        self.histogram.record(latency)
+        with self._lock:
+            self.requests += 1
+            self.status_counts[status_code] = self.status_counts.get(status_code, 0) + 1
+            if not (status_code < 400 if ok is None else ok):
+                self.errors += 1
+
+    def add_assertion_failures(self, results):
+        """Record the failing entries of AssertionSet.evaluate() for one response."""
+        with self._lock:
+            self.failed_assertions += 1
+            for desc, msg in results:
+                if msg is not None:
+                    self.assertion_failures[desc] = self.assertion_failures.get(desc, 0) + 1
+
+    def add_error(self, exc):
+        with self._lock:
+            self.requests += 1
+            self.errors += 1
+            key = type(exc).__name__
+            self.error_messages[key] = self.error_messages.get(key, 0) + 1
+
+    @property
+    def throughput(self):
+        return self.requests / self.elapsed if self.elapsed else 0.0
+
+    @property
+    def error_rate(self):
+        return self.errors / self.requests if self.requests else 0.0
+
+    def summary(self):
+        h = self.histogram
+        return {
+            'requests': self.requests,
+            'errors': self.errors,
+            'error_rate': round(self.error_rate, 4),
+            'elapsed_s': round(self.elapsed, 3),
+            'throughput_rps': round(self.throughput, 2),
+            'latency_ms': {
+                'mean': round(h.mean, 2),
+                'p50': round(h.percentile(50), 2),
+                'p90': round(h.percentile(90), 2),
+                'p99': round(h.percentile(99), 2),
+                'max': round(h.max, 2),
+            },
+            'status_codes': {str(k): v for k, v in sorted(self.status_counts.items())},
+            'exceptions': dict(self.error_messages),
+            'failed_assertions': self.failed_assertions,
+            'assertion_failures': dict(self.assertion_failures),
+        }
+
+    def format(self):
+        s = self.summary()
+        lat = s['latency_ms']
+        lines = [
+            f"Requests:   {s['requests']} in {s['elapsed_s']:.2f}s ({s['throughput_rps']:.1f} req/s)",
+            f"Errors:     {s['errors']} ({s['error_rate'] * 100:.2f}%)",
+            f"Latency ms: p50 {lat['p50']:.2f}  p90 {lat['p90']:.2f}  p99 {lat['p99']:.2f}  max {lat['max']:.2f}  mean {lat['mean']:.2f}",
+        ]
+        if s['status_codes']:
+            lines.append("Status:     " + ", ".join(f"{k}: {v}" for k, v in s['status_codes'].items()))
+        if s['exceptions']:
+            lines.append("Exceptions: " + ", ".join(f"{k}: {v}" for k, v in s['exceptions'].items()))
+        if s['failed_assertions']:
+            lines.append(f"Assertions: {s['failed_assertions']} responses failed")
+            lines.extend(f"  {v:>8}  {k}" for k, v in s['assertion_failures'].items())
+        return "\n".join(lines)
+
+
+class LoadRunner:
+    """Fire one request repeatedly and collect a LoadReport.
+
+    Two modes:
+    - closed loop (rate=None): ``concurrency`` workers send back-to-back
+    - open loop (rate=N): requests are scheduled at N per second and handed
+      to ``concurrency`` workers; latency is measured from the scheduled
+      start, so a backed-up server is not hidden by delayed sends
+
+    The run stops after ``duration`` seconds, after ``total`` requests, or
+    when ``should_stop()`` returns True -- whichever comes first.
+
+    URL, header values and body may contain ``{{VAR}}`` tokens, rendered
+    against ``variables``. Templates without dynamic values (``{{$uuid}}``,
+    ``{{$timestamp}}``...) are rendered once; the rest on every request.
+    ``assertions`` (definitions or an AssertionSet) are checked on every
+    response in the worker that received it.
+    """
+
+    def __init__(self, requester, method, url, headers=None, body=None,
+                 concurrency=10, rate=None, duration=None, total=None, timeout=30, variables=None,
+                 assertions=None):
+        if duration is None and total is None:
+            raise ValueError("duration or total is required")
+        self.requester = requester
+        self.method = method
+        self.env = variables if isinstance(variables, Interpolator) else Interpolator(variables)
+        raw_headers = {str(k): str(v) for k, v in parse_headers(headers).items()}
+        self.url = self.env.render(url)
+        self.headers = {self.env.render(k): self.env.render(v) for k, v in raw_headers.items()}
+        self.body = self.env.render(body) or None
+        # keep the raw templates only if something must change per request
+        self._dynamic = any(self.env.is_dynamic(t) for t in (url, body, *raw_headers, *raw_headers.values()))
+        self._raw = (url, raw_headers, body)
+        self.assertions = compile_assertions(assertions)
+        self.concurrency = max(1, int(concurrency))
+        self.rate = rate
+        self.duration = duration
+        self.total = total
+        self.timeout = timeout
+
+    @classmethod
+    def from_saved(cls, requester, saved, **kwargs):
+        """Build a runner from a SavedRequest or Template row."""
+        kwargs.setdefault('assertions', getattr(saved, 'assertions', None))
+        return cls(requester, saved.method, saved.url, headers=saved.headers, body=saved.body, **kwargs)
+
+    def run(self, should_stop=None):
+        report = LoadReport()
+        self._issued = 0
+        self._issue_lock = threading.Lock()
+        self._deadline = time.perf_counter() + self.duration if self.duration else None
+        self._should_stop = should_stop or (lambda: False)
+        started = time.perf_counter()
+        if self.rate:
+            self._run_open(report)
+        else:
+            self._run_closed(report)
+        report.elapsed = time.perf_counter() - started
+        return report
+
+    def _stopped(self):
+        if self._deadline is not None and time.perf_counter() >= self._deadline:
+            return True
+        return self._should_stop()
+
+    def _claim(self):
+        """Reserve the next request slot; False once ``total`` is reached."""
+        with self._issue_lock:
+            if self.total is not None and self._issued >= self.total:
+                return False
+            self._issued += 1
+            return True
+
+    def _render(self):
+        """(url, headers, body) for the next request."""
+        if not self._dynamic:
+            return self.url, self.headers, self.body
+        url, headers, body = self._raw
+        render = self.env.render
+        return render(url), {render(k): render(v) for k, v in headers.items()}, render(body) or None
+
+    def _send_once(self, report, scheduled):
+        try:
+            url, headers, body = self._render()
+            sent = time.perf_counter()
+            resp = self.requester.send(self.method, url, headers=headers, data=body, timeout=self.timeout)
+            done = time.perf_counter()
+            report.add_response(resp.status_code, done - scheduled, status_ok(self.assertions, resp.status_code))
+            if self.assertions is not None:
+                # the latency SLO applies to the request itself, not queueing delay
+                results = self.assertions.evaluate(ResponseContext.from_response(resp, done - sent))
+                if any(msg is not None for _, msg in results):
+                    report.add_assertion_failures(results)
+        except Exception as e:
+            report.add_error(e)
+
+    def _run_closed(self, report):
+        def worker():
+            while not self._stopped() and self._claim():
+                self._send_once(report, time.perf_counter())
+
+        self._join_all([threading.Thread(target=worker, daemon=True) for _ in range(self.concurrency)])
+
+    def _run_open(self, report):
+        slots = queue.Queue()
+        done = object()
+
+        def worker():
+            while True:
+                scheduled = slots.get()
+                if scheduled is done:
+                    return
+                if not self._should_stop():
+                    self._send_once(report, scheduled)
+
+        threads = [threading.Thread(target=worker, daemon=True) for _ in range(self.concurrency)]
+        for t in threads:
+            t.start()
+        interval = 1.0 / self.rate
+        next_at = time.perf_counter()
+        while not self._stopped() and self._claim():
+            delay = next_at - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            slots.put(next_at)
+            next_at += interval
+        for _ in threads:
+            slots.put(done)
+        for t in threads:
+            t.join()
+
+    @staticmethod
+    def _join_all(threads):
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+
+def build_parser(parser=None):
+    parser = parser or argparse.ArgumentParser(description="Load-run a request and report latency percentiles.")
+    parser.add_argument('url', nargs='?', help="URL to hit (or use --template / --request)")
+    parser.add_argument('-X', '--method', default='GET')
+    parser.add_argument('-H', '--header', action='append', default=[], help="'Name: value', repeatable")
+    parser.add_argument('--data', help="request body")
+    parser.add_argument('--db', default='requests.db', help="storage database for --template/--request")
+    parser.add_argument('--template', type=int, help="id of a saved Template to run")
+    parser.add_argument('--request', type=int, help="id of a SavedRequest to run")
+    parser.add_argument('-c', '--concurrency', type=int, default=10)
+    parser.add_argument('-r', '--rate', type=float, help="fixed arrival rate in requests/second")
+    parser.add_argument('-d', '--duration', type=float, help="seconds to run")
+    parser.add_argument('-n', '--total', type=int, help="number of requests to send")
+    parser.add_argument('--timeout', type=float, default=30)
+    parser.add_argument('--var', action='append', default=[], help="KEY=VALUE for {{KEY}} tokens, repeatable")
+    parser.add_argument('--json', action='store_true', help="print the report as JSON")
+    return parser
+
+
+def run_from_args(args):
+    from requester import Requester
+
+    if args.duration is None and args.total is None:
+        args.duration = 10
+    requester = Requester(pool_maxsize=max(10, args.concurrency))
+    variables = dict(kv.partition('=')[::2] for kv in args.var)
+    opts = dict(concurrency=args.concurrency, rate=args.rate, duration=args.duration,
+                total=args.total, timeout=args.timeout, variables=variables)
+    if args.template is not None or args.request is not None:
+        from storage_base import open_storage
+
+        storage = open_storage(args.db)
+        if args.template is not None:
+            saved = storage.get_template(args.template)
+        else:
+            saved = storage.get_saved_request(args.request)
+        if saved is None:
+            raise SystemExit("saved request not found")
+        runner = LoadRunner.from_saved(requester, saved, **opts)
+    elif args.url:
+        headers = {}
+        for h in args.header:
+            k, _, v = h.partition(':')
+            headers[k.strip()] = v.strip()
+        runner = LoadRunner(requester, args.method, args.url, headers=headers, body=args.data, **opts)
+    else:
+        raise SystemExit("a URL, --template or --request is required")
+    report = runner.run()
+    print(json.dumps(report.summary(), indent=2) if args.json else report.format())
+    return report
+
+
+def exit_code(report):
+    """1 if any request errored or failed its assertions, else 0."""
+    return 1 if report.errors or report.failed_assertions else 0
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    return exit_code(run_from_args(args))
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
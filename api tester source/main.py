@@ -0,0 +1,43 @@
+"""Desktop app entry point (built into the packaged app by main.spec).
+
+Only tkinter, customtkinter and the UI modules load before the window is
+shown; storage, requests and the response cache are imported in the
+background once it is up (App._finish_startup). ``--timing`` prints how
+long each step took; ``--startup-report`` prints an import-time report
+and fails when startup imports go over budget (see startup.py).
+
+    python main.py
+    python main.py --timing
+    python main.py --startup-report --budget-ms 200
+"""
+import sys
+import time
+
+STARTED = time.perf_counter()
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else list(argv)
+    if '--startup-report' in argv:
+        import startup
+        return startup.main([a for a in argv if a != '--startup-report'])
+    timing = '--timing' in argv
+
+    import ui
+    imported = time.perf_counter()
+
+    def on_ready(app):
+        if timing:
+            marks = app.startup_marks
+            steps = [('import', imported), ('built', marks['built']), ('window', marks.get('window')),
+                     ('ready', marks['ready'])]
+            print("startup: " + ", ".join(f"{name} {(at - STARTED) * 1000:.0f} ms"
+                                          for name, at in steps if at is not None), file=sys.stderr)
+
+    app = ui.App(on_ready=on_ready)
+    app.mainloop()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
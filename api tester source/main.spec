@@ -5,8 +5,8 @@ a = Analysis(
     ['main.py'],
     pathex=[],
     binaries=[],
-    datas=[('requests.db', '.'), ('ui.py', '.'), ('db.py', '.'), ('hover_button.py', '.'), ('loading_spinner.py', '.'), ('method_selector.py', '.'), ('modern_widgets.py', '.'), ('requester.py', '.'), ('storage.py', '.')],
-    hiddenimports=[],
+    datas=[('requests.db', '.'), ('ui.py', '.'), ('db.py', '.'), ('hover_button.py', '.'), ('loading_spinner.py', '.'), ('method_selector.py', '.'), ('modern_widgets.py', '.'), ('requester.py', '.'), ('storage.py', '.'), ('storage_base.py', '.'), ('sqlite_storage.py', '.')],
+    hiddenimports=['sqlite_storage'],
     hookspath=[],
     hooksconfig={},
     runtime_hooks=[],
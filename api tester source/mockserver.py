@@ -0,0 +1,352 @@
+"""Local mock HTTP server that answers with recorded responses.
+
+Routes come from request history (the latest response per method and
+path), from a collection (each saved request answered with the latest
+matching history response, or 200 ``{}``) or from a HAR capture (recorded
+status, headers and body). Path segments written as ``{{var}}``, ``{var}``
+or ``:var`` match any single segment; the query string is ignored.
+
+Responses are serialized once, when the server starts, and written from an
+asyncio.Protocol (on uvloop when installed), so one process serves tens of
+thousands of keep-alive requests per second. ``latency_ms``/``jitter_ms``
+delay responses (keeping their order on each connection) and
+``error_rate`` answers that fraction of requests with ``error_status``;
+``seed`` makes the injected errors and jitter repeatable.
+
+    python cli.py mock --history --port 8081 --latency-ms 20 --error-rate 0.01
+    python cli.py mock --collection Orders --port 8081
+    python cli.py mock --har capture.har
+"""
+import argparse
+import asyncio
+import json
+import random
+import re
+import threading
+from http import HTTPStatus
+from urllib.parse import urlsplit
+from interchange import JsonStream
+
+try:
+    import uvloop  # optional: faster event loop
+except ImportError:
+    uvloop = None
+
+# response headers that describe the original transfer, not the stored body
+_SKIP_HEADERS = frozenset(('content-length', 'transfer-encoding', 'connection', 'content-encoding', 'keep-alive'))
+_VAR_SEGMENT_RE = re.compile(r'^(\{\{[^{}]+\}\}|\{[^{}]+\}|:\w+)$')
+_LEADING_VAR_RE = re.compile(r'^\{\{[^{}]+\}\}')
+MAX_HEADER_BYTES = 64 * 1024
+
+
+class MockRoute:
+    def __init__(self, method, path, status=200, headers=None, body=''):
+        self.method = (method or 'GET').upper()
+        self.path = path or '/'
+        self.status = status or 200
+        self.headers = dict(headers or {})
+        self.body = body.encode('utf-8') if isinstance(body, str) else (body or b'')
+        segments = self.path.split('/')
+        self.pattern = None
+        if any(_VAR_SEGMENT_RE.match(s) for s in segments):
+            self.pattern = re.compile('^' + '/'.join('[^/]+' if _VAR_SEGMENT_RE.match(s) else re.escape(s)
+                                                     for s in segments) + '$')
+
+    def matches(self, method, path):
+        if method != self.method:
+            return False
+        return self.pattern.match(path) is not None if self.pattern else path == self.path
+
+
+def path_of(url):
+    """Path of a URL that may start with a variable (``{{baseUrl}}/orders``)."""
+    url = _LEADING_VAR_RE.sub('', url or '', count=1)
+    if '://' in url:
+        return urlsplit(url).path or '/'
+    path = url.split('?', 1)[0].split('#', 1)[0]
+    return path if path.startswith('/') else '/' + path
+
+
+def _guess_type(body):
+    text = (body or '').lstrip()
+    return 'application/json' if text[:1] in ('{', '[') else 'text/plain; charset=utf-8'
+
+
+def routes_from_history(rows):
+    """Routes from Storage.iter_history(with_bodies=True) rows; later rows win."""
+    routes = {}
+    for row in rows:
+        route = MockRoute(row['method'], path_of(row['url']), row['response_code'],
+                          {'Content-Type': _guess_type(row.get('response'))}, row.get('response') or '')
+        routes[(route.method, route.path)] = route
+    return list(routes.values())
+
+
+def routes_from_collection(requests, history_rows=()):
+    """One route per saved request, answered with its latest matching history response."""
+    routes = [MockRoute(r.method, path_of(r.url), 200, {'Content-Type': 'application/json'}, '{}') for r in requests]
+    for row in history_rows:
+        method, path = (row['method'] or 'GET').upper(), path_of(row['url'])
+        for route in routes:
+            if route.matches(method, path):
+                body = row.get('response') or ''
+                route.status = row['response_code'] or 200
+                route.headers = {'Content-Type': _guess_type(body)}
+                route.body = body.encode('utf-8')
+    return routes
+
+
+def routes_from_har(f):
+    """Routes from the recorded responses of a HAR file; later entries win."""
+    stream = JsonStream(f)
+    routes = {}
+    if stream.enter('log', 'entries'):
+        for entry in stream.items():
+            req, resp = entry.get('request') or {}, entry.get('response') or {}
+            content = resp.get('content') or {}
+            body = content.get('text') or ''
+            if content.get('encoding') == 'base64':
+                import base64
+                body = base64.b64decode(body)
+            headers = {h['name']: h.get('value', '') for h in resp.get('headers') or [] if h.get('name')}
+            if content.get('mimeType') and not any(k.lower() == 'content-type' for k in headers):
+                headers['Content-Type'] = content['mimeType']
+            route = MockRoute(req.get('method'), path_of(req.get('url')), resp.get('status') or 200, headers, body)
+            routes[(route.method, route.path)] = route
+    return list(routes.values())
+
+
+def _serialize(status, headers, body):
+    try:
+        reason = HTTPStatus(status).phrase
+    except ValueError:
+        reason = ''
+    lines = [f"HTTP/1.1 {status} {reason}"]
+    lines += [f"{k}: {v}" for k, v in headers.items() if k.lower() not in _SKIP_HEADERS]
+    lines.append(f"Content-Length: {len(body)}")
+    return ('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1', errors='replace') + body
+
+
+class MockServer:
+    def __init__(self, routes, host='127.0.0.1', port=0, latency_ms=0, jitter_ms=0, error_rate=0.0,
+                 error_status=500, seed=None):
+        self.host = host
+        self.port = port
+        self.latency = latency_ms / 1000
+        self.jitter = jitter_ms / 1000
+        self.error_rate = error_rate
+        self.random = random.Random(seed)
+        self.exact = {}
+        self.patterns = []
+        for route in routes:
+            data = _serialize(route.status, route.headers, route.body)
+            key = (route.method.encode('ascii'), route.path.encode('utf-8'))
+            if route.pattern is None:
+                self.exact.setdefault(key, data)
+            else:
+                self.patterns.append((route, data))
+        self.not_found = _serialize(404, {'Content-Type': 'application/json'},
+                                    json.dumps({'error': 'no mock route'}).encode())
+        self.error = _serialize(error_status, {'Content-Type': 'application/json'},
+                                json.dumps({'error': 'injected failure'}).encode())
+        self.stats = {'requests': 0, 'unmatched': 0, 'injected_errors': 0}
+        self._server = None
+        self._loop = None
+        self._thread = None
+
+    @property
+    def url(self):
+        return f"http://{self.host}:{self.port}"
+
+    def response_for(self, method, target):
+        self.stats['requests'] += 1
+        if self.error_rate and self.random.random() < self.error_rate:
+            self.stats['injected_errors'] += 1
+            return self.error
+        path = target.split(b'?', 1)[0]
+        data = self.exact.get((method, path))
+        if data is None:
+            text_method, text_path = method.decode('ascii', 'replace'), path.decode('utf-8', 'replace')
+            data = next((d for route, d in self.patterns if route.matches(text_method, text_path)), None)
+            if data is None:
+                self.stats['unmatched'] += 1
+                return self.not_found
+        return data
+
+    def delay(self):
+        if not self.jitter:
+            return self.latency
+        return self.latency + self.random.uniform(0, self.jitter)
+
+    async def start(self):
+        loop = asyncio.get_running_loop()
+        self._loop = loop
+        self._server = await loop.create_server(lambda: _MockProtocol(self), self.host, self.port, reuse_address=True)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self.url
+
+    async def serve_forever(self):
+        if self._server is None:
+            await self.start()
+        async with self._server:
+            await self._server.serve_forever()
+
+    def start_in_thread(self):
+        """Serve from a daemon thread with its own event loop; returns the base URL."""
+        started = threading.Event()
+        errors = []
+
+        def run():
+            loop = uvloop.new_event_loop() if uvloop is not None else asyncio.new_event_loop()
+            asyncio.set_event_loop(loop)
+            try:
+                loop.run_until_complete(self.start())
+            except Exception as e:
+                errors.append(e)
+                started.set()
+                return
+            started.set()
+            try:
+                loop.run_forever()
+            finally:
+                self._server.close()
+                loop.run_until_complete(self._server.wait_closed())
+                loop.close()
+
+        self._thread = threading.Thread(target=run, name='mock-server', daemon=True)
+        self._thread.start()
+        started.wait()
+        if errors:
+            raise errors[0]
+        return self.url
+
+    def stop(self):
+        if self._thread is not None and self._loop is not None:
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join()
+            self._thread = None
+
+
+class _MockProtocol(asyncio.Protocol):
+    """HTTP/1.1 with keep-alive and pipelining; request bodies need Content-Length."""
+
+    def __init__(self, server):
+        self.server = server
+        self.transport = None
+        self.buf = b''
+        self.ready_at = 0.0  # keeps delayed responses in request order
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def data_received(self, data):
+        self.buf += data
+        while self.buf:
+            end = self.buf.find(b'\r\n\r\n')
+            if end < 0:
+                if len(self.buf) > MAX_HEADER_BYTES:
+                    self.transport.close()
+                return
+            head = self.buf[:end]
+            lower = head.lower()
+            length = 0
+            at = lower.find(b'\r\ncontent-length:')
+            if at >= 0:
+                stop = lower.find(b'\r\n', at + 2)
+                length = int(lower[at + 17:stop if stop >= 0 else len(lower)].strip() or 0)
+            elif b'\r\ntransfer-encoding:' in lower:
+                self._send(_serialize(411, {}, b''), True)
+                return
+            total = end + 4 + length
+            if len(self.buf) < total:
+                return
+            self.buf = self.buf[total:]
+            line_end = head.find(b'\r\n')
+            parts = (head if line_end < 0 else head[:line_end]).split(b' ')
+            if len(parts) != 3:
+                self._send(_serialize(400, {}, b''), True)
+                return
+            close = b'\r\nconnection: close' in lower or parts[2] == b'HTTP/1.0'
+            self._send(self.server.response_for(parts[0], parts[1]), close)
+            if close:
+                return
+
+    def _send(self, data, close):
+        delay = self.server.delay()
+        if delay <= 0 and not self.ready_at:
+            self._write(data, close)
+            return
+        loop = self.server._loop or asyncio.get_event_loop()
+        self.ready_at = max(loop.time() + delay, self.ready_at)
+        loop.call_at(self.ready_at, self._write, data, close)
+
+    def _write(self, data, close):
+        if self.transport.is_closing():
+            return
+        self.transport.write(data)
+        if close:
+            self.transport.close()
+
+
+def build_parser(parser=None):
+    parser = parser or argparse.ArgumentParser(description="Serve recorded responses from a local mock server.")
+    src = parser.add_mutually_exclusive_group(required=True)
+    src.add_argument('--history', action='store_true', help="latest history response per method and path")
+    src.add_argument('--collection', help="collection name or id; answers come from matching history")
+    src.add_argument('--har', help="HAR file with recorded responses")
+    parser.add_argument('--db', default='requests.db')
+    parser.add_argument('--days', type=float, help="only use history from the last N days")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8081)
+    parser.add_argument('--latency-ms', type=float, default=0)
+    parser.add_argument('--jitter-ms', type=float, default=0, help="extra random delay up to this much")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="fraction of requests answered with an error")
+    parser.add_argument('--error-status', type=int, default=500)
+    parser.add_argument('--seed', type=int, help="seed for injected errors and jitter")
+    return parser
+
+
+def load_routes(args):
+    if args.har:
+        with open(args.har, 'r', encoding='utf-8-sig') as f:
+            return routes_from_har(f)
+    from datetime import datetime, timedelta
+    from storage_base import open_storage
+
+    storage = open_storage(args.db)
+    since = datetime.utcnow() - timedelta(days=args.days) if args.days else None
+    history = storage.iter_history(since=since, with_bodies=True)
+    if args.history:
+        return routes_from_history(history)
+    coll = next((c for c in storage.get_collections()
+                 if c.name == args.collection or str(c.id) == args.collection), None)
+    if coll is None:
+        raise SystemExit(f"collection {args.collection!r} not found")
+    return routes_from_collection(storage.get_collection_requests(coll.id), history)
+
+
+def run_from_args(args):
+    routes = load_routes(args)
+    server = MockServer(routes, host=args.host, port=args.port, latency_ms=args.latency_ms, jitter_ms=args.jitter_ms,
+                        error_rate=args.error_rate, error_status=args.error_status, seed=args.seed)
+
+    async def serve():
+        await server.start()
+        print(f"mock server with {len(routes)} routes on {server.url}", flush=True)
+        await server.serve_forever()
+
+    runner = uvloop.run if uvloop is not None else asyncio.run
+    try:
+        runner(serve())
+    except KeyboardInterrupt:
+        pass
+    return server.stats
+
+
+def main(argv=None):
+    run_from_args(build_parser().parse_args(argv))
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
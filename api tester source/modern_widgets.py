@@ -21,11 +21,34 @@ class ModernEntry(ctk.CTkEntry):
         self.configure(border_color=self.default_border)
         
 class SearchEntry(ModernEntry):
-    def __init__(self, *args, command=None, **kwargs):
+    """Entry that calls ``command`` on Return and ``on_change(text)`` while typing.
+
+    ``on_change`` is debounced: it runs once typing pauses for ``delay`` ms.
+    """
+    def __init__(self, *args, command=None, on_change=None, delay=200, **kwargs):
         super().__init__(*args, **kwargs)
         self.command = command
+        self.on_change = on_change
+        self.delay = delay
+        self._pending = None
+        self._last_text = ""
         self.bind("<Return>", self._on_return)
+        self.bind("<KeyRelease>", self._on_key_release)
         
     def _on_return(self, event):
         if self.command:
-            self.command()
\ No newline at end of file
+            self.command()
+
+    def _on_key_release(self, event):
+        if not self.on_change:
+            return
+        if self._pending is not None:
+            self.after_cancel(self._pending)
+        self._pending = self.after(self.delay, self._fire_change)
+
+    def _fire_change(self):
+        self._pending = None
+        text = self.get()
+        if text != self._last_text:
+            self._last_text = text
+            self.on_change(text)
\ No newline at end of file
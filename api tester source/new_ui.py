@@ -7,10 +7,7 @@ from pathlib import Path
 from functools import partial
 from tkinter import ttk, filedialog, messagebox, scrolledtext, Canvas
 import customtkinter as ctk
-import requests
-from pygments import lex
-from pygments.lexers import JsonLexer
-from pygments.token import Token
+from highlighter import JSON_TAG_STYLES
 
 APP_TITLE = "HTTPie-like — Gradient Edition"
 DB_FILE = "httpie_like_data.db"
@@ -140,11 +137,7 @@ def parse_kv_or_json(text: str) -> dict:
 
 # ---------- JSON highlighting ----------
 JSON_TAGS = {
-    "json_key": {"foreground": "#9CDCFE"},
-    "json_string": {"foreground": "#CE9178"},
-    "json_number": {"foreground": "#B5CEA8"},
-    "json_bool": {"foreground": "#569CD6"},
-    "json_null": {"foreground": "#569CD6"},
+    **JSON_TAG_STYLES,
     "status": {"foreground": "#00D084", "font": ("Helvetica", 10, "bold")},
 }
 
@@ -0,0 +1,253 @@
+"""Replay captured traffic (a HAR file or stored history) with its original timing.
+
+Entries are sent at their original offsets from the first request, divided
+by ``speed`` (2 = twice as fast, 0 = as fast as possible), by up to
+``concurrency`` workers. ``target`` swaps the scheme and host of every URL
+so a capture from production can be replayed against staging. Each result
+carries the original status and duration next to the replayed ones, and
+the summary compares latency percentiles of the capture and the replay.
+
+    python cli.py replay capture.har --target https://staging.api.local --speed 2 -c 16
+    python cli.py replay --history --days 1 --speed 0 --record -o replay.jsonl
+"""
+import argparse
+import json
+import queue
+import threading
+import time
+from datetime import datetime, timedelta
+from urllib.parse import urlsplit, urlunsplit
+from histogram import LatencyHistogram
+from interchange import JsonStream, har_request
+from metrics import SKETCH_BITS, summarize
+from timing import RequestTimings
+
+
+class ReplayEntry:
+    """One request to replay, ``offset`` seconds after the first one."""
+
+    def __init__(self, offset, method, url, headers=None, body=None, status=None, duration_ms=None):
+        self.offset = offset
+        self.method = method
+        self.url = url
+        self.headers = headers or {}
+        self.body = body
+        self.status = status
+        self.duration_ms = duration_ms
+
+
+def _parse_started(text):
+    try:
+        return datetime.fromisoformat(text.replace('Z', '+00:00')).timestamp()
+    except (AttributeError, ValueError):
+        return None
+
+
+def _relative(stamped):
+    """ReplayEntry list from [(start seconds or None, entry)], ordered by offset."""
+    starts = [s for s, _ in stamped if s is not None]
+    first = min(starts) if starts else 0.0
+    entries = []
+    for start, entry in stamped:
+        # entries without a usable timestamp go out right after the previous one
+        entry.offset = start - first if start is not None else (entries[-1].offset if entries else 0.0)
+        entries.append(entry)
+    entries.sort(key=lambda e: e.offset)  # stable: ties keep capture order
+    return entries
+
+
+def read_har_entries(f):
+    """ReplayEntry list from an open HAR file, parsed one entry at a time."""
+    stream = JsonStream(f)
+    if not stream.enter('log', 'entries'):
+        return []
+    stamped = []
+    for entry in stream.items():
+        method, url, headers, body = har_request(entry)
+        status = (entry.get('response') or {}).get('status') or None
+        duration = entry.get('time')
+        stamped.append((_parse_started(entry.get('startedDateTime')),
+                        ReplayEntry(0.0, method, url, headers, body, status,
+                                    duration if duration is not None and duration >= 0 else None)))
+    return _relative(stamped)
+
+
+def history_entries(rows):
+    """ReplayEntry list from Storage.iter_history rows."""
+    stamped = []
+    for row in rows:
+        try:
+            headers = json.loads(row['headers'] or '{}')
+        except ValueError:
+            headers = {}
+        duration = row['duration_ms']
+        # created_at is stamped after the response arrived
+        start = row['created_at'] - timedelta(milliseconds=duration or 0)
+        stamped.append(((start - datetime(1970, 1, 1)).total_seconds(),
+                        ReplayEntry(0.0, row['method'], row['url'], headers, row['body'],
+                                    row['response_code'], duration)))
+    return _relative(stamped)
+
+
+class ReplayRunner:
+    """Send ``entries`` on their original schedule and compare with the capture."""
+
+    def __init__(self, requester, entries, speed=1.0, concurrency=8, timeout=30, target=None, record=None):
+        self.requester = requester
+        self.entries = entries
+        self.speed = speed or 0
+        self.concurrency = max(1, int(concurrency))
+        self.timeout = timeout
+        self.target = urlsplit(target) if target else None
+        # Storage to add replayed requests to (so trends can compare builds)
+        self.record = record
+
+    def _url(self, url):
+        if self.target is None:
+            return url
+        parts = urlsplit(url)
+        path = self.target.path.rstrip('/') + parts.path
+        return urlunsplit((self.target.scheme, self.target.netloc, path, parts.query, parts.fragment))
+
+    def _send(self, index, entry, due):
+        url = self._url(entry.url)
+        result = {'index': index, 'method': entry.method, 'url': url, 'status': None,
+                  'original_status': entry.status, 'original_ms': entry.duration_ms, 'error': None}
+        timings = RequestTimings()
+        sent = time.perf_counter()
+        result['lag_ms'] = round((sent - due) * 1000, 2)
+        try:
+            resp = self.requester.send(entry.method, url, headers=entry.headers, data=entry.body,
+                                       timeout=self.timeout, timings=timings)
+            result['status'] = resp.status_code
+            result['size'] = len(resp.content or b'')
+            if self.record is not None:
+                self.record.queue_history(entry.method, url, json.dumps(entry.headers), entry.body, resp.status_code,
+                                          resp.text, timings=json.dumps(timings.as_dict()),
+                                          duration_ms=timings.total * 1000, response_size=result['size'])
+        except Exception as e:
+            result['error'] = f"{type(e).__name__}: {e}"
+        result['duration_ms'] = round((time.perf_counter() - sent) * 1000, 2)
+        result['ok'] = result['error'] is None and (entry.status is None or entry.status == result['status'])
+        return result
+
+    def run(self, on_result=None, should_stop=None):
+        """Replay every entry; returns a summary. ``on_result`` is called from worker threads."""
+        should_stop = should_stop or (lambda: False)
+        slots = queue.Queue(maxsize=self.concurrency * 2)
+        done = object()
+        lock = threading.Lock()
+        replayed, original = LatencyHistogram(SKETCH_BITS), LatencyHistogram(SKETCH_BITS)
+        totals = {'count': 0, 'errors': 0, 'status_mismatches': 0, 'bytes': 0, 'max_lag_ms': 0.0}
+        writer = self.record.history_writer if self.record is not None else None
+        dropped_before = writer.dropped if writer is not None else 0
+
+        def worker():
+            while True:
+                slot = slots.get()
+                if slot is done:
+                    return
+                if should_stop():
+                    continue
+                result = self._send(*slot)
+                with lock:
+                    totals['count'] += 1
+                    totals['max_lag_ms'] = max(totals['max_lag_ms'], result['lag_ms'])
+                    if result['error'] is not None:
+                        totals['errors'] += 1
+                    else:
+                        replayed.record(result['duration_ms'] / 1000)
+                        totals['bytes'] += result['size']
+                        if result['original_status'] is not None and result['status'] != result['original_status']:
+                            totals['status_mismatches'] += 1
+                    if on_result:
+                        on_result(result)
+
+        threads = [threading.Thread(target=worker, daemon=True) for _ in range(self.concurrency)]
+        for t in threads:
+            t.start()
+        started = time.perf_counter()
+        for index, entry in enumerate(self.entries):
+            due = started + entry.offset / self.speed if self.speed else time.perf_counter()
+            # sleep in short slices so a stop request is noticed during long gaps
+            while not should_stop() and due - time.perf_counter() > 0:
+                time.sleep(min(due - time.perf_counter(), 0.1))
+            if should_stop():
+                break
+            if entry.duration_ms is not None:
+                original.record(entry.duration_ms / 1000)
+            slots.put((index, entry, due))
+        for _ in threads:
+            slots.put(done)
+        for t in threads:
+            t.join()
+        if self.record is not None:
+            self.record.flush_history()
+        summary = {
+            'count': totals['count'],
+            'errors': totals['errors'],
+            'status_mismatches': totals['status_mismatches'],
+            'elapsed_s': round(time.perf_counter() - started, 3),
+            'captured_span_s': round(self.entries[-1].offset, 3) if self.entries else 0.0,
+            'max_lag_ms': totals['max_lag_ms'],
+            'replay': summarize(replayed, totals['count'], totals['errors'], totals['bytes']),
+        }
+        if original.count:
+            summary['original'] = summarize(original, original.count, 0, 0)
+        if writer is not None and writer.dropped > dropped_before:
+            # --record rows the history writer could not save
+            summary['not_recorded'] = writer.dropped - dropped_before
+            summary['record_error'] = str(writer.last_error)
+        return summary
+
+
+def build_parser(parser=None):
+    parser = parser or argparse.ArgumentParser(description="Replay a HAR capture or stored history.")
+    parser.add_argument('har', nargs='?', help="HAR file to replay")
+    parser.add_argument('--history', action='store_true', help="replay stored history instead of a HAR file")
+    parser.add_argument('--days', type=float, default=1, help="with --history: the last N days")
+    parser.add_argument('--db', default='requests.db')
+    parser.add_argument('--speed', type=float, default=1.0, help="time multiplier; 0 sends as fast as possible")
+    parser.add_argument('-c', '--concurrency', type=int, default=8)
+    parser.add_argument('--target', help="base URL that replaces each request's scheme and host")
+    parser.add_argument('--timeout', type=float, default=30)
+    parser.add_argument('--record', action='store_true', help="add replayed requests to the database history")
+    parser.add_argument('-o', '--output', help="write per-request results (JSONL) to a file")
+    return parser
+
+
+def run_from_args(args):
+    from requester import Requester
+
+    if bool(args.har) == bool(args.history):
+        raise SystemExit("give a HAR file or --history")
+    storage = None
+    if args.history or args.record:
+        from storage_base import open_storage
+        storage = open_storage(args.db)
+    if args.history:
+        entries = history_entries(storage.iter_history(since=datetime.utcnow() - timedelta(days=args.days)))
+    else:
+        with open(args.har, 'r', encoding='utf-8-sig') as f:
+            entries = read_har_entries(f)
+    runner = ReplayRunner(Requester(pool_maxsize=max(10, args.concurrency)), entries, speed=args.speed,
+                          concurrency=args.concurrency, timeout=args.timeout, target=args.target,
+                          record=storage if args.record else None)
+    out = open(args.output, 'w', encoding='utf-8') if args.output else None
+    try:
+        on_result = (lambda res: out.write(json.dumps(res) + '\n')) if out else None
+        summary = runner.run(on_result=on_result)
+    finally:
+        if out is not None:
+            out.close()
+    print(json.dumps(summary, indent=2))
+    return summary
+
+
+def main(argv=None):
+    summary = run_from_args(build_parser().parse_args(argv))
+    return 1 if summary['errors'] else 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -1,21 +1,191 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
 import requests
+from timing import capture
+from timing_adapter import TimingAdapter
+
+try:
+    import httpx  # optional: native async engine (pip install httpx[http2])
+except ImportError:
+    httpx = None
 
 class Requester:
     """Simple HTTP requester wrapper around requests.
 
     Methods:
-    - send(method, url, headers=None, data=None, params=None, timeout=30)
-      returns requests.Response
+    - send(method, url, headers=None, data=None, params=None, timeout=30, stream=False)
+      returns requests.Response; with stream=True the body is left unread
+      so it can be consumed with iter_content() (see spool.read_body)
+    - send(..., timings=RequestTimings()) also records connection phases and
+      time to first byte; the body download is added here unless stream=True,
+      in which case the caller times its own reads
+
+    Pool tuning (passed to the session's HTTPAdapter):
+    - pool_connections: number of per-host pools kept around
+    - pool_maxsize: connections kept alive per host
+    - max_retries: int or urllib3 Retry used for connection failures
+    - pool_block: wait for a free connection instead of opening extra ones
+
+    cache: an httpcache.HTTPCache to answer repeated GETs locally (the
+    responses then carry ``cache_status``); None sends everything.
     """
 
-    def __init__(self):
+    def __init__(self, pool_connections: int = 10, pool_maxsize: int = 10, max_retries=0, pool_block: bool = False,
+                 cache=None):
+        self.cache = cache
         self.session = requests.Session()
+        adapter = TimingAdapter(
+            pool_connections=pool_connections,
+            pool_maxsize=pool_maxsize,
+            max_retries=max_retries,
+            pool_block=pool_block,
+        )
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
 
-    def send(self, method: str, url: str, headers: dict | None = None, data: str | None = None, params: dict | None = None, timeout: int = 30):
+    def send(self, method: str, url: str, headers: dict | None = None, data: str | None = None, params: dict | None = None, timeout: int = 30, stream: bool = False, timings=None):
         method = method.upper()
+        if self.cache is not None:
+            return self.cache.send(self._send_network, method, url, headers, data, params, timeout, stream, timings)
+        return self._send_network(method, url, headers, data, params, timeout, stream, timings)
+
+    def _send_network(self, method, url, headers, data, params, timeout, stream, timings):
+        if timings is not None:
+            return self._send_timed(method, url, headers, data, params, timeout, stream, timings)
         try:
-            resp = self.session.request(method=method, url=url, headers=headers, data=data, params=params, timeout=timeout)
+            resp = self.session.request(method=method, url=url, headers=headers, data=data, params=params, timeout=timeout, stream=stream)
             return resp
         except requests.RequestException as e:
             # Re-raise for callers to handle; include message for UI display
             raise
+
+    def _send_timed(self, method, url, headers, data, params, timeout, stream, timings):
+        with capture(timings):
+            started = time.perf_counter()
+            network = timings.network
+            # always stream so headers-received and body-read can be told apart
+            resp = self.session.request(method=method, url=url, headers=headers, data=data, params=params, timeout=timeout, stream=True)
+            headers_at = time.perf_counter()
+        timings.add('ttfb', headers_at - started - (timings.network - network))
+        if not stream:
+            resp.content
+            timings.add('download', time.perf_counter() - headers_at)
+        return resp
+
+    def close(self):
+        self.session.close()
+
+
+class AsyncRequester:
+    """asyncio counterpart of Requester for driving many requests at once.
+
+    Methods:
+    - await send(method, url, headers=None, data=None, params=None, timeout=30)
+      same arguments as Requester.send; the response exposes status_code,
+      reason, headers, text, content and json()
+    - await send_many(requests, concurrency=None)
+      runs a list of send() keyword dicts concurrently and returns the
+      responses (or exceptions) in the same order
+
+    When httpx is installed it is used as the engine, which enables
+    keep-alive expiry tuning and optional HTTP/2. Otherwise sends run on a
+    thread pool over a pooled Requester, so the API is the same either way.
+
+    Pool tuning:
+    - max_connections: total open connections
+    - max_connections_per_host: concurrent requests per host (None = no cap)
+    - max_keepalive: idle connections kept for reuse
+    - keepalive_expiry: seconds an idle connection is kept (httpx only)
+    - http2: negotiate HTTP/2 where the server supports it (httpx + h2)
+    - max_retries: retries on connection failures
+    """
+
+    def __init__(self, max_connections: int = 100, max_connections_per_host: int | None = None,
+                 max_keepalive: int = 20, keepalive_expiry: float = 5.0, http2: bool = False,
+                 max_retries: int = 0, use_httpx: bool | None = None):
+        if use_httpx is None:
+            use_httpx = httpx is not None
+        if use_httpx and httpx is None:
+            raise ImportError("httpx is required for the native async engine")
+        if http2 and not use_httpx:
+            raise ImportError("HTTP/2 requires httpx with the h2 extra (pip install httpx[http2])")
+        self.max_connections_per_host = max_connections_per_host
+        self._host_limits = {}
+        self._client = None
+        self._requester = None
+        self._pool = None
+        if use_httpx:
+            limits = httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_keepalive,
+                keepalive_expiry=keepalive_expiry,
+            )
+            transport = httpx.AsyncHTTPTransport(limits=limits, http2=http2, retries=max_retries)
+            self._client = httpx.AsyncClient(transport=transport, http2=http2)
+        else:
+            # urllib3 keeps at most pool_maxsize idle connections per host
+            self._requester = Requester(
+                pool_maxsize=max_keepalive,
+                max_retries=max_retries,
+            )
+            self._pool = ThreadPoolExecutor(max_workers=max_connections, thread_name_prefix="async-send")
+
+    @property
+    def engine(self):
+        return "httpx" if self._client is not None else "requests"
+
+    def _host_semaphore(self, url):
+        if not self.max_connections_per_host:
+            return None
+        host = urlsplit(url).netloc
+        sem = self._host_limits.get(host)
+        if sem is None:
+            sem = self._host_limits[host] = asyncio.Semaphore(self.max_connections_per_host)
+        return sem
+
+    async def send(self, method: str, url: str, headers: dict | None = None, data: str | None = None, params: dict | None = None, timeout: int = 30):
+        sem = self._host_semaphore(url)
+        if sem is None:
+            return await self._send(method, url, headers, data, params, timeout)
+        async with sem:
+            return await self._send(method, url, headers, data, params, timeout)
+
+    async def _send(self, method, url, headers, data, params, timeout):
+        method = method.upper()
+        if self._client is None:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(
+                self._pool,
+                lambda: self._requester.send(method, url, headers=headers, data=data, params=params, timeout=timeout),
+            )
+        resp = await self._client.request(method, url, headers=headers, content=data, params=params, timeout=timeout)
+        # keep the requests.Response attribute the UI relies on
+        resp.reason = resp.reason_phrase
+        return resp
+
+    async def send_many(self, requests_list, concurrency: int | None = None):
+        """Send every item of ``requests_list`` (dicts of send() kwargs)."""
+        sem = asyncio.Semaphore(concurrency) if concurrency else None
+
+        async def one(kwargs):
+            if sem is None:
+                return await self.send(**kwargs)
+            async with sem:
+                return await self.send(**kwargs)
+
+        return await asyncio.gather(*(one(kw) for kw in requests_list), return_exceptions=True)
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+        if self._requester is not None:
+            self._requester.close()
+            self._pool.shutdown(wait=False)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
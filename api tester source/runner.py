@@ -0,0 +1,131 @@
+"""Running request specs: the pieces shared by the CLI, the UI and the runners.
+
+RequestSpec is the common shape of saved requests, templates and
+exported JSON; run_one sends one and returns a plain result dict.
+"""
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from xml.etree import ElementTree as ET
+from assertions import ResponseContext, compile_assertions, status_ok
+from environment import Interpolator, load_variables, parse_headers
+from timing import RequestTimings
+
+
+class RequestSpec:
+    """A request to run: the common shape of SavedRequest, Template and exported JSON."""
+
+    def __init__(self, name, method, url, headers=None, body=None, assertions=None):
+        self.name = name
+        self.method = (method or 'GET').upper()
+        self.url = url or ''
+        self.headers = headers
+        self.body = body
+        self.assertions = compile_assertions(assertions)
+
+    @classmethod
+    def from_row(cls, row):
+        if isinstance(row, dict):
+            return cls(row.get('name') or row.get('url'), row.get('method'), row.get('url'),
+                       row.get('headers'), row.get('body'), row.get('assertions'))
+        return cls(row.name, row.method, row.url, row.headers, row.body, getattr(row, 'assertions', None))
+
+    def render(self, vars_map):
+        """Return (method, url, headers, body) with environment variables applied."""
+        env = vars_map if isinstance(vars_map, Interpolator) else Interpolator(vars_map)
+        url = env.render(self.url)
+        headers = self.headers if isinstance(self.headers, str) else json.dumps(self.headers or {})
+        headers = parse_headers(env.render(headers))
+        body = env.render(self.body) or None
+        return self.method, url, headers, body
+
+
+def run_one(requester, spec, vars_map, timeout=30):
+    """Send one spec and return a result dict (never raises)."""
+    started = time.perf_counter()
+    timings = RequestTimings()
+    method, url, headers, body = spec.render(vars_map)
+    result = {'name': spec.name, 'method': method, 'url': url}
+    timings.add('prepare', time.perf_counter() - started)
+    try:
+        resp = requester.send(method, url, headers=headers, data=body, timeout=timeout, timings=timings)
+        elapsed = timings.total - timings.phases['prepare']
+        result['status'] = resp.status_code
+        result['size'] = len(resp.content or b'')
+        result['ok'] = status_ok(spec.assertions, resp.status_code)
+        result['error'] = None if result['ok'] else f"HTTP {resp.status_code} {resp.reason}"
+        if spec.assertions is not None:
+            failures = spec.assertions.failures(ResponseContext.from_response(resp, elapsed))
+            result['assertions'] = failures
+            if failures and result['ok']:
+                result['ok'] = False
+                result['error'] = f"{len(failures)} assertion(s) failed: " + "; ".join(failures)
+    except Exception as e:
+        result['status'] = None
+        result['size'] = 0
+        result['ok'] = False
+        result['error'] = f"{type(e).__name__}: {e}"
+    result['duration_ms'] = round((time.perf_counter() - started) * 1000, 2)
+    result['timings'] = timings.as_dict()
+    return result
+
+
+def run_specs(requester, specs, vars_map, workers=4, timeout=30, on_result=None):
+    """Run specs in parallel; returns results in spec order."""
+    results = [None] * len(specs)
+    env = vars_map if isinstance(vars_map, Interpolator) else Interpolator(vars_map)
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        futures = {pool.submit(run_one, requester, spec, env, timeout): i for i, spec in enumerate(specs)}
+        for fut in as_completed(futures):
+            i = futures[fut]
+            res = fut.result()
+            res['index'] = i
+            results[i] = res
+            if on_result:
+                on_result(res)
+    return results
+
+
+def junit_xml(suite_name, results):
+    failures = sum(1 for r in results if not r['ok'])
+    total_time = sum(r['duration_ms'] for r in results) / 1000.0
+    suite = ET.Element('testsuite', name=suite_name, tests=str(len(results)),
+                       failures=str(failures), errors='0', time=f"{total_time:.3f}")
+    for r in results:
+        case = ET.SubElement(suite, 'testcase', classname=suite_name, name=r['name'] or r['url'],
+                             time=f"{r['duration_ms'] / 1000.0:.3f}")
+        if not r['ok']:
+            failure = ET.SubElement(case, 'failure', message=r['error'] or 'failed')
+            failure.text = f"{r['method']} {r['url']}"
+    return ET.tostring(suite, encoding='unicode')
+
+
+def load_json_file(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def resolve_environment(args, storage=None):
+    """Variables from --env-file and/or --env (by name), later --var overrides."""
+    vars_map = {}
+    if args.env_file:
+        envs = load_json_file(args.env_file)
+        if isinstance(envs, dict):
+            envs = [envs]
+        chosen = None
+        for e in envs:
+            if args.env is None or e.get('name') == args.env:
+                chosen = e
+                break
+        if chosen is None:
+            raise SystemExit(f"environment {args.env!r} not found in {args.env_file}")
+        vars_map.update(load_variables(chosen.get('variables')))
+    elif args.env:
+        match = [e for e in storage.get_environments() if e.name == args.env]
+        if not match:
+            raise SystemExit(f"environment {args.env!r} not found")
+        vars_map.update(load_variables(match[0].variables))
+    for kv in args.var:
+        k, _, v = kv.partition('=')
+        vars_map[k] = v
+    return vars_map
@@ -0,0 +1,128 @@
+import codecs
+import os
+import shutil
+import tempfile
+
+# Bodies up to this size stay in memory; larger ones go to a temp file.
+SPOOL_THRESHOLD = 2 * 1024 * 1024
+CHUNK_SIZE = 64 * 1024
+
+
+class SpooledBody:
+    """Response body buffered in memory up to ``threshold`` bytes, then on disk.
+
+    The spool file is a named temp file so the full body can be copied out
+    with ``save_to`` (a kernel-side copy where the OS supports it) without
+    reading it back into Python.
+    """
+
+    def __init__(self, threshold=SPOOL_THRESHOLD, encoding=None, content_type=None):
+        self.threshold = threshold
+        self.encoding = encoding or 'utf-8'
+        self.content_type = content_type or ''
+        self.size = 0
+        self.path = None
+        self._chunks = []
+        self._file = None
+
+    @property
+    def in_memory(self):
+        return self.path is None
+
+    def write(self, chunk):
+        if not chunk:
+            return
+        self.size += len(chunk)
+        if self._file is not None:
+            self._file.write(chunk)
+            return
+        self._chunks.append(chunk)
+        if self.size > self.threshold:
+            fd, self.path = tempfile.mkstemp(prefix='api-tester-', suffix='.body')
+            self._file = os.fdopen(fd, 'wb')
+            for c in self._chunks:
+                self._file.write(c)
+            self._chunks = []
+
+    def finish(self):
+        """Flush and close the spool file once the body is complete."""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def getvalue(self):
+        """Whole body as bytes -- only sensible for in-memory bodies."""
+        if self.in_memory:
+            return b''.join(self._chunks)
+        with open(self.path, 'rb') as f:
+            return f.read()
+
+    def text(self):
+        return self.getvalue().decode(self.encoding, errors='replace')
+
+    def head(self, limit):
+        """First ``limit`` bytes of the body."""
+        if self.in_memory:
+            return self.getvalue()[:limit]
+        with open(self.path, 'rb') as f:
+            return f.read(limit)
+
+    def iter_text(self, limit=None, chunk_size=CHUNK_SIZE):
+        """Yield decoded text chunks, stopping after ``limit`` bytes if given."""
+        decoder = codecs.getincrementaldecoder(self.encoding)(errors='replace')
+        remaining = self.size if limit is None else min(limit, self.size)
+        if self.in_memory:
+            data = self.getvalue()
+            for i in range(0, remaining, chunk_size):
+                yield decoder.decode(data[i:min(i + chunk_size, remaining)])
+        else:
+            with open(self.path, 'rb') as f:
+                while remaining > 0:
+                    block = f.read(min(chunk_size, remaining))
+                    if not block:
+                        break
+                    remaining -= len(block)
+                    yield decoder.decode(block)
+        tail = decoder.decode(b'', final=True)
+        if tail:
+            yield tail
+
+    def save_to(self, dest):
+        if self.in_memory:
+            with open(dest, 'wb') as f:
+                for c in self._chunks:
+                    f.write(c)
+        else:
+            shutil.copyfile(self.path, dest)
+
+    def close(self):
+        self.finish()
+        self._chunks = []
+        if self.path:
+            try:
+                os.remove(self.path)
+            except OSError:
+                pass
+            self.path = None
+
+
+def read_body(resp, threshold=SPOOL_THRESHOLD, chunk_size=CHUNK_SIZE, should_stop=None):
+    """Drain a ``stream=True`` response into a SpooledBody.
+
+    Returns None if ``should_stop()`` becomes true mid-download; the
+    connection is closed and any spool file removed.
+    """
+    body = SpooledBody(threshold, encoding=resp.encoding, content_type=resp.headers.get('Content-Type'))
+    try:
+        for chunk in resp.iter_content(chunk_size=chunk_size):
+            if should_stop is not None and should_stop():
+                body.close()
+                return None
+            body.write(chunk)
+        body.finish()
+        return body
+    except Exception:
+        body.close()
+        raise
+    finally:
+        resp.close()
@@ -0,0 +1,715 @@
+"""Storage backend on the standard sqlite3 module.
+
+Same schema and behaviour as storage.Storage (either can open a database
+the other wrote), without SQLAlchemy: statements are constant SQL strings
+that sqlite3 prepares once per connection and keeps in its statement
+cache, and rows come back as named tuples with the ORM attribute names.
+Each thread gets its own connection; writes run in BEGIN IMMEDIATE
+transactions so they never fail half-way on a lock upgrade.
+"""
+import calendar
+import hashlib
+import sqlite3
+import threading
+import weakref
+from collections import namedtuple
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from histogram import LatencyHistogram
+from metrics import RollupAccumulator
+from storage_base import (SEARCH_KINDS, SEARCH_RESPONSE_CHARS, StorageBackend, _SEARCH_SOURCES, _SEARCH_WORD_RE,
+                          _batches, compress_body, configure_connection, decompress_body, search_query)
+
+# table -> [(column, type, NOT NULL)], constraints; matches storage.py's models
+SCHEMA = {
+    'collections': ([('id', 'INTEGER', True), ('name', 'VARCHAR(100)', True), ('created_at', 'DATETIME', False)],
+                    ['PRIMARY KEY (id)']),
+    'saved_requests': ([('id', 'INTEGER', True), ('name', 'VARCHAR(100)', True), ('method', 'VARCHAR(10)', True),
+                        ('url', 'VARCHAR(2048)', True), ('headers', 'TEXT', False), ('body', 'TEXT', False),
+                        ('assertions', 'TEXT', False), ('collection_id', 'INTEGER', False),
+                        ('created_at', 'DATETIME', False)],
+                       ['PRIMARY KEY (id)', 'FOREIGN KEY(collection_id) REFERENCES collections (id)']),
+    'request_history': ([('id', 'INTEGER', True), ('method', 'VARCHAR(10)', True), ('url', 'VARCHAR(2048)', True),
+                         ('headers', 'TEXT', False), ('body', 'TEXT', False), ('response_code', 'INTEGER', False),
+                         ('response_body', 'TEXT', False), ('response_hash', 'VARCHAR(64)', False),
+                         ('timings', 'TEXT', False), ('duration_ms', 'FLOAT', False),
+                         ('response_size', 'INTEGER', False), ('created_at', 'DATETIME', False)],
+                        ['PRIMARY KEY (id)']),
+    'endpoint_rollups': ([('endpoint', 'VARCHAR(2048)', True), ('minute', 'INTEGER', True),
+                          ('count', 'INTEGER', True), ('errors', 'INTEGER', True), ('total_bytes', 'INTEGER', True),
+                          ('sketch', 'BLOB', True)],
+                         ['PRIMARY KEY (endpoint, minute)']),
+    'response_blobs': ([('hash', 'VARCHAR(64)', True), ('encoding', 'VARCHAR(10)', True), ('size', 'INTEGER', True),
+                        ('data', 'BLOB', True), ('created_at', 'DATETIME', False)],
+                       ['PRIMARY KEY (hash)']),
+    'environments': ([('id', 'INTEGER', True), ('name', 'VARCHAR(100)', True), ('variables', 'TEXT', False),
+                      ('created_at', 'DATETIME', False)],
+                     ['PRIMARY KEY (id)']),
+    'templates': ([('id', 'INTEGER', True), ('name', 'VARCHAR(100)', True), ('method', 'VARCHAR(10)', True),
+                   ('url', 'VARCHAR(2048)', True), ('headers', 'TEXT', False), ('body', 'TEXT', False),
+                   ('assertions', 'TEXT', False), ('created_at', 'DATETIME', False)],
+                  ['PRIMARY KEY (id)']),
+    'workflows': ([('id', 'INTEGER', True), ('name', 'VARCHAR(100)', True), ('definition', 'TEXT', True),
+                   ('created_at', 'DATETIME', False)],
+                  ['PRIMARY KEY (id)']),
+}
+INDEXES = (
+    'CREATE INDEX IF NOT EXISTS ix_request_history_created_at ON request_history (created_at, id)',
+    'CREATE INDEX IF NOT EXISTS ix_request_history_url ON request_history (url)',
+    'CREATE INDEX IF NOT EXISTS ix_request_history_method ON request_history (method)',
+    'CREATE INDEX IF NOT EXISTS ix_request_history_response_hash ON request_history (response_hash)',
+    'CREATE INDEX IF NOT EXISTS ix_endpoint_rollups_minute ON endpoint_rollups (minute)',
+)
+
+# Rows: created_at (always last) is converted to a naive UTC datetime
+CollectionRow = namedtuple('CollectionRow', 'id name created_at')
+SavedRequestRow = namedtuple('SavedRequestRow',
+                             'id name method url headers body assertions collection_id created_at')
+HistoryRow = namedtuple('HistoryRow', 'id method url headers body response_code response_hash timings duration_ms '
+                                      'response_size created_at')
+EnvironmentRow = namedtuple('EnvironmentRow', 'id name variables created_at')
+TemplateRow = namedtuple('TemplateRow', 'id name method url headers body assertions created_at')
+WorkflowRow = namedtuple('WorkflowRow', 'id name definition created_at')
+
+
+def _columns(row_type, prefix=''):
+    return ', '.join(prefix + f for f in row_type._fields)
+
+
+def _to_db(dt):
+    # the text form SQLAlchemy's sqlite DateTime writes, so ordering matches
+    return dt.isoformat(' ', 'microseconds') if dt is not None else None
+
+
+def _from_db(text):
+    return datetime.fromisoformat(text) if text else None
+
+
+def _row(row_type, values):
+    return row_type._make(values[:-1] + (_from_db(values[-1]),)) if values is not None else None
+
+
+def _rows(row_type, cursor):
+    make = row_type._make
+    return [make(values[:-1] + (_from_db(values[-1]),)) for values in cursor]
+
+
+_HISTORY_COLUMNS = _columns(HistoryRow)
+_INSERT_HISTORY = ('INSERT INTO request_history (method, url, headers, body, response_code, response_hash, timings, '
+                   'duration_ms, response_size, created_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)')
+_INSERT_SEARCH = ('INSERT OR REPLACE INTO search_index(rowid, kind, ref_id, title, url, headers, body, response) '
+                  'VALUES (?, ?, ?, ?, ?, ?, ?, ?)')
+
+
+class _ThreadConnection:
+    """One thread's connection; closed when the thread exits and its thread-local is dropped."""
+
+    def __init__(self, conn, generation):
+        self.conn = conn
+        self.generation = generation
+        self.close = weakref.finalize(self, conn.close)
+
+
+class SQLiteStorage(StorageBackend):
+    """sqlite3 backend; rows are returned as named tuples."""
+
+    def __init__(self, db_path='requests.db', retention=None, search_responses=False):
+        super().__init__(retention, search_responses)
+        self.db_path = db_path
+        self._local = threading.local()
+        # only live threads' connections; the rest were closed as their threads exited
+        self._connections = weakref.WeakSet()
+        self._lock = threading.Lock()
+        self._generation = 0
+        self._create_schema()
+        self.search_enabled = self._create_search_index()
+
+    # Connections
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, isolation_level=None, check_same_thread=False, cached_statements=256)
+        configure_connection(conn)
+        return conn
+
+    def _conn(self):
+        """This thread's connection (autocommit; see _write for transactions)."""
+        held = getattr(self._local, 'held', None)
+        if held is None or held.generation != self._generation:
+            held = self._local.held = _ThreadConnection(self._connect(), self._generation)
+            with self._lock:
+                self._connections.add(held)
+        return held.conn
+
+    @contextmanager
+    def _write(self):
+        conn = self._conn()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            yield conn
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        conn.execute('COMMIT')
+
+    @contextmanager
+    def _reader(self):
+        """A separate connection for streaming reads, so callers may write while iterating."""
+        conn = self._connect()
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    def close(self):
+        """Write out queued history and close every connection."""
+        super().close()
+        with self._lock:
+            held, self._connections = list(self._connections), weakref.WeakSet()
+            self._generation += 1
+        for h in held:
+            h.close()
+
+    def _create_schema(self):
+        """Create missing tables and indexes and add columns added since a database was created."""
+        with self._write() as conn:
+            for table, (columns, constraints) in SCHEMA.items():
+                existing = {row[1] for row in conn.execute(f"PRAGMA table_info('{table}')")}
+                if not existing:
+                    lines = [f"{name} {kind}{' NOT NULL' if not_null else ''}" for name, kind, not_null in columns]
+                    conn.execute(f"CREATE TABLE {table} (\n\t" + ', \n\t'.join(lines + constraints) + "\n)")
+                    continue
+                for name, kind, _ in columns:
+                    if name not in existing:
+                        conn.execute(f'ALTER TABLE {table} ADD COLUMN {name} {kind}')
+            for sql in INDEXES:
+                conn.execute(sql)
+
+    # Full-text search
+    def _create_search_index(self):
+        """Create the FTS5 index, filling it on first creation; False without FTS5."""
+        with self._write() as conn:
+            if conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'search_index'").fetchone():
+                return True
+            try:
+                conn.execute(
+                    "CREATE VIRTUAL TABLE search_index USING fts5("
+                    "kind UNINDEXED, ref_id UNINDEXED, title, url, headers, body, response, prefix='2 3')")
+            except sqlite3.OperationalError:
+                return False  # sqlite built without FTS5: search() falls back to LIKE
+        self.search_enabled = True
+        self.rebuild_search_index()
+        return True
+
+    def _index(self, conn, kind, ref_id, title=None, url=None, headers=None, body=None, response=None):
+        """Insert or replace one row of the search index (caller commits)."""
+        if not self.search_enabled:
+            return
+        if isinstance(response, bytes):
+            response = response.decode('utf-8', errors='replace')
+        conn.execute(_INSERT_SEARCH, (ref_id * 8 + SEARCH_KINDS[kind], kind, ref_id, title or '', url or '',
+                                      headers or '', body or '', (response or '')[:SEARCH_RESPONSE_CHARS]))
+
+    def _index_where(self, conn, kind, where='1', params=()):
+        """Index the rows of ``kind`` matching the SQL ``where`` in one statement."""
+        if not self.search_enabled:
+            return
+        table, title, url, headers, body = _SEARCH_SOURCES[kind]
+        conn.execute(
+            "INSERT OR REPLACE INTO search_index(rowid, kind, ref_id, title, url, headers, body, response) "
+            f"SELECT id * 8 + {SEARCH_KINDS[kind]}, '{kind}', id, coalesce({title}, ''), coalesce({url}, ''), "
+            f"coalesce({headers}, ''), coalesce({body}, ''), '' FROM {table} WHERE {where}", params)
+
+    def _unindex(self, conn, kind, ref_ids):
+        if not self.search_enabled or not ref_ids:
+            return
+        code = SEARCH_KINDS[kind]
+        conn.executemany("DELETE FROM search_index WHERE rowid = ?", [(i * 8 + code,) for i in ref_ids])
+
+    def rebuild_search_index(self):
+        """Re-index every row, e.g. after changing search_responses."""
+        if not self.search_enabled:
+            return
+        with self._reader() as reader, self._write() as conn:
+            conn.execute("DELETE FROM search_index")
+            for kind in _SEARCH_SOURCES:
+                self._index_where(conn, kind)
+            if self.search_responses:
+                rows = reader.execute(
+                    "SELECT h.id, h.url, h.headers, h.body, h.response_body, b.encoding, b.data "
+                    "FROM request_history h LEFT OUTER JOIN response_blobs b ON b.hash = h.response_hash")
+            else:
+                rows = reader.execute("SELECT id, url, headers, body, NULL, NULL, NULL FROM request_history")
+            for row_id, url, headers, body, legacy, encoding, data in rows:
+                response = legacy if data is None else decompress_body(encoding, data)
+                self._index(conn, 'history', row_id, None, url, headers, body, response)
+
+    def search(self, query, kinds=None, limit=50):
+        """Ranked matches for ``query``; see storage.Storage.search."""
+        match = search_query(query)
+        if not match:
+            return []
+        if not self.search_enabled:
+            return self._search_like(query, kinds, limit)
+        sql = ("SELECT kind, ref_id, title, url, snippet(search_index, -1, '[', ']', '...', 12) "
+               "FROM search_index WHERE search_index MATCH ?")
+        params = [match]
+        stmt_kinds = [k for k in (kinds or ()) if k in SEARCH_KINDS]
+        if stmt_kinds:
+            sql += f" AND kind IN ({', '.join('?' * len(stmt_kinds))})"
+            params += stmt_kinds
+        sql += " ORDER BY bm25(search_index, 0, 0, 10.0, 5.0, 2.0, 1.0, 0.5) LIMIT ?"
+        rows = self._conn().execute(sql, params + [limit]).fetchall()
+        return [dict(kind=k, id=i, title=t, url=u, snippet=s) for k, i, t, u, s in rows]
+
+    def _search_like(self, query, kinds, limit):
+        """Unranked substring search on names and URLs, for sqlite builds without FTS5."""
+        words = _SEARCH_WORD_RE.findall(query)
+        sources = [('template', 'templates', 'name', 'url'), ('saved_request', 'saved_requests', 'name', 'url'),
+                   ('collection', 'collections', 'name', None), ('history', 'request_history', None, 'url')]
+        out = []
+        conn = self._conn()
+        for kind, table, name_col, url_col in sources:
+            if kinds and kind not in kinds:
+                continue
+            cols = [c for c in (name_col, url_col) if c is not None]
+            where = ' AND '.join('(' + ' OR '.join(f'{c} LIKE ?' for c in cols) + ')' for _ in words) or '1'
+            params = [f'%{w}%' for w in words for _ in cols]
+            sql = (f"SELECT id, {name_col or chr(39) * 2}, {url_col or chr(39) * 2} FROM {table} "
+                   f"WHERE {where} ORDER BY id DESC LIMIT ?")
+            for ref_id, title, url in conn.execute(sql, params + [limit - len(out)]):
+                out.append(dict(kind=kind, id=ref_id, title=title, url=url, snippet=title or url))
+            if len(out) >= limit:
+                break
+        return out
+
+    def _emit_by_id(self, entity, action, row_type, table, row_id):
+        """Emit a committed row, read back so listeners see what was stored."""
+        if not self._listeners:
+            return
+        values = self._conn().execute(f"SELECT {_columns(row_type)} FROM {table} WHERE id = ?", (row_id,)).fetchone()
+        self._emit(entity, action, _row(row_type, values))
+
+    # History
+    def _write_history(self, items):
+        """Insert history rows (dicts of add_to_history arguments) in one transaction."""
+        rollup = RollupAccumulator()
+        added = []
+        with self._write() as conn:
+            blobs = {}
+            for item in items:
+                response_body = item['response_body']
+                digest = self._store_blob(conn, response_body, blobs)
+                created_at = item.get('created_at') or datetime.utcnow()
+                values = (item['method'], item['url'], item.get('headers'), item.get('body'),
+                          item.get('response_code'), digest, item.get('timings'), item.get('duration_ms'),
+                          item.get('response_size'))
+                row_id = conn.execute(_INSERT_HISTORY, values + (_to_db(created_at),)).lastrowid
+                row = HistoryRow(row_id, *values, created_at)
+                added.append(row)
+                self._index(conn, 'history', row_id, None, row.url, row.headers, row.body,
+                            response_body if self.search_responses else None)
+                if item.get('rollup', True) and row.duration_ms is not None:
+                    rollup.add(row.method, row.url, row.duration_ms, row.response_code, row.response_size,
+                               calendar.timegm(created_at.timetuple()))
+            if rollup:
+                self._merge_rollups(conn, rollup)
+        for row in added:
+            self._emit('history', 'add', row)
+        return [row.id for row in added]
+
+    def _merge_rollups(self, conn, accumulator):
+        """Fold a RollupAccumulator into endpoint_rollups (caller commits)."""
+        for (endpoint, minute), b in accumulator.buckets.items():
+            existing = conn.execute("SELECT count, errors, total_bytes, sketch FROM endpoint_rollups "
+                                    "WHERE endpoint = ? AND minute = ?", (endpoint, minute)).fetchone()
+            if existing is None:
+                conn.execute("INSERT INTO endpoint_rollups (endpoint, minute, count, errors, total_bytes, sketch) "
+                             "VALUES (?, ?, ?, ?, ?, ?)",
+                             (endpoint, minute, b['count'], b['errors'], b['bytes'], b['sketch'].to_bytes()))
+            else:
+                count, errors, total_bytes, sketch = existing
+                conn.execute("UPDATE endpoint_rollups SET count = ?, errors = ?, total_bytes = ?, sketch = ? "
+                             "WHERE endpoint = ? AND minute = ?",
+                             (count + b['count'], errors + b['errors'], total_bytes + b['bytes'],
+                              LatencyHistogram.from_bytes(sketch).merge(b['sketch']).to_bytes(), endpoint, minute))
+
+    def _store_blob(self, conn, response_body, seen=None):
+        if response_body is None:
+            return None
+        raw = response_body.encode('utf-8') if isinstance(response_body, str) else bytes(response_body)
+        digest = hashlib.sha256(raw).hexdigest()
+        if seen is not None and digest in seen:
+            return digest
+        if not conn.execute("SELECT 1 FROM response_blobs WHERE hash = ?", (digest,)).fetchone():
+            encoding, data = compress_body(raw)
+            conn.execute("INSERT OR IGNORE INTO response_blobs (hash, encoding, size, data, created_at) "
+                         "VALUES (?, ?, ?, ?, ?)", (digest, encoding, len(raw), data, _to_db(datetime.utcnow())))
+        if seen is not None:
+            seen[digest] = True
+        return digest
+
+    def get_endpoints(self, since=None, until=None):
+        """[(endpoint, request count)] with rollups in the range, busiest first."""
+        lo, hi = self._minute_range(since, until)
+        return self._conn().execute(
+            "SELECT endpoint, sum(count) AS total FROM endpoint_rollups WHERE minute >= ? AND minute <= ? "
+            "GROUP BY endpoint ORDER BY total DESC", (lo, hi)).fetchall()
+
+    def _rollup_rows(self, endpoint, lo, hi):
+        return self._conn().execute(
+            "SELECT minute, sketch, count, errors, total_bytes FROM endpoint_rollups "
+            "WHERE endpoint = ? AND minute >= ? AND minute <= ? ORDER BY minute", (endpoint, lo, hi)).fetchall()
+
+    def get_history_item(self, history_id):
+        """One history row without its response body (see get_response_body)."""
+        return _row(HistoryRow, self._conn().execute(
+            f"SELECT {_HISTORY_COLUMNS} FROM request_history WHERE id = ?", (history_id,)).fetchone())
+
+    def get_response_body(self, history_id):
+        """Load and decompress the response body of one history row (or None)."""
+        row = self._conn().execute(
+            "SELECT h.response_body, b.encoding, b.data FROM request_history h "
+            "LEFT OUTER JOIN response_blobs b ON b.hash = h.response_hash WHERE h.id = ?", (history_id,)).fetchone()
+        if row is None:
+            return None
+        legacy, encoding, data = row
+        if data is None:
+            return legacy
+        return decompress_body(encoding, data).decode('utf-8', errors='replace')
+
+    def get_history(self, limit=50):
+        """Get recent requests from history.
+
+        Response bodies are not loaded; use get_response_body(row.id).
+        """
+        return _rows(HistoryRow, self._conn().execute(
+            f"SELECT {_HISTORY_COLUMNS} FROM request_history ORDER BY created_at DESC, id DESC LIMIT ?", (limit,)))
+
+    def get_history_page(self, limit=50, cursor=None, method=None, url=None):
+        """Keyset-paginated history, newest first; see storage.Storage.get_history_page."""
+        where, params = [], []
+        if method:
+            where.append('method = ?')
+            params.append(method)
+        if url:
+            where.append('url = ?')
+            params.append(url)
+        if cursor is not None:
+            created_at, row_id = cursor
+            where.append('(created_at < ? OR (created_at = ? AND id < ?))')
+            params += [_to_db(created_at), _to_db(created_at), row_id]
+        sql = f"SELECT {_HISTORY_COLUMNS} FROM request_history"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY created_at DESC, id DESC LIMIT ?"
+        rows = _rows(HistoryRow, self._conn().execute(sql, params + [limit + 1]))
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = (rows[-1].created_at, rows[-1].id)
+        return rows, next_cursor
+
+    def iter_history(self, since=None, until=None, with_bodies=False):
+        """Yield history rows as dicts, oldest first; see storage.Storage.iter_history."""
+        keys = ('id', 'created_at', 'method', 'url', 'headers', 'body', 'response_code', 'timings', 'duration_ms',
+                'response_size')
+        sql = "SELECT " + ", ".join('h.' + k for k in keys)
+        if with_bodies:
+            sql += (", h.response_body, b.encoding, b.data FROM request_history h "
+                    "LEFT OUTER JOIN response_blobs b ON b.hash = h.response_hash")
+        else:
+            sql += " FROM request_history h"
+        where, params = [], []
+        if since is not None:
+            where.append('h.created_at >= ?')
+            params.append(_to_db(since))
+        if until is not None:
+            where.append('h.created_at <= ?')
+            params.append(_to_db(until))
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY h.created_at, h.id"
+        with self._reader() as conn:
+            cursor = conn.execute(sql, params)
+            while True:
+                chunk = cursor.fetchmany(self.IMPORT_BATCH)
+                if not chunk:
+                    return
+                for row in chunk:
+                    item = dict(zip(keys, row))
+                    item['created_at'] = _from_db(item['created_at'])
+                    if with_bodies:
+                        legacy, encoding, data = row[len(keys):]
+                        item['response'] = legacy if data is None else \
+                            decompress_body(encoding, data).decode('utf-8', errors='replace')
+                    yield item
+
+    def prune_history(self, policy=None):
+        """Delete history rows (and old rollups) outside the retention policy. Returns rows deleted."""
+        policy = policy or self.retention
+        if policy is None:
+            return 0
+        rollup_cutoff = policy.rollup_cutoff()
+        if rollup_cutoff is not None:
+            with self._write() as conn:
+                conn.execute("DELETE FROM endpoint_rollups WHERE minute < ?", (rollup_cutoff,))
+        doomed = set()
+        conn = self._conn()
+        if policy.max_age_days is not None:
+            cutoff = datetime.utcnow() - timedelta(days=policy.max_age_days)
+            doomed.update(r for (r,) in conn.execute("SELECT id FROM request_history WHERE created_at < ?",
+                                                     (_to_db(cutoff),)))
+        if policy.max_rows is not None:
+            doomed.update(r for (r,) in conn.execute(
+                "SELECT id FROM request_history ORDER BY created_at DESC, id DESC LIMIT -1 OFFSET ?",
+                (policy.max_rows,)))
+        if policy.max_bytes is not None:
+            # a shared blob is charged once, to the newest row that references it
+            doomed.update(r for (r,) in conn.execute(
+                "SELECT id FROM (SELECT id, sum(size + CASE WHEN blob_rank = 1 THEN blob_size ELSE 0 END) "
+                "OVER (ORDER BY created_at DESC, id DESC) AS running FROM ("
+                "SELECT h.id AS id, h.created_at AS created_at, coalesce(length(h.url), 0) "
+                "+ coalesce(length(h.headers), 0) + coalesce(length(h.body), 0) "
+                "+ coalesce(length(h.response_body), 0) AS size, coalesce(length(b.data), 0) AS blob_size, "
+                "row_number() OVER (PARTITION BY h.response_hash ORDER BY h.created_at DESC, h.id DESC) AS blob_rank "
+                "FROM request_history h LEFT OUTER JOIN response_blobs b ON b.hash = h.response_hash)) "
+                "WHERE running > ?", (policy.max_bytes,)))
+        doomed = sorted(doomed)
+        for batch in _batches(doomed, self.PRUNE_BATCH):
+            with self._write() as conn:
+                conn.executemany("DELETE FROM request_history WHERE id = ?", [(i,) for i in batch])
+                self._unindex(conn, 'history', batch)
+        if doomed:
+            self._delete_orphan_blobs()
+            self._incremental_vacuum()
+            self._emit('history', 'reload')
+        return len(doomed)
+
+    def _delete_orphan_blobs(self):
+        with self._write() as conn:
+            conn.execute("DELETE FROM response_blobs WHERE hash NOT IN "
+                         "(SELECT response_hash FROM request_history WHERE response_hash IS NOT NULL)")
+
+    @contextmanager
+    def _raw_connection(self):
+        yield self._conn()
+
+    # Environment methods
+    def create_environment(self, name, variables_json="{}"):
+        with self._write() as conn:
+            env_id = conn.execute("INSERT INTO environments (name, variables, created_at) VALUES (?, ?, ?)",
+                                  (name, variables_json, _to_db(datetime.utcnow()))).lastrowid
+        self._emit_by_id('environment', 'add', EnvironmentRow, 'environments', env_id)
+        return env_id
+
+    def get_environments(self):
+        return _rows(EnvironmentRow, self._conn().execute(
+            f"SELECT {_columns(EnvironmentRow)} FROM environments ORDER BY name"))
+
+    def update_environment(self, env_id, variables_json):
+        with self._write() as conn:
+            updated = conn.execute("UPDATE environments SET variables = ? WHERE id = ?",
+                                   (variables_json, env_id)).rowcount
+        if updated:
+            self._emit_by_id('environment', 'update', EnvironmentRow, 'environments', env_id)
+        return bool(updated)
+
+    def get_environment(self, env_id):
+        return _row(EnvironmentRow, self._conn().execute(
+            f"SELECT {_columns(EnvironmentRow)} FROM environments WHERE id = ?", (env_id,)).fetchone())
+
+    def delete_environment(self, env_id):
+        with self._write() as conn:
+            deleted = conn.execute("DELETE FROM environments WHERE id = ?", (env_id,)).rowcount
+        if deleted:
+            self._emit('environment', 'delete', env_id)
+        return bool(deleted)
+
+    # Template methods
+    def save_template(self, name, method, url, headers=None, body=None, assertions=None):
+        with self._write() as conn:
+            t_id = conn.execute(
+                "INSERT INTO templates (name, method, url, headers, body, assertions, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (name, method, url, headers, body, assertions, _to_db(datetime.utcnow()))).lastrowid
+            self._index(conn, 'template', t_id, name, url, headers, body)
+        self._emit_by_id('template', 'add', TemplateRow, 'templates', t_id)
+        return t_id
+
+    def update_template(self, template_id, name=None, method=None, url=None, headers=None, body=None, assertions=None):
+        changes = {k: v for k, v in (('name', name), ('method', method), ('url', url), ('headers', headers),
+                                     ('body', body), ('assertions', assertions)) if v is not None}
+        with self._write() as conn:
+            t = _row(TemplateRow, conn.execute(f"SELECT {_columns(TemplateRow)} FROM templates WHERE id = ?",
+                                               (template_id,)).fetchone())
+            if t is None:
+                return False
+            if changes:
+                conn.execute(f"UPDATE templates SET {', '.join(k + ' = ?' for k in changes)} WHERE id = ?",
+                             (*changes.values(), template_id))
+            t = t._replace(**changes)
+            self._index(conn, 'template', t.id, t.name, t.url, t.headers, t.body)
+        self._emit('template', 'update', t)
+        return True
+
+    def get_templates(self):
+        return _rows(TemplateRow, self._conn().execute(
+            f"SELECT {_columns(TemplateRow)} FROM templates ORDER BY created_at DESC"))
+
+    def get_template(self, template_id):
+        return _row(TemplateRow, self._conn().execute(
+            f"SELECT {_columns(TemplateRow)} FROM templates WHERE id = ?", (template_id,)).fetchone())
+
+    def delete_template(self, template_id):
+        with self._write() as conn:
+            deleted = conn.execute("DELETE FROM templates WHERE id = ?", (template_id,)).rowcount
+            if deleted:
+                self._unindex(conn, 'template', [template_id])
+        if deleted:
+            self._emit('template', 'delete', template_id)
+        return bool(deleted)
+
+    # Workflow methods
+    def save_workflow(self, name, definition_json):
+        with self._write() as conn:
+            wf_id = conn.execute("INSERT INTO workflows (name, definition, created_at) VALUES (?, ?, ?)",
+                                 (name, definition_json, _to_db(datetime.utcnow()))).lastrowid
+        self._emit_by_id('workflow', 'add', WorkflowRow, 'workflows', wf_id)
+        return wf_id
+
+    def update_workflow(self, workflow_id, name=None, definition_json=None):
+        changes = {k: v for k, v in (('name', name), ('definition', definition_json)) if v is not None}
+        with self._write() as conn:
+            if not conn.execute("SELECT 1 FROM workflows WHERE id = ?", (workflow_id,)).fetchone():
+                return False
+            if changes:
+                conn.execute(f"UPDATE workflows SET {', '.join(k + ' = ?' for k in changes)} WHERE id = ?",
+                             (*changes.values(), workflow_id))
+        self._emit_by_id('workflow', 'update', WorkflowRow, 'workflows', workflow_id)
+        return True
+
+    def get_workflows(self):
+        return _rows(WorkflowRow, self._conn().execute(
+            f"SELECT {_columns(WorkflowRow)} FROM workflows ORDER BY name"))
+
+    def get_workflow(self, workflow_id):
+        return _row(WorkflowRow, self._conn().execute(
+            f"SELECT {_columns(WorkflowRow)} FROM workflows WHERE id = ?", (workflow_id,)).fetchone())
+
+    def delete_workflow(self, workflow_id):
+        with self._write() as conn:
+            deleted = conn.execute("DELETE FROM workflows WHERE id = ?", (workflow_id,)).rowcount
+        if deleted:
+            self._emit('workflow', 'delete', workflow_id)
+        return bool(deleted)
+
+    # Import / Export helpers
+    def import_environment_items(self, items, batch_size=None):
+        """Insert {'name', 'variables'} dicts from any iterable, in batches. Returns count."""
+        count = 0
+        now = datetime.utcnow()
+        with self._write() as conn:
+            for batch in _batches(items, batch_size or self.IMPORT_BATCH):
+                conn.executemany("INSERT INTO environments (name, variables, created_at) VALUES (?, ?, ?)",
+                                 [(item['name'], item.get('variables'), _to_db(item.get('created_at') or now))
+                                  for item in batch])
+                count += len(batch)
+        self._emit('environment', 'reload')
+        return count
+
+    def iter_environments(self):
+        """Yield every environment as a dict, streamed from the database."""
+        with self._reader() as conn:
+            for name, variables in conn.execute("SELECT name, variables FROM environments ORDER BY id"):
+                yield {'name': name, 'variables': variables}
+
+    def import_requests(self, items, collection_id=None, batch_size=None):
+        """Insert request dicts as templates, or into a collection, in batches; see storage.Storage."""
+        if collection_id is None:
+            kind, table = 'template', 'templates'
+            sql = ("INSERT INTO templates (name, method, url, headers, body, assertions, created_at) "
+                   "VALUES (?, ?, ?, ?, ?, ?, ?)")
+        else:
+            kind, table = 'saved_request', 'saved_requests'
+            sql = ("INSERT INTO saved_requests (name, method, url, headers, body, assertions, created_at, "
+                   "collection_id) VALUES (?, ?, ?, ?, ?, ?, ?, ?)")
+        extra = () if collection_id is None else (collection_id,)
+        count = 0
+        now = datetime.utcnow()
+        with self._write() as conn:
+            for batch in _batches(items, batch_size or self.IMPORT_BATCH):
+                last_id = conn.execute(f"SELECT coalesce(max(id), 0) FROM {table}").fetchone()[0]
+                conn.executemany(sql, [(item['name'], item['method'], item['url'], item.get('headers'),
+                                        item.get('body'), item.get('assertions'),
+                                        _to_db(item.get('created_at') or now)) + extra for item in batch])
+                # the write lock is held since BEGIN IMMEDIATE, so every id above the old maximum is from this batch
+                self._index_where(conn, kind, "id > ?", (last_id,))
+                count += len(batch)
+        self._emit(kind, 'reload')
+        return count
+
+    def iter_requests(self, collection_id=None):
+        """Yield templates (or a collection's requests) as dicts, streamed from the database."""
+        keys = ('name', 'method', 'url', 'headers', 'body', 'assertions')
+        if collection_id is None:
+            sql, params = f"SELECT {', '.join(keys)} FROM templates ORDER BY id", ()
+        else:
+            sql, params = f"SELECT {', '.join(keys)} FROM saved_requests WHERE collection_id = ? ORDER BY id", \
+                (collection_id,)
+        with self._reader() as conn:
+            for row in conn.execute(sql, params):
+                yield dict(zip(keys, row))
+
+    # Collections
+    def create_collection(self, name):
+        """Create a new request collection."""
+        with self._write() as conn:
+            collection_id = conn.execute("INSERT INTO collections (name, created_at) VALUES (?, ?)",
+                                         (name, _to_db(datetime.utcnow()))).lastrowid
+            self._index(conn, 'collection', collection_id, name)
+        self._emit_by_id('collection', 'add', CollectionRow, 'collections', collection_id)
+        return collection_id
+
+    def save_request(self, collection_id, name, method, url, headers=None, body=None, assertions=None):
+        """Save a request to a collection."""
+        with self._write() as conn:
+            request_id = conn.execute(
+                "INSERT INTO saved_requests (name, method, url, headers, body, assertions, collection_id, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (name, method, url, headers, body, assertions, collection_id, _to_db(datetime.utcnow()))).lastrowid
+            self._index(conn, 'saved_request', request_id, name, url, headers, body)
+        self._emit_by_id('saved_request', 'add', SavedRequestRow, 'saved_requests', request_id)
+        return request_id
+
+    def get_saved_request(self, request_id):
+        """Get a single saved request."""
+        return _row(SavedRequestRow, self._conn().execute(
+            f"SELECT {_columns(SavedRequestRow)} FROM saved_requests WHERE id = ?", (request_id,)).fetchone())
+
+    def get_collections(self):
+        """Get all collections."""
+        return _rows(CollectionRow, self._conn().execute(f"SELECT {_columns(CollectionRow)} FROM collections"))
+
+    def get_collection(self, collection_id):
+        """Get a specific collection."""
+        return _row(CollectionRow, self._conn().execute(
+            f"SELECT {_columns(CollectionRow)} FROM collections WHERE id = ?", (collection_id,)).fetchone())
+
+    def get_collection_requests(self, collection_id):
+        """Get the saved requests of a collection, in insertion order."""
+        return _rows(SavedRequestRow, self._conn().execute(
+            f"SELECT {_columns(SavedRequestRow)} FROM saved_requests WHERE collection_id = ? ORDER BY id",
+            (collection_id,)))
+
+    def delete_collection(self, collection_id):
+        """Delete a collection and all its requests."""
+        with self._write() as conn:
+            if not conn.execute("SELECT 1 FROM collections WHERE id = ?", (collection_id,)).fetchone():
+                return False
+            request_ids = [r for (r,) in conn.execute("SELECT id FROM saved_requests WHERE collection_id = ?",
+                                                      (collection_id,))]
+            self._unindex(conn, 'saved_request', request_ids)
+            self._unindex(conn, 'collection', [collection_id])
+            conn.execute("DELETE FROM saved_requests WHERE collection_id = ?", (collection_id,))
+            conn.execute("DELETE FROM collections WHERE id = ?", (collection_id,))
+        self._emit('collection', 'delete', collection_id)
+        return True
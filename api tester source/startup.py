@@ -0,0 +1,117 @@
+"""Import-time report for the desktop app's startup path.
+
+Runs ``python -X importtime -c "import ui"`` in fresh interpreters and
+reports what importing the UI costs: the total, the slowest direct imports
+and the slowest modules by their own time. It fails (exit code 1) when the
+median total is over ``--budget-ms`` or when a module that should load
+only after the window is shown (``DEFERRED_MODULES``) is imported.
+Modules the interpreter loads during ``site`` setup are not counted.
+
+    python startup.py
+    python startup.py --budget-ms 200 --runs 5
+    python main.py --startup-report
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+# loaded by App in the background once the window is up
+DEFERRED_MODULES = ('sqlalchemy', 'requests', 'urllib3', 'pygments', 'storage', 'sqlite_storage', 'requester',
+                    'httpcache')
+STARTUP_BUDGET_MS = 300
+
+
+def parse_importtime(text, target):
+    """[(module, self_ms, cumulative_ms, depth)] for ``target`` and everything it imported.
+
+    -X importtime lists a module after the modules it imported, indented
+    two spaces per level, so the subtree of a top-level import is every
+    line since the previous top-level line.
+    """
+    subtree = []
+    for line in text.splitlines():
+        if not line.startswith('import time:') or line.count('|') < 2:
+            continue
+        head, cumulative_us, name = line.split('|', 2)
+        self_us = head[len('import time:'):].strip()
+        if not self_us.isdigit():
+            continue  # the header line
+        depth = (len(name) - len(name.lstrip(' ')) - 1) // 2
+        entry = (name.strip(), int(self_us) / 1000, int(cumulative_us) / 1000, depth)
+        if depth == 0:
+            if entry[0] == target:
+                return subtree + [entry]
+            subtree = []
+        else:
+            subtree.append(entry)
+    return []
+
+
+def measure(target='ui', python=None, cwd=None):
+    """One fresh-interpreter import of ``target``; returns its parse_importtime entries."""
+    proc = subprocess.run([python or sys.executable, '-X', 'importtime', '-c', f'import {target}'],
+                          capture_output=True, text=True, cwd=cwd or os.path.dirname(os.path.abspath(__file__)))
+    if proc.returncode != 0:
+        raise RuntimeError(f"importing {target} failed:\n{proc.stderr[-2000:]}")
+    return parse_importtime(proc.stderr, target)
+
+
+def report(target='ui', runs=3, budget_ms=STARTUP_BUDGET_MS, top=10, python=None):
+    measured = [measure(target, python) for _ in range(max(1, runs))]
+    totals = [entries[-1][2] for entries in measured]
+    entries = measured[totals.index(sorted(totals)[len(totals) // 2])]
+    deferred = sorted({name for name, _, _, _ in entries
+                       if name.split('.')[0] in DEFERRED_MODULES})
+    total = statistics.median(totals)
+    return {
+        'target': target,
+        'total_ms': round(total, 1),
+        'runs_ms': [round(t, 1) for t in totals],
+        'budget_ms': budget_ms,
+        'modules': len(entries),
+        'direct': [(name, round(cum, 1)) for name, _, cum, depth in
+                   sorted(entries, key=lambda e: -e[2]) if depth == 1][:top],
+        'self': [(name, round(own, 1)) for name, own, _, _ in sorted(entries, key=lambda e: -e[1])][:top],
+        'deferred_imported': deferred,
+        'ok': total <= budget_ms and not deferred,
+    }
+
+
+def format_report(data):
+    lines = [f"import {data['target']}: {data['total_ms']:.1f} ms median of {data['runs_ms']} "
+             f"(budget {data['budget_ms']} ms), {data['modules']} modules"]
+    lines.append("slowest direct imports (cumulative):")
+    lines += [f"  {ms:8.1f} ms  {name}" for name, ms in data['direct']]
+    lines.append("slowest modules (self):")
+    lines += [f"  {ms:8.1f} ms  {name}" for name, ms in data['self']]
+    if data['deferred_imported']:
+        lines.append("imported before the window but should be deferred: " + ", ".join(data['deferred_imported']))
+    lines.append("OK" if data['ok'] else "OVER BUDGET" if not data['deferred_imported'] else "FAILED")
+    return '\n'.join(lines)
+
+
+def build_parser(parser=None):
+    parser = parser or argparse.ArgumentParser(description="Report the import time of the app's startup path.")
+    parser.add_argument('--module', default='ui', help="module the app imports before showing its window")
+    parser.add_argument('--runs', type=int, default=3)
+    parser.add_argument('--budget-ms', type=float, default=STARTUP_BUDGET_MS)
+    parser.add_argument('--top', type=int, default=10)
+    parser.add_argument('--json', action='store_true', help="print the report as JSON")
+    return parser
+
+
+def run_from_args(args):
+    data = report(args.module, runs=args.runs, budget_ms=args.budget_ms, top=args.top)
+    print(json.dumps(data, indent=2) if args.json else format_report(data))
+    return data
+
+
+def main(argv=None):
+    return 0 if run_from_args(build_parser().parse_args(argv))['ok'] else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,8 +1,17 @@
-from datetime import datetime
-import json
-from sqlalchemy import create_engine, Column, Integer, String, DateTime, Text, ForeignKey
+from datetime import datetime, timedelta
+import calendar
+import hashlib
+from contextlib import contextmanager
+from sqlalchemy import bindparam, case, create_engine, event, func, literal, or_, select, text, Column, Integer, Float, String, DateTime, Text, ForeignKey, Index, LargeBinary
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.exc import OperationalError
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker, relationship
+from sqlalchemy.orm import sessionmaker, relationship, defer
+from histogram import LatencyHistogram
+from metrics import RollupAccumulator
+from storage_base import (COMPRESS_MIN_SIZE, SEARCH_KINDS, SEARCH_RESPONSE_CHARS, SQLITE_PRAGMAS, HistoryWriter,
+                          RetentionPolicy, StorageBackend, _SEARCH_SOURCES, _SEARCH_WORD_RE, _batches, compress_body,
+                          configure_connection, decompress_body, search_query)
 
 Base = declarative_base()
 
@@ -21,6 +30,7 @@ class SavedRequest(Base):
     url = Column(String(2048), nullable=False)
     headers = Column(Text)  # JSON string
     body = Column(Text)
+    assertions = Column(Text)  # JSON list, see assertions.py
     collection_id = Column(Integer, ForeignKey('collections.id'))
     created_at = Column(DateTime, default=datetime.utcnow)
     collection = relationship("Collection", back_populates="requests")
@@ -33,7 +43,41 @@ class RequestHistory(Base):
     headers = Column(Text)  # JSON string
     body = Column(Text)
     response_code = Column(Integer)
-    response_body = Column(Text)
+    response_body = Column(Text)  # legacy rows only; new rows use response_hash
+    response_hash = Column(String(64))  # ResponseBlob.hash
+    timings = Column(Text)  # JSON, see timing.RequestTimings.as_dict
+    duration_ms = Column(Float)
+    response_size = Column(Integer)  # bytes
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        Index('ix_request_history_created_at', 'created_at', 'id'),
+        Index('ix_request_history_url', 'url'),
+        Index('ix_request_history_method', 'method'),
+        Index('ix_request_history_response_hash', 'response_hash'),
+    )
+
+class EndpointRollup(Base):
+    """Per-endpoint, per-minute aggregate of history (see metrics.py)."""
+    __tablename__ = 'endpoint_rollups'
+    endpoint = Column(String(2048), primary_key=True)  # metrics.endpoint_key
+    minute = Column(Integer, primary_key=True)  # unix time // 60
+    count = Column(Integer, nullable=False, default=0)
+    errors = Column(Integer, nullable=False, default=0)
+    total_bytes = Column(Integer, nullable=False, default=0)
+    sketch = Column(LargeBinary, nullable=False)  # LatencyHistogram.to_bytes
+
+    __table_args__ = (
+        Index('ix_endpoint_rollups_minute', 'minute'),
+    )
+
+class ResponseBlob(Base):
+    """Response body stored once per distinct content, keyed by SHA-256."""
+    __tablename__ = 'response_blobs'
+    hash = Column(String(64), primary_key=True)
+    encoding = Column(String(10), nullable=False)  # 'zstd', 'zlib' or 'raw'
+    size = Column(Integer, nullable=False)  # uncompressed bytes
+    data = Column(LargeBinary, nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow)
 
 class Environment(Base):
@@ -51,28 +95,287 @@ class Template(Base):
     url = Column(String(2048), nullable=False)
     headers = Column(Text)
     body = Column(Text)
+    assertions = Column(Text)  # JSON list, see assertions.py
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+class SavedWorkflow(Base):
+    __tablename__ = 'workflows'
+    id = Column(Integer, primary_key=True)
+    name = Column(String(100), nullable=False)
+    definition = Column(Text, nullable=False)  # JSON, see workflow.Workflow.from_dict
     created_at = Column(DateTime, default=datetime.utcnow)
 
-class Storage:
-    def __init__(self, db_path='requests.db'):
+class Storage(StorageBackend):
+    """SQLAlchemy ORM backend; rows are returned as detached ORM objects."""
+
+    def __init__(self, db_path='requests.db', retention=None, search_responses=False):
+        super().__init__(retention, search_responses)
         self.engine = create_engine(f'sqlite:///{db_path}')
+        event.listen(self.engine, 'connect', self._on_connect)
+        event.listen(self.engine, 'begin', self._on_begin)
         Base.metadata.create_all(self.engine)
+        self._migrate()
         self.Session = sessionmaker(bind=self.engine)
+        self.search_enabled = self._create_search_index()
+
+    @staticmethod
+    def _on_connect(dbapi_conn, connection_record):
+        configure_connection(dbapi_conn)
+        # pysqlite would BEGIN lazily before the first write, leaving earlier
+        # reads outside the transaction; _on_begin issues BEGIN itself
+        dbapi_conn.isolation_level = None
+
+    @staticmethod
+    def _on_begin(conn):
+        conn.exec_driver_sql('BEGIN IMMEDIATE' if conn.get_execution_options().get('immediate') else 'BEGIN')
 
-    def add_to_history(self, method, url, headers, body, response_code, response_body):
-        """Add a request and its response to history."""
+    @contextmanager
+    def _write_session(self):
+        """A session whose transaction takes the write lock up front (BEGIN IMMEDIATE),
+        so what it reads cannot change before it commits."""
         with self.Session() as session:
-            history = RequestHistory(
-                method=method,
-                url=url,
-                headers=headers,
-                body=body,
-                response_code=response_code,
-                response_body=response_body
-            )
-            session.add(history)
+            session.connection(execution_options={'immediate': True})
+            yield session
+
+    def close(self):
+        """Write out queued history and release every pooled connection."""
+        super().close()
+        self.engine.dispose()
+
+    def _migrate(self):
+        """Bring databases created by older versions up to the current schema."""
+        with self.engine.begin() as conn:
+            for table in Base.metadata.sorted_tables:
+                existing = {row[1] for row in conn.exec_driver_sql(f"PRAGMA table_info('{table.name}')")}
+                for column in table.columns:
+                    if column.name not in existing:
+                        col_type = column.type.compile(dialect=self.engine.dialect)
+                        conn.exec_driver_sql(f'ALTER TABLE {table.name} ADD COLUMN {column.name} {col_type}')
+            for index in RequestHistory.__table__.indexes:
+                index.create(conn, checkfirst=True)
+
+    # Full-text search
+    def _create_search_index(self):
+        """Create the FTS5 index, filling it on first creation; False without FTS5."""
+        with self.engine.begin() as conn:
+            if conn.exec_driver_sql("SELECT 1 FROM sqlite_master WHERE name = 'search_index'").first():
+                return True
+            try:
+                conn.exec_driver_sql(
+                    "CREATE VIRTUAL TABLE search_index USING fts5("
+                    "kind UNINDEXED, ref_id UNINDEXED, title, url, headers, body, response, prefix='2 3')")
+            except OperationalError:
+                return False  # sqlite built without FTS5: search() falls back to LIKE
+        self.search_enabled = True
+        self.rebuild_search_index()
+        return True
+
+    def _index(self, session, kind, ref_id, title=None, url=None, headers=None, body=None, response=None):
+        """Insert or replace one row of the search index (caller commits)."""
+        if not self.search_enabled:
+            return
+        if isinstance(response, bytes):
+            response = response.decode('utf-8', errors='replace')
+        session.execute(
+            text("INSERT OR REPLACE INTO search_index(rowid, kind, ref_id, title, url, headers, body, response) "
+                 "VALUES (:rowid, :kind, :ref_id, :title, :url, :headers, :body, :response)"),
+            dict(rowid=ref_id * 8 + SEARCH_KINDS[kind], kind=kind, ref_id=ref_id, title=title or '', url=url or '',
+                 headers=headers or '', body=body or '', response=(response or '')[:SEARCH_RESPONSE_CHARS]))
+
+    def _index_where(self, session, kind, where='1', params=None):
+        """Index the rows of ``kind`` matching the SQL ``where`` in one statement."""
+        if not self.search_enabled:
+            return
+        table, title, url, headers, body = _SEARCH_SOURCES[kind]
+        session.execute(text(
+            "INSERT OR REPLACE INTO search_index(rowid, kind, ref_id, title, url, headers, body, response) "
+            f"SELECT id * 8 + {SEARCH_KINDS[kind]}, '{kind}', id, coalesce({title}, ''), coalesce({url}, ''), "
+            f"coalesce({headers}, ''), coalesce({body}, ''), '' FROM {table} WHERE {where}"), params or {})
+
+    def _unindex(self, session, kind, ref_ids):
+        if not self.search_enabled or not ref_ids:
+            return
+        code = SEARCH_KINDS[kind]
+        session.execute(text("DELETE FROM search_index WHERE rowid IN :rowids")
+                        .bindparams(bindparam('rowids', expanding=True)),
+                        dict(rowids=[i * 8 + code for i in ref_ids]))
+
+    def _index_history(self, session, row, response_body=None):
+        self._index(session, 'history', row.id, None, row.url, row.headers, row.body,
+                    response_body if self.search_responses else None)
+
+    def rebuild_search_index(self):
+        """Re-index every row, e.g. after changing search_responses."""
+        if not self.search_enabled:
+            return
+        with self.Session() as session:
+            session.execute(text("DELETE FROM search_index"))
+            for kind in _SEARCH_SOURCES:
+                self._index_where(session, kind)
+            h = RequestHistory
+            if self.search_responses:
+                rows = session.query(h.id, h.url, h.headers, h.body, h.response_body, ResponseBlob.encoding,
+                                     ResponseBlob.data)\
+                    .outerjoin(ResponseBlob, ResponseBlob.hash == h.response_hash)
+            else:
+                rows = session.query(h.id, h.url, h.headers, h.body, literal(None), literal(None), literal(None))
+            for row_id, url, headers, body, legacy, encoding, data in rows.yield_per(500):
+                response = legacy if data is None else decompress_body(encoding, data)
+                self._index(session, 'history', row_id, None, url, headers, body, response)
+            session.commit()
+
+    def search(self, query, kinds=None, limit=50):
+        """Ranked matches for ``query`` in names, URLs, headers and bodies.
+
+        Every word must match (as a word prefix); names weigh most, then
+        URLs, headers, bodies and responses. Returns dicts with kind, id,
+        title, url and snippet (matches wrapped in [brackets]), best first.
+        """
+        match = search_query(query)
+        if not match:
+            return []
+        if not self.search_enabled:
+            return self._search_like(query, kinds, limit)
+        sql = ("SELECT kind, ref_id, title, url, snippet(search_index, -1, '[', ']', '...', 12) "
+               "FROM search_index WHERE search_index MATCH :match")
+        params = dict(match=match, limit=limit)
+        stmt_kinds = [k for k in (kinds or ()) if k in SEARCH_KINDS]
+        if stmt_kinds:
+            sql += " AND kind IN :kinds"
+            params['kinds'] = stmt_kinds
+        sql += " ORDER BY bm25(search_index, 0, 0, 10.0, 5.0, 2.0, 1.0, 0.5) LIMIT :limit"
+        stmt = text(sql)
+        if stmt_kinds:
+            stmt = stmt.bindparams(bindparam('kinds', expanding=True))
+        with self.engine.connect() as conn:
+            rows = conn.execute(stmt, params).all()
+        return [dict(kind=k, id=i, title=t, url=u, snippet=s) for k, i, t, u, s in rows]
+
+    def _search_like(self, query, kinds, limit):
+        """Unranked substring search on names and URLs, for sqlite builds without FTS5."""
+        words = _SEARCH_WORD_RE.findall(query)
+        sources = [('template', Template, Template.name, Template.url),
+                   ('saved_request', SavedRequest, SavedRequest.name, SavedRequest.url),
+                   ('collection', Collection, Collection.name, None),
+                   ('history', RequestHistory, None, RequestHistory.url)]
+        out = []
+        with self.Session() as session:
+            for kind, model, name_col, url_col in sources:
+                if kinds and kind not in kinds:
+                    continue
+                q = session.query(model.id, name_col if name_col is not None else literal(''),
+                                  url_col if url_col is not None else literal(''))
+                for w in words:
+                    like = f'%{w}%'
+                    q = q.filter(or_(*[c.like(like) for c in (name_col, url_col) if c is not None]))
+                for ref_id, title, url in q.order_by(model.id.desc()).limit(limit - len(out)):
+                    out.append(dict(kind=kind, id=ref_id, title=title, url=url, snippet=title or url))
+                if len(out) >= limit:
+                    break
+        return out
+
+    def _emit_row(self, session, entity, action, obj):
+        """Emit a committed row, loaded and detached so listeners can read it anywhere."""
+        if not self._listeners:
+            return
+        session.refresh(obj)
+        session.expunge(obj)
+        self._emit(entity, action, obj)
+
+    def _write_history(self, items):
+        rollup = RollupAccumulator()
+        rows = []
+        # IMMEDIATE: a blob _store_blob finds must not be pruned as an orphan before the rows referencing it commit
+        with self._write_session() as session:
+            for item in items:
+                item = dict(item)
+                response_body = item.pop('response_body')
+                add_rollup = item.pop('rollup', True)
+                row = RequestHistory(response_hash=self._store_blob(session, response_body), **item)
+                session.add(row)
+                rows.append((row, response_body))
+                if add_rollup and row.duration_ms is not None:
+                    rollup.add(row.method, row.url, row.duration_ms, row.response_code, row.response_size,
+                               calendar.timegm(row.created_at.timetuple()))
+            session.flush()
+            for row, response_body in rows:
+                self._index_history(session, row, response_body)
+            if rollup:
+                self._merge_rollups(session, rollup)
             session.commit()
-            return history.id
+            ids = [row.id for row, _ in rows]
+            for row, _ in rows:
+                self._emit_row(session, 'history', 'add', row)
+            return ids
+
+    def _merge_rollups(self, session, accumulator):
+        """Fold a RollupAccumulator into endpoint_rollups (caller commits)."""
+        for (endpoint, minute), b in accumulator.buckets.items():
+            row = session.get(EndpointRollup, (endpoint, minute))
+            if row is None:
+                session.add(EndpointRollup(endpoint=endpoint, minute=minute, count=b['count'], errors=b['errors'],
+                                           total_bytes=b['bytes'], sketch=b['sketch'].to_bytes()))
+            else:
+                row.count += b['count']
+                row.errors += b['errors']
+                row.total_bytes += b['bytes']
+                row.sketch = LatencyHistogram.from_bytes(row.sketch).merge(b['sketch']).to_bytes()
+
+    def get_endpoints(self, since=None, until=None):
+        """[(endpoint, request count)] with rollups in the range, busiest first."""
+        lo, hi = self._minute_range(since, until)
+        with self.Session() as session:
+            total = func.sum(EndpointRollup.count)
+            return session.query(EndpointRollup.endpoint, total)\
+                .filter(EndpointRollup.minute >= lo, EndpointRollup.minute <= hi)\
+                .group_by(EndpointRollup.endpoint)\
+                .order_by(total.desc())\
+                .all()
+
+    def _rollup_rows(self, endpoint, lo, hi):
+        r = EndpointRollup
+        with self.Session() as session:
+            return session.query(r.minute, r.sketch, r.count, r.errors, r.total_bytes)\
+                .filter(r.endpoint == endpoint, r.minute >= lo, r.minute <= hi)\
+                .order_by(r.minute)\
+                .all()
+
+    def _store_blob(self, session, response_body):
+        if response_body is None:
+            return None
+        raw = response_body.encode('utf-8') if isinstance(response_body, str) else bytes(response_body)
+        digest = hashlib.sha256(raw).hexdigest()
+        exists = session.query(ResponseBlob.hash).filter(ResponseBlob.hash == digest).first()
+        if not exists:
+            encoding, data = compress_body(raw)
+            session.execute(
+                sqlite_insert(ResponseBlob)
+                .values(hash=digest, encoding=encoding, size=len(raw), data=data, created_at=datetime.utcnow())
+                .on_conflict_do_nothing(index_elements=['hash'])
+            )
+        return digest
+
+    def get_history_item(self, history_id):
+        """One history row without its response body (see get_response_body)."""
+        with self.Session() as session:
+            return session.query(RequestHistory)\
+                .options(defer(RequestHistory.response_body))\
+                .filter(RequestHistory.id == history_id)\
+                .first()
+
+    def get_response_body(self, history_id):
+        """Load and decompress the response body of one history row (or None)."""
+        with self.Session() as session:
+            row = session.query(RequestHistory.response_body, ResponseBlob.encoding, ResponseBlob.data)\
+                .outerjoin(ResponseBlob, ResponseBlob.hash == RequestHistory.response_hash)\
+                .filter(RequestHistory.id == history_id)\
+                .first()
+        if row is None:
+            return None
+        legacy, encoding, data = row
+        if data is None:
+            return legacy
+        return decompress_body(encoding, data).decode('utf-8', errors='replace')
 
     # Environment methods
     def create_environment(self, name, variables_json="{}"):
@@ -80,6 +383,7 @@ class Storage:
             env = Environment(name=name, variables=variables_json)
             session.add(env)
             session.commit()
+            self._emit_row(session, 'environment', 'add', env)
             return env.id
 
     def get_environments(self):
@@ -92,6 +396,7 @@ class Storage:
             if env:
                 env.variables = variables_json
                 session.commit()
+                self._emit_row(session, 'environment', 'update', env)
                 return True
             return False
     
@@ -105,18 +410,22 @@ class Storage:
             if env:
                 session.delete(env)
                 session.commit()
+                self._emit('environment', 'delete', env_id)
                 return True
             return False
 
     # Template methods
-    def save_template(self, name, method, url, headers=None, body=None):
+    def save_template(self, name, method, url, headers=None, body=None, assertions=None):
         with self.Session() as session:
-            t = Template(name=name, method=method, url=url, headers=headers, body=body)
+            t = Template(name=name, method=method, url=url, headers=headers, body=body, assertions=assertions)
             session.add(t)
+            session.flush()
+            self._index(session, 'template', t.id, t.name, t.url, t.headers, t.body)
             session.commit()
+            self._emit_row(session, 'template', 'add', t)
             return t.id
 
-    def update_template(self, template_id, name=None, method=None, url=None, headers=None, body=None):
+    def update_template(self, template_id, name=None, method=None, url=None, headers=None, body=None, assertions=None):
         with self.Session() as session:
             t = session.query(Template).filter(Template.id == template_id).first()
             if not t:
@@ -131,7 +440,11 @@ class Storage:
                 t.headers = headers
             if body is not None:
                 t.body = body
+            if assertions is not None:
+                t.assertions = assertions
+            self._index(session, 'template', t.id, t.name, t.url, t.headers, t.body)
             session.commit()
+            self._emit_row(session, 'template', 'update', t)
             return True
 
     def get_templates(self):
@@ -147,95 +460,253 @@ class Storage:
             t = session.query(Template).filter(Template.id == template_id).first()
             if t:
                 session.delete(t)
+                self._unindex(session, 'template', [template_id])
                 session.commit()
+                self._emit('template', 'delete', template_id)
+                return True
+            return False
+
+    # Workflow methods
+    def save_workflow(self, name, definition_json):
+        with self.Session() as session:
+            wf = SavedWorkflow(name=name, definition=definition_json)
+            session.add(wf)
+            session.commit()
+            self._emit_row(session, 'workflow', 'add', wf)
+            return wf.id
+
+    def update_workflow(self, workflow_id, name=None, definition_json=None):
+        with self.Session() as session:
+            wf = session.query(SavedWorkflow).filter(SavedWorkflow.id == workflow_id).first()
+            if not wf:
+                return False
+            if name is not None:
+                wf.name = name
+            if definition_json is not None:
+                wf.definition = definition_json
+            session.commit()
+            self._emit_row(session, 'workflow', 'update', wf)
+            return True
+
+    def get_workflows(self):
+        with self.Session() as session:
+            return session.query(SavedWorkflow).order_by(SavedWorkflow.name).all()
+
+    def get_workflow(self, workflow_id):
+        with self.Session() as session:
+            return session.query(SavedWorkflow).filter(SavedWorkflow.id == workflow_id).first()
+
+    def delete_workflow(self, workflow_id):
+        with self.Session() as session:
+            wf = session.query(SavedWorkflow).filter(SavedWorkflow.id == workflow_id).first()
+            if wf:
+                session.delete(wf)
+                session.commit()
+                self._emit('workflow', 'delete', workflow_id)
                 return True
             return False
 
     # Import / Export helpers
-    def export_environments(self):
-        """Return JSON string of all environments."""
-        with self.Session() as session:
-            envs = session.query(Environment).all()
-            out = []
-            for e in envs:
-                out.append({
-                    'id': e.id,
-                    'name': e.name,
-                    'variables': e.variables,
-                    'created_at': e.created_at.isoformat() if e.created_at else None,
-                })
-            return json.dumps(out, indent=2)
-
-    def import_environments(self, json_str):
-        """Import environments from a JSON string. Returns count imported."""
-        try:
-            data = json.loads(json_str)
-        except Exception:
-            return 0
+    def import_environment_items(self, items, batch_size=None):
+        """Insert {'name', 'variables'} dicts from any iterable, in batches. Returns count."""
         count = 0
+        now = datetime.utcnow()
         with self.Session() as session:
-            for item in data:
-                name = item.get('name') or 'imported'
-                variables = item.get('variables') or '{}'
-                env = Environment(name=name, variables=variables)
-                session.add(env)
-                count += 1
+            for batch in _batches(items, batch_size or self.IMPORT_BATCH):
+                session.execute(Environment.__table__.insert(),
+                                [{**item, 'created_at': item.get('created_at') or now} for item in batch])
+                count += len(batch)
             session.commit()
+        self._emit('environment', 'reload')
         return count
 
-    def export_templates(self):
-        with self.Session() as session:
-            tpls = session.query(Template).all()
-            out = []
-            for t in tpls:
-                out.append({
-                    'id': t.id,
-                    'name': t.name,
-                    'method': t.method,
-                    'url': t.url,
-                    'headers': t.headers,
-                    'body': t.body,
-                    'created_at': t.created_at.isoformat() if t.created_at else None,
-                })
-            return json.dumps(out, indent=2)
-
-    def import_templates(self, json_str):
-        try:
-            data = json.loads(json_str)
-        except Exception:
-            return 0
+    def iter_environments(self):
+        """Yield every environment as a dict, streamed from the database."""
+        e = Environment
+        with self.engine.connect() as conn:
+            rows = conn.execution_options(yield_per=self.IMPORT_BATCH)\
+                .execute(select(e.name, e.variables).order_by(e.id))
+            for row in rows:
+                yield dict(row._mapping)
+
+    def import_requests(self, items, collection_id=None, batch_size=None):
+        """Insert request dicts as templates, or into a collection, in batches.
+
+        ``items`` is any iterable of dicts with name, method, url, headers,
+        body and assertions (interchange.read_requests yields these); it
+        is consumed lazily and written with one executemany per batch, in a
+        single transaction. Returns the number of rows inserted.
+        """
+        model, kind = (Template, 'template') if collection_id is None else (SavedRequest, 'saved_request')
+        table = model.__table__
         count = 0
-        with self.Session() as session:
-            for item in data:
-                t = Template(
-                    name=item.get('name') or 'imported',
-                    method=item.get('method') or 'GET',
-                    url=item.get('url') or '',
-                    headers=item.get('headers') or None,
-                    body=item.get('body') or None,
-                )
-                session.add(t)
-                count += 1
+        now = datetime.utcnow()
+        extra = {} if collection_id is None else {'collection_id': collection_id}
+        with self._write_session() as session:
+            for batch in _batches(items, batch_size or self.IMPORT_BATCH):
+                rows = [{**item, 'created_at': item.get('created_at') or now, **extra} for item in batch]
+                last_id = session.execute(text(f"SELECT coalesce(max(id), 0) FROM {table.name}")).scalar()
+                session.execute(table.insert(), rows)
+                # the write lock is held since BEGIN, so every id above the old maximum is from this batch
+                self._index_where(session, kind, "id > :last_id", {'last_id': last_id})
+                count += len(batch)
             session.commit()
+        self._emit(kind, 'reload')
         return count
 
+    def iter_requests(self, collection_id=None):
+        """Yield templates (or a collection's requests) as dicts, streamed from the database."""
+        model = Template if collection_id is None else SavedRequest
+        stmt = select(model.name, model.method, model.url, model.headers, model.body, model.assertions)\
+            .order_by(model.id)
+        if collection_id is not None:
+            stmt = stmt.where(SavedRequest.collection_id == collection_id)
+        with self.engine.connect() as conn:
+            for row in conn.execution_options(yield_per=self.IMPORT_BATCH).execute(stmt):
+                yield dict(row._mapping)
+
     def get_history(self, limit=50):
-        """Get recent requests from history."""
+        """Get recent requests from history.
+
+        Response bodies are not loaded; use get_response_body(row.id).
+        """
         with self.Session() as session:
             return session.query(RequestHistory)\
-                .order_by(RequestHistory.created_at.desc())\
+                .options(defer(RequestHistory.response_body))\
+                .order_by(RequestHistory.created_at.desc(), RequestHistory.id.desc())\
                 .limit(limit)\
                 .all()
 
+    def get_history_page(self, limit=50, cursor=None, method=None, url=None):
+        """Keyset-paginated history, newest first.
+
+        Returns (rows, next_cursor); pass next_cursor back to get the
+        following page. next_cursor is None on the last page.
+        """
+        with self.Session() as session:
+            q = session.query(RequestHistory).options(defer(RequestHistory.response_body))
+            if method:
+                q = q.filter(RequestHistory.method == method)
+            if url:
+                q = q.filter(RequestHistory.url == url)
+            if cursor is not None:
+                created_at, row_id = cursor
+                q = q.filter(or_(
+                    RequestHistory.created_at < created_at,
+                    (RequestHistory.created_at == created_at) & (RequestHistory.id < row_id),
+                ))
+            rows = q.order_by(RequestHistory.created_at.desc(), RequestHistory.id.desc())\
+                .limit(limit + 1)\
+                .all()
+            next_cursor = None
+            if len(rows) > limit:
+                rows = rows[:limit]
+                next_cursor = (rows[-1].created_at, rows[-1].id)
+            return rows, next_cursor
+
+    def iter_history(self, since=None, until=None, with_bodies=False):
+        """Yield history rows as dicts, oldest first, streamed from the database.
+
+        With ``with_bodies`` each dict also has ``response`` (the decoded
+        response body, or None).
+        """
+        h = RequestHistory
+        cols = [h.id, h.created_at, h.method, h.url, h.headers, h.body, h.response_code, h.timings,
+                h.duration_ms, h.response_size]
+        stmt = select(*cols, *((h.response_body, ResponseBlob.encoding, ResponseBlob.data) if with_bodies else ()))
+        if with_bodies:
+            stmt = stmt.outerjoin(ResponseBlob, ResponseBlob.hash == h.response_hash)
+        if since is not None:
+            stmt = stmt.where(h.created_at >= since)
+        if until is not None:
+            stmt = stmt.where(h.created_at <= until)
+        with self.engine.connect() as conn:
+            for row in conn.execution_options(yield_per=self.IMPORT_BATCH).execute(stmt.order_by(h.created_at, h.id)):
+                item = dict(zip(('id', 'created_at', 'method', 'url', 'headers', 'body', 'response_code', 'timings',
+                                 'duration_ms', 'response_size'), row))
+                if with_bodies:
+                    legacy, encoding, data = row[len(cols):]
+                    item['response'] = legacy if data is None else \
+                        decompress_body(encoding, data).decode('utf-8', errors='replace')
+                yield item
+
+    def prune_history(self, policy=None):
+        """Delete history rows (and old rollups) outside the retention policy. Returns rows deleted."""
+        policy = policy or self.retention
+        if policy is None:
+            return 0
+        rollup_cutoff = policy.rollup_cutoff()
+        if rollup_cutoff is not None:
+            with self._write_session() as session:
+                session.query(EndpointRollup).filter(EndpointRollup.minute < rollup_cutoff)\
+                    .delete(synchronize_session=False)
+                session.commit()
+        doomed = set()
+        h = RequestHistory
+        with self.Session() as session:
+            if policy.max_age_days is not None:
+                cutoff = datetime.utcnow() - timedelta(days=policy.max_age_days)
+                doomed.update(r for (r,) in session.query(h.id).filter(h.created_at < cutoff))
+            if policy.max_rows is not None:
+                doomed.update(r for (r,) in session.query(h.id)
+                              .order_by(h.created_at.desc(), h.id.desc())
+                              .offset(policy.max_rows))
+            if policy.max_bytes is not None:
+                # a shared blob is charged once, to the newest row that references it
+                size = (func.coalesce(func.length(h.url), 0) + func.coalesce(func.length(h.headers), 0)
+                        + func.coalesce(func.length(h.body), 0) + func.coalesce(func.length(h.response_body), 0))
+                sized = session.query(
+                    h.id.label('id'), h.created_at.label('created_at'), size.label('size'),
+                    func.coalesce(func.length(ResponseBlob.data), 0).label('blob_size'),
+                    func.row_number().over(partition_by=h.response_hash,
+                                           order_by=(h.created_at.desc(), h.id.desc())).label('blob_rank'))\
+                    .outerjoin(ResponseBlob, ResponseBlob.hash == h.response_hash)\
+                    .subquery()
+                running = func.sum(sized.c.size + case((sized.c.blob_rank == 1, sized.c.blob_size), else_=0))\
+                    .over(order_by=(sized.c.created_at.desc(), sized.c.id.desc()))
+                sub = session.query(sized.c.id.label('id'), running.label('running')).subquery()
+                doomed.update(r for (r,) in session.query(sub.c.id).filter(sub.c.running > policy.max_bytes))
+        doomed = sorted(doomed)
+        for i in range(0, len(doomed), self.PRUNE_BATCH):
+            batch = doomed[i:i + self.PRUNE_BATCH]
+            with self.Session() as session:
+                session.query(h).filter(h.id.in_(batch)).delete(synchronize_session=False)
+                self._unindex(session, 'history', batch)
+                session.commit()
+        if doomed:
+            self._delete_orphan_blobs()
+            self._incremental_vacuum()
+            self._emit('history', 'reload')
+        return len(doomed)
+
+    def _delete_orphan_blobs(self):
+        with self._write_session() as session:
+            referenced = session.query(RequestHistory.response_hash)\
+                .filter(RequestHistory.response_hash.isnot(None))
+            session.query(ResponseBlob).filter(ResponseBlob.hash.notin_(referenced))\
+                .delete(synchronize_session=False)
+            session.commit()
+
+    @contextmanager
+    def _raw_connection(self):
+        raw = self.engine.raw_connection()
+        try:
+            yield raw.driver_connection
+        finally:
+            raw.close()
+
     def create_collection(self, name):
         """Create a new request collection."""
         with self.Session() as session:
             collection = Collection(name=name)
             session.add(collection)
+            session.flush()
+            self._index(session, 'collection', collection.id, name)
             session.commit()
+            self._emit_row(session, 'collection', 'add', collection)
             return collection.id
 
-    def save_request(self, collection_id, name, method, url, headers=None, body=None):
+    def save_request(self, collection_id, name, method, url, headers=None, body=None, assertions=None):
         """Save a request to a collection."""
         with self.Session() as session:
             request = SavedRequest(
@@ -244,12 +715,21 @@ class Storage:
                 method=method,
                 url=url,
                 headers=headers,
-                body=body
+                body=body,
+                assertions=assertions
             )
             session.add(request)
+            session.flush()
+            self._index(session, 'saved_request', request.id, name, url, headers, body)
             session.commit()
+            self._emit_row(session, 'saved_request', 'add', request)
             return request.id
 
+    def get_saved_request(self, request_id):
+        """Get a single saved request."""
+        with self.Session() as session:
+            return session.query(SavedRequest).filter(SavedRequest.id == request_id).first()
+
     def get_collections(self):
         """Get all collections with their requests."""
         with self.Session() as session:
@@ -260,12 +740,23 @@ class Storage:
         with self.Session() as session:
             return session.query(Collection).filter(Collection.id == collection_id).first()
 
+    def get_collection_requests(self, collection_id):
+        """Get the saved requests of a collection, in insertion order."""
+        with self.Session() as session:
+            return session.query(SavedRequest)\
+                .filter(SavedRequest.collection_id == collection_id)\
+                .order_by(SavedRequest.id)\
+                .all()
+
     def delete_collection(self, collection_id):
         """Delete a collection and all its requests."""
         with self.Session() as session:
             collection = session.query(Collection).filter(Collection.id == collection_id).first()
             if collection:
+                self._unindex(session, 'saved_request', [r.id for r in collection.requests])
+                self._unindex(session, 'collection', [collection_id])
                 session.delete(collection)
                 session.commit()
+                self._emit('collection', 'delete', collection_id)
                 return True
             return False
\ No newline at end of file
@@ -0,0 +1,454 @@
+"""Storage backend interface and the parts shared by every backend.
+
+Two backends implement ``StorageBackend`` over the same SQLite schema, so
+either can open a database written by the other:
+
+- ``storage.Storage``: SQLAlchemy ORM, returns detached ORM objects
+- ``sqlite_storage.SQLiteStorage``: the sqlite3 module, returns named tuples
+  with the same attribute names; no SQLAlchemy import, less per-row work
+
+``open_storage`` picks one: ``backend`` argument, else the
+API_TESTER_STORAGE environment variable, else ``DEFAULT_BACKEND``. This
+module itself never imports SQLAlchemy.
+"""
+import calendar
+import json
+import logging
+import os
+import queue
+import re
+import threading
+import zlib
+from datetime import datetime, timedelta
+from histogram import LatencyHistogram
+from metrics import SKETCH_BITS, summarize
+
+try:
+    import zstandard  # optional: better ratio/speed than zlib for response blobs
+except ImportError:
+    zstandard = None
+
+log = logging.getLogger(__name__)
+
+# name -> (module, class); the app and the CLI use the sqlite3 one by default
+STORAGE_BACKENDS = {
+    'sqlite': ('sqlite_storage', 'SQLiteStorage'),
+    'sqlalchemy': ('storage', 'Storage'),
+}
+DEFAULT_BACKEND = 'sqlite'
+
+# Bodies smaller than this are stored uncompressed
+COMPRESS_MIN_SIZE = 256
+
+
+def compress_body(raw):
+    """Return (encoding, data) for a body given as bytes."""
+    if len(raw) >= COMPRESS_MIN_SIZE:
+        if zstandard is not None:
+            data, encoding = zstandard.ZstdCompressor(level=3).compress(raw), 'zstd'
+        else:
+            data, encoding = zlib.compress(raw, 6), 'zlib'
+        if len(data) < len(raw):
+            return encoding, data
+    return 'raw', raw
+
+
+def decompress_body(encoding, data):
+    if encoding == 'zstd':
+        if zstandard is None:
+            raise RuntimeError("response blob is zstd-compressed but zstandard is not installed")
+        return zstandard.ZstdDecompressor().decompress(data)
+    if encoding == 'zlib':
+        return zlib.decompress(data)
+    return data
+
+
+class RetentionPolicy:
+    """Limits applied by Storage.prune_history; None disables a limit.
+
+    - max_rows: keep only the newest N history rows
+    - max_age_days: drop rows older than this
+    - max_bytes: keep the newest rows whose stored text fits in this budget
+    - rollup_max_age_days: drop per-minute endpoint rollups older than this
+      (default: max_age_days)
+    """
+
+    def __init__(self, max_rows=None, max_age_days=None, max_bytes=None, rollup_max_age_days=None):
+        self.max_rows = max_rows
+        self.max_age_days = max_age_days
+        self.max_bytes = max_bytes
+        self.rollup_max_age_days = rollup_max_age_days if rollup_max_age_days is not None else max_age_days
+
+    def rollup_cutoff(self):
+        """Epoch minute before which rollups are dropped, or None to keep them all."""
+        if self.rollup_max_age_days is None:
+            return None
+        cutoff = datetime.utcnow() - timedelta(days=self.rollup_max_age_days)
+        return calendar.timegm(cutoff.timetuple()) // 60
+
+
+# search_index rowid is id * 8 + kind code, so every indexed row has its own slot
+SEARCH_KINDS = {'history': 1, 'template': 2, 'saved_request': 3, 'collection': 4}
+# response bodies are indexed up to this many characters
+SEARCH_RESPONSE_CHARS = 16384
+_SEARCH_WORD_RE = re.compile(r'\w+')
+# kind -> (table, title, url, headers, body) columns for set-based indexing
+_SEARCH_SOURCES = {
+    'template': ('templates', 'name', 'url', 'headers', 'body'),
+    'saved_request': ('saved_requests', 'name', 'url', 'headers', 'body'),
+    'collection': ('collections', 'name', 'NULL', 'NULL', 'NULL'),
+}
+
+
+def search_query(query):
+    """FTS5 MATCH expression requiring every word of ``query``, as a prefix."""
+    words = _SEARCH_WORD_RE.findall(query or '')
+    # single characters match whole tokens only; a one-letter prefix scan is slow
+    return ' '.join(f'"{w}"*' if len(w) > 1 else f'"{w}"' for w in words)
+
+
+# Applied to every new connection. WAL lets reads proceed while a write is in
+# progress; with synchronous=NORMAL a commit is not fsynced until the next
+# checkpoint (a crash may lose the last commits but never corrupts the file).
+SQLITE_PRAGMAS = (
+    'PRAGMA journal_mode=WAL',
+    'PRAGMA synchronous=NORMAL',
+    'PRAGMA busy_timeout=5000',
+    'PRAGMA temp_store=MEMORY',
+    'PRAGMA cache_size=-16384',  # KiB
+    'PRAGMA mmap_size=134217728',
+)
+
+
+def configure_connection(dbapi_conn):
+    """Apply SQLITE_PRAGMAS to a new sqlite3 connection."""
+    # Only takes effect for new databases (and would wait for the write
+    # lock on existing ones); vacuum() converts old ones.
+    if dbapi_conn.execute('PRAGMA page_count').fetchone()[0] == 0:
+        dbapi_conn.execute('PRAGMA auto_vacuum=INCREMENTAL')
+    for pragma in SQLITE_PRAGMAS:
+        dbapi_conn.execute(pragma)
+
+
+_STOP = object()
+
+
+class HistoryWriter:
+    """Background thread that writes queued history rows in grouped transactions.
+
+    Each batch takes whatever is queued (up to ``batch_size`` rows) when the
+    previous one is done, so a single send is written straight away and a
+    load run costs one commit per batch instead of one per request.
+
+    A batch that fails is retried row by row, so only the rows that fail on
+    their own are lost. Those are counted in ``dropped``, logged, kept in
+    ``last_error`` and reported to listeners as a 'history' 'error' event.
+    """
+
+    def __init__(self, storage, batch_size=500, max_pending=10000):
+        self.storage = storage
+        self.batch_size = batch_size
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._thread = None
+        self._lock = threading.Lock()
+        self.written = 0
+        self.batches = 0
+        self.dropped = 0
+        self.last_error = None
+
+    def put(self, item):
+        """Queue one row (blocks only while ``max_pending`` rows are waiting)."""
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='history-writer', daemon=True)
+                self._thread.start()
+        self._queue.put(item)
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            while batch[-1] is not _STOP and len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            rows = [item for item in batch if item is not _STOP]
+            try:
+                if rows:
+                    self._write(rows)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+            if batch[-1] is _STOP:
+                return
+
+    def _write(self, rows):
+        try:
+            self.storage._write_history(rows)
+        except Exception as e:
+            if len(rows) == 1:
+                self._drop(rows, e)
+                return
+            # the batch was rolled back; find the rows that fail on their own
+            for row in rows:
+                self._write([row])
+            return
+        self.written += len(rows)
+        self.batches += 1
+
+    def _drop(self, rows, error):
+        self.dropped += len(rows)
+        self.last_error = error
+        log.error("history row for %s %s not saved: %s", rows[0].get('method'), rows[0].get('url'), error)
+        try:
+            self.storage._emit('history', 'error', error)
+        except Exception:
+            log.exception("history error listener failed")
+
+    def flush(self):
+        """Block until every queued row has been written."""
+        self._queue.join()
+
+    def close(self):
+        with self._lock:
+            thread = self._thread
+        if thread is not None and thread.is_alive():
+            self._queue.put(_STOP)
+            thread.join()
+
+
+def _batches(items, size):
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+class StorageBackend:
+    """What the app, the CLI and the tests rely on from a storage backend.
+
+    Backends implement the CRUD methods for environments, templates,
+    workflows, collections and saved requests; history (``_write_history``,
+    ``get_history``, ``get_history_page``, ``get_history_item``,
+    ``get_response_body``, ``iter_history``, ``prune_history``); rollups
+    (``get_endpoints``, ``_rollup_rows``); ``search``; and the bulk
+    ``import_requests``/``iter_requests``/``import_environment_items``/
+    ``iter_environments``. Everything below is built on those.
+    """
+
+    # rows deleted per transaction while pruning, so writers are never blocked long
+    PRUNE_BATCH = 1000
+    # rows per executemany when importing, and per fetch when exporting
+    IMPORT_BATCH = 1000
+
+    def __init__(self, retention=None, search_responses=False):
+        self.retention = retention
+        self._listeners = []
+        # index history response bodies too (bigger index, slower inserts)
+        self.search_responses = search_responses
+        self.history_writer = HistoryWriter(self)
+
+    def close(self):
+        """Write out queued history and release the database."""
+        self.history_writer.close()
+
+    # Change notifications
+    def subscribe(self, callback):
+        """Register ``callback(entity, action, payload)`` for committed changes.
+
+        entity is 'history', 'template', 'collection', 'saved_request' or
+        'environment'; action is 'add', 'update', 'delete' or 'reload'.
+        payload is the detached row for add/update, the id for delete and
+        None for reload (bulk changes such as imports and pruning).
+        History queued with queue_history that could not be written is
+        reported as 'history' 'error' with the exception as payload.
+        Callbacks run on the thread that made the change. Returns a
+        function that unsubscribes.
+        """
+        self._listeners.append(callback)
+        return lambda: self._listeners.remove(callback)
+
+    def _emit(self, entity, action, payload=None):
+        for callback in list(self._listeners):
+            callback(entity, action, payload)
+
+    # History
+    def add_to_history(self, method, url, headers, body, response_code, response_body, timings=None,
+                       duration_ms=None, response_size=None, rollup=True):
+        """Add a request and its response to history, returning the new id.
+
+        The response body goes to the response_blobs table, shared by every
+        history row with identical content. Rows with a duration are also
+        folded into the endpoint's per-minute rollup, unless ``rollup`` is
+        False (responses answered from a local cache say nothing about the
+        endpoint's latency).
+        """
+        return self._write_history([dict(
+            method=method, url=url, headers=headers, body=body, response_code=response_code,
+            response_body=response_body, timings=timings, duration_ms=duration_ms, response_size=response_size,
+            created_at=datetime.utcnow(), rollup=rollup)])[0]
+
+    def queue_history(self, method, url, headers, body, response_code, response_body, timings=None,
+                      duration_ms=None, response_size=None, rollup=True):
+        """Like add_to_history, but returns at once; the row is written by the
+        background HistoryWriter together with others queued meanwhile.
+        Listeners get the usual 'history' 'add' event once it is committed.
+        """
+        self.history_writer.put(dict(
+            method=method, url=url, headers=headers, body=body, response_code=response_code,
+            response_body=response_body, timings=timings, duration_ms=duration_ms, response_size=response_size,
+            created_at=datetime.utcnow(), rollup=rollup))
+
+    def flush_history(self):
+        """Wait until everything passed to queue_history is committed."""
+        self.history_writer.flush()
+
+    def _write_history(self, items):
+        """Insert history rows (dicts of add_to_history arguments) in one transaction; returns ids."""
+        raise NotImplementedError
+
+    def prune_history(self, policy=None):
+        raise NotImplementedError
+
+    def prune_history_in_background(self, policy=None, callback=None):
+        """Run prune_history on a daemon thread; callback(deleted) runs on that thread."""
+        def run():
+            deleted = self.prune_history(policy)
+            if callback:
+                callback(deleted)
+
+        worker = threading.Thread(target=run, name='history-prune', daemon=True)
+        worker.start()
+        return worker
+
+    def _raw_connection(self):
+        """Context manager yielding a sqlite3 connection outside any transaction."""
+        raise NotImplementedError
+
+    def _incremental_vacuum(self):
+        """Hand pages freed by a prune back to the OS (incremental auto_vacuum databases only)."""
+        with self._raw_connection() as conn:
+            if conn.execute('PRAGMA auto_vacuum').fetchone()[0] == 2:
+                # executescript steps the pragma to completion (execute frees one page)
+                conn.executescript('PRAGMA incremental_vacuum;')
+
+    def vacuum(self):
+        """Rewrite the database file, switching it to auto_vacuum=INCREMENTAL.
+
+        Databases created before auto_vacuum was set need this once for
+        pruning to shrink the file. It holds an exclusive lock for the whole
+        rewrite, so it is a maintenance command (cli.py vacuum), never run
+        in the background. Returns the file size (bytes) before and after.
+        """
+        self.flush_history()
+        with self._raw_connection() as conn:
+            def size():
+                return conn.execute('PRAGMA page_count').fetchone()[0] * conn.execute('PRAGMA page_size').fetchone()[0]
+            before = size()
+            conn.executescript('PRAGMA auto_vacuum=INCREMENTAL; VACUUM;')
+            return before, size()
+
+    # Rollups
+    @staticmethod
+    def _minute_range(since, until):
+        """Epoch-minute bounds for naive-UTC datetimes (default: last 7 days)."""
+        until = until or datetime.utcnow()
+        since = since or until - timedelta(days=7)
+        return calendar.timegm(since.timetuple()) // 60, calendar.timegm(until.timetuple()) // 60
+
+    def _rollup_rows(self, endpoint, lo, hi):
+        """(minute, sketch bytes, count, errors, total_bytes) of ``endpoint`` in [lo, hi], by minute."""
+        raise NotImplementedError
+
+    def get_endpoint_trend(self, endpoint, since=None, until=None, bucket_minutes=60):
+        """Latency/size stats for ``endpoint`` per ``bucket_minutes``, oldest first.
+
+        Each point has ``start`` (naive UTC datetime) plus the fields of
+        metrics.summarize; buckets without traffic are omitted.
+        """
+        points = {}
+        for minute, blob, count, errors, total_bytes in self._rollup_rows(endpoint, *self._minute_range(since, until)):
+            start = minute - minute % bucket_minutes
+            p = points.get(start)
+            if p is None:
+                p = points[start] = [LatencyHistogram(SKETCH_BITS), 0, 0, 0]
+            p[0].merge(LatencyHistogram.from_bytes(blob))
+            p[1] += count
+            p[2] += errors
+            p[3] += total_bytes
+        return [dict(start=datetime.utcfromtimestamp(start * 60), **summarize(*p)) for start, p in points.items()]
+
+    def get_endpoint_summary(self, endpoint, since=None, until=None):
+        """One summarize() dict for ``endpoint`` over the whole range."""
+        sketch, count, errors, total_bytes = LatencyHistogram(SKETCH_BITS), 0, 0, 0
+        for _, blob, c, e, b in self._rollup_rows(endpoint, *self._minute_range(since, until)):
+            sketch.merge(LatencyHistogram.from_bytes(blob))
+            count += c
+            errors += e
+            total_bytes += b
+        return summarize(sketch, count, errors, total_bytes)
+
+    # Import / Export helpers
+    def export_environments(self):
+        """Return JSON string of all environments."""
+        out = []
+        for e in sorted(self.get_environments(), key=lambda e: e.id):
+            out.append({
+                'id': e.id,
+                'name': e.name,
+                'variables': e.variables,
+                'created_at': e.created_at.isoformat() if e.created_at else None,
+            })
+        return json.dumps(out, indent=2)
+
+    def import_environments(self, json_str):
+        """Import environments from a JSON string. Returns count imported."""
+        try:
+            data = json.loads(json_str)
+        except Exception:
+            return 0
+        return self.import_environment_items(
+            {'name': item.get('name') or 'imported', 'variables': item.get('variables') or '{}'} for item in data)
+
+    def export_templates(self):
+        out = []
+        for t in sorted(self.get_templates(), key=lambda t: t.id):
+            out.append({
+                'id': t.id,
+                'name': t.name,
+                'method': t.method,
+                'url': t.url,
+                'headers': t.headers,
+                'body': t.body,
+                'assertions': t.assertions,
+                'created_at': t.created_at.isoformat() if t.created_at else None,
+            })
+        return json.dumps(out, indent=2)
+
+    def import_templates(self, json_str):
+        try:
+            data = json.loads(json_str)
+        except Exception:
+            return 0
+        return self.import_requests(dict(
+            name=item.get('name') or 'imported',
+            method=item.get('method') or 'GET',
+            url=item.get('url') or '',
+            headers=item.get('headers') or None,
+            body=item.get('body') or None,
+            assertions=item.get('assertions') or None,
+        ) for item in data)
+
+
+def open_storage(db_path='requests.db', backend=None, **kwargs):
+    """Open ``db_path`` with the named backend (see STORAGE_BACKENDS)."""
+    name = backend or os.environ.get('API_TESTER_STORAGE') or DEFAULT_BACKEND
+    if name not in STORAGE_BACKENDS:
+        raise ValueError(f"unknown storage backend {name!r} (choose from {', '.join(STORAGE_BACKENDS)})")
+    module_name, class_name = STORAGE_BACKENDS[name]
+    module = __import__(module_name)
+    return getattr(module, class_name)(db_path=db_path, **kwargs)
@@ -0,0 +1,125 @@
+import json
+
+import pytest
+
+import assertions
+import cli
+from assertions import AssertionDefinitionError, ResponseContext, compile_assertions
+from loadtest import LoadRunner
+from requester import Requester
+from runner import RequestSpec, run_one
+from workflow import Workflow, WorkflowRunner
+
+DEFINITIONS = json.dumps([
+    {'type': 'status', 'in': [200, 201]},
+    {'type': 'header', 'name': 'content-type', 'contains': 'json'},
+    {'type': 'jsonpath', 'path': '$.user.id', 'equals': 7},
+    {'type': 'jsonpath', 'path': '$.user.tags[0]', 'matches': '^a'},
+    {'type': 'schema', 'schema': {'type': 'object', 'required': ['user'],
+                                  'properties': {'user': {'type': 'object', 'properties': {'id': {'type': 'integer'}}}}}},
+    {'type': 'latency', 'max_ms': 100},
+    {'type': 'body', 'matches': '"tags":\\s*\\['},
+])
+
+
+def _ctx(body, status=200, elapsed=0.01):
+    loads = []
+
+    def loader():
+        loads.append(1)
+        return json.dumps(body).encode()
+    return ResponseContext(status, {'Content-Type': 'application/json'}, elapsed, loader), loads
+
+
+def test_compiled_once_and_body_decoded_once():
+    checks = compile_assertions(DEFINITIONS)
+    assert compile_assertions(DEFINITIONS) is checks
+    ctx, loads = _ctx({'user': {'id': 7, 'tags': ['admin']}})
+    assert checks.failures(ctx) == []
+    assert loads == [1]
+
+
+def test_failures_are_described():
+    checks = compile_assertions(DEFINITIONS)
+    ctx, _ = _ctx({'user': {'id': '7', 'tags': ['x']}}, status=404, elapsed=0.5)
+    failed = {desc: msg for desc, msg in checks.evaluate(ctx) if msg is not None}
+    assert failed['status in [200, 201]'] == 'got 404'
+    assert failed['$.user.id equals 7'] == 'got "7"'
+    assert '$.user.tags[0] matches "^a"' in failed
+    assert 'latency <= 100 ms' in failed
+    assert 'matches JSON schema' in failed
+    assert len(failed) == 5
+
+
+def test_body_checks_refuse_oversized_bodies():
+    checks = compile_assertions([{'type': 'status', 'equals': 200}, {'type': 'body', 'contains': 'x'},
+                                 {'type': 'jsonpath', 'path': '$.a', 'exists': True}])
+    loads = []
+    ctx = ResponseContext(200, {}, 0.01, lambda: loads.append(1) or b'{"a": "x"}', body_size=10, body_limit=5)
+    failed = checks.failures(ctx)
+    assert loads == [] and len(failed) == 2
+    assert all('over the 5 byte limit' in f for f in failed)
+    ctx = ResponseContext(200, {}, 0.01, lambda: b'{"a": "x"}', body_size=10, body_limit=10)
+    assert checks.failures(ctx) == []
+
+
+def test_builtin_schema_fallback(monkeypatch):
+    monkeypatch.setattr(assertions, 'jsonschema', None)
+    checks = compile_assertions([{'type': 'schema', 'schema': {
+        'type': 'array', 'items': {'type': 'object', 'required': ['id'], 'additionalProperties': False,
+                                   'properties': {'id': {'type': 'integer', 'minimum': 1}}}}}])
+    assert checks.failures(_ctx([{'id': 1}, {'id': 2}])[0]) == []
+    assert checks.failures(_ctx([{'id': 1}, {'id': 0}])[0]) == ['matches JSON schema: $[1].id: below 1']
+    assert checks.failures(_ctx([{'id': 1, 'x': 1}])[0]) == ["matches JSON schema: $[0]: unexpected 'x'"]
+
+
+def test_invalid_definitions():
+    for bad in ('not json', '{}', '[{"type": "nope"}]', '[{"type": "header", "name": "X"}]',
+                '[{"type": "body", "matches": "("}]'):
+        with pytest.raises(AssertionDefinitionError):
+            compile_assertions(bad)
+    assert compile_assertions('  ') is None and compile_assertions('[]') is None
+
+
+def test_status_checks_decide_for_error_responses(local_server):
+    expect_500 = [{'type': 'status', 'equals': 500}]
+    negative = run_one(Requester(), RequestSpec('neg', 'GET', f'{local_server}/fail', assertions=expect_500), {})
+    assert negative['ok'] and negative['error'] is None and negative['assertions'] == []
+    # without a status check an error status still fails, even if the other checks pass
+    body_only = [{'type': 'jsonpath', 'path': '$.path', 'equals': '/fail'}]
+    plain = run_one(Requester(), RequestSpec('plain', 'GET', f'{local_server}/fail', assertions=body_only), {})
+    assert not plain['ok'] and plain['error'].startswith('HTTP 500')
+    wrong = run_one(Requester(), RequestSpec('wrong', 'GET', f'{local_server}/ok',
+                                             assertions=expect_500), {})
+    assert not wrong['ok'] and wrong['assertions'] == ['status 500: got 200']
+
+    wf = Workflow.from_dict({'steps': [{'name': 'gone', 'url': f'{local_server}/fail', 'assertions': expect_500}]})
+    summary = WorkflowRunner(Requester(), wf).run()
+    assert summary['ok'] and summary['steps'][0]['status'] == 500
+    report = LoadRunner(Requester(), 'GET', f'{local_server}/fail', assertions=expect_500, total=5).run()
+    assert report.errors == 0 and report.failed_assertions == 0
+
+
+def test_cli_and_load_runs_check_saved_assertions(tmp_path, local_server, open_db):
+    db = str(tmp_path / 'a.db')
+    s = open_db(db)
+    coll = s.create_collection('smoke')
+    s.save_request(coll, 'good', 'GET', f'{local_server}/good',
+                   assertions='[{"type": "jsonpath", "path": "$.path", "equals": "/good"}]')
+    s.save_request(coll, 'bad', 'GET', f'{local_server}/bad',
+                   assertions='[{"type": "jsonpath", "path": "$.path", "equals": "/other"}]')
+    out = tmp_path / 'out.jsonl'
+    assert cli.main(['run', '--db', db, '--collection', 'smoke', '-o', str(out)]) == 1
+    rows = sorted((json.loads(line) for line in out.read_text().splitlines()), key=lambda r: r['index'])
+    assert rows[0]['ok'] and rows[0]['assertions'] == []
+    assert not rows[1]['ok'] and rows[1]['status'] == 200
+    assert rows[1]['assertions'] == ['$.path equals "/other": got "/bad"']
+
+    saved = s.get_collection_requests(coll)[1]
+    report = LoadRunner.from_saved(Requester(), saved, concurrency=2, total=10).run()
+    assert report.errors == 0 and report.failed_assertions == 10
+    assert report.summary()['assertion_failures'] == {'$.path equals "/other"': 10}
+    # the load command fails on assertion failures alone, like loadtest.py
+    good = s.get_collection_requests(coll)[0]
+    assert cli.main(['load', '--db', db, '--request', str(good.id), '-n', '4', '-c', '2']) == 0
+    assert cli.main(['load', '--db', db, '--request', str(saved.id), '-n', '4', '-c', '2']) == 1
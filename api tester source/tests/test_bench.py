@@ -0,0 +1,40 @@
+import bench
+
+
+def test_time_callable_calibrates_the_loop_count():
+    calls = []
+    result = bench.time_callable(lambda: calls.append(1), rounds=3, min_time=0.001)
+    assert result['rounds'] == 3 and result['number'] > 1
+    assert 0 < result['min'] <= result['median']
+    assert len(calls) >= result['number'] * 3
+
+
+def test_run_save_and_compare(tmp_path, monkeypatch):
+    def fast():
+        yield lambda: None
+
+    def no_display():
+        raise bench.SkipBenchmark('no display')
+        yield
+
+    monkeypatch.setitem(bench.BENCHMARKS, 'test.fast', bench.contextlib.contextmanager(fast))
+    monkeypatch.setitem(bench.BENCHMARKS, 'test.skipped', bench.contextlib.contextmanager(no_display))
+    results = bench.run_benchmarks(['test.fast', 'test.skipped'], rounds=2, min_time=0.001)
+    assert results['test.skipped'] == {'skipped': 'no display'}
+
+    path = str(tmp_path / 'base.json')
+    saved = bench.save_results(path, results)
+    assert saved['machine']['python'] and bench.load_results(path) == results
+
+    slower = {'test.fast': dict(results['test.fast'], median=results['test.fast']['median'] * 2),
+              'test.skipped': {'skipped': 'no display'}}
+    [(name, before, after, ratio, regressed)] = bench.compare(results, slower, threshold=0.5)
+    assert name == 'test.fast' and round(ratio, 6) == 2 and regressed
+    assert not bench.compare(results, slower, threshold=1.5)[0][4]
+
+
+def test_history_benchmark_fills_storage(monkeypatch):
+    monkeypatch.setattr(bench, '_filled_templates', {})
+    with bench._filled_storage(25) as storage:
+        assert len(storage.get_history(limit=100)) == 25
+    bench._remove_templates()
@@ -0,0 +1,49 @@
+import json
+import os
+import subprocess
+import sys
+from xml.etree import ElementTree as ET
+
+import cli
+
+
+def _write(tmp_path, name, data):
+    path = tmp_path / name
+    path.write_text(json.dumps(data), encoding='utf-8')
+    return str(path)
+
+
+def test_run_templates_jsonl(tmp_path, local_server):
+    templates = _write(tmp_path, 'templates.json', [
+        {'name': 'ok', 'method': 'POST', 'url': '{{BASE}}/items', 'headers': '{"X-Key": "{{KEY}}"}', 'body': '{"k": "{{KEY}}"}'},
+        {'name': 'bad', 'method': 'GET', 'url': '{{BASE}}/fail'},
+    ])
+    envs = _write(tmp_path, 'envs.json', [{'name': 'local', 'variables': json.dumps({'BASE': local_server, 'KEY': 'abc'})}])
+    out = tmp_path / 'out.jsonl'
+    code = cli.main(['run', '--templates', templates, '--env-file', envs, '--env', 'local', '-w', '2', '-o', str(out)])
+    assert code == 1
+    rows = sorted((json.loads(line) for line in out.read_text().splitlines()), key=lambda r: r['index'])
+    assert [r['name'] for r in rows] == ['ok', 'bad']
+    assert rows[0]['ok'] and rows[0]['url'] == f'{local_server}/items'
+    assert not rows[1]['ok'] and rows[1]['status'] == 500
+
+
+def test_run_collection_junit(tmp_path, local_server, open_db):
+    db = str(tmp_path / 'cli.db')
+    s = open_db(db)
+    coll_id = s.create_collection('smoke')
+    s.save_request(coll_id, 'one', 'GET', f'{local_server}/a')
+    s.save_request(coll_id, 'two', 'GET', f'{local_server}/b')
+    out = tmp_path / 'report.xml'
+    code = cli.main(['run', '--db', db, '--collection', 'smoke', '--format', 'junit', '-o', str(out)])
+    assert code == 0
+    suite = ET.parse(str(out)).getroot()
+    assert suite.get('tests') == '2' and suite.get('failures') == '0'
+    assert [c.get('name') for c in suite.iter('testcase')] == ['one', 'two']
+
+
+def test_cli_does_not_import_gui_modules():
+    code = "import sys, cli; cli.build_parser(); print(any(m in sys.modules for m in ('customtkinter', 'PIL', 'tkinter')))"
+    cwd = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    out = subprocess.run([sys.executable, '-c', code], cwd=cwd, capture_output=True, text=True, check=True)
+    assert out.stdout.strip() == 'False'
@@ -0,0 +1,29 @@
+import uuid
+
+from environment import Interpolator, apply_environment, compile_template
+
+
+def test_compiled_template_single_pass():
+    tpl = compile_template('{{base}}/users/{{ id }}?q={{base}}')
+    assert tpl.segments == ['', 'base', '/users/', 'id', '?q=', 'base', '']
+    assert compile_template('{{base}}/users/{{ id }}?q={{base}}') is tpl
+    # values are not re-scanned, so a value containing a token stays literal
+    assert apply_environment('{{a}}-{{b}}', {'a': '{{b}}', 'b': 2}) == '2-2'
+    assert apply_environment('{{missing}} {{a}}', {'a': 1}) == '{{missing}} 1'
+
+
+def test_derived_and_dynamic_variables():
+    env = Interpolator({'host': 'api.local', 'base': 'https://{{host}}/v1', 'rid': '{{$uuid}}',
+                        'loop': '{{loop2}}', 'loop2': '{{loop}}'})
+    assert env.render('{{base}}/x') == 'https://api.local/v1/x'
+    assert not env.is_dynamic('{{base}}') and env.is_dynamic('{{rid}}')
+    first, second = env.render('{{rid}}'), env.render('{{rid}}')
+    assert first != second and str(uuid.UUID(first)) == first
+    assert env.render('{{$timestamp}}').isdigit()
+    assert env.render('{{loop}}') == '{{loop}}'
+    # a cycle through a dynamic value is left as the literal token too
+    env = Interpolator({'a': '{{b}}', 'b': '{{a}}{{$uuid}}'})
+    out = env.render('{{a}}')
+    assert out.startswith('{{a}}') and str(uuid.UUID(out[5:])) == out[5:]
+    # an environment variable shadows a dynamic name
+    assert Interpolator({'$uuid': 'fixed'}).render('{{$uuid}}') == 'fixed'
@@ -0,0 +1,71 @@
+import threading
+import time
+from executor import RequestExecutor
+
+
+def _drain(ex, expected, timeout=5):
+    handled = 0
+    deadline = time.time() + timeout
+    while handled < expected and time.time() < deadline:
+        handled += ex.poll()
+        time.sleep(0.01)
+    return handled
+
+
+def test_results_delivered_through_poll():
+    ex = RequestExecutor(max_workers=2)
+    seen = []
+    try:
+        ex.submit(lambda job, x: x * 2, 21, callback=lambda job, res, err: seen.append((res, err)))
+        ex.submit(lambda job: 1 / 0, callback=lambda job, res, err: seen.append((res, type(err))))
+        assert _drain(ex, 2) == 2
+        assert (42, None) in seen
+        assert (None, ZeroDivisionError) in seen
+        assert ex.active_jobs() == []
+    finally:
+        ex.shutdown()
+
+
+def test_cancelled_job_result_is_dropped():
+    ex = RequestExecutor(max_workers=1)
+    started = threading.Event()
+    seen = []
+
+    def slow(job):
+        started.set()
+        job.wait_cancelled(timeout=5)
+        return "done"
+
+    try:
+        job = ex.submit(slow, callback=lambda j, res, err: seen.append(res))
+        assert started.wait(2)
+        assert ex.cancel(job.id)
+        assert _drain(ex, 1) == 1
+        assert seen == []
+    finally:
+        ex.shutdown()
+
+
+def test_cancelling_a_queued_job_clears_it():
+    ex = RequestExecutor(max_workers=1)
+    started, release = threading.Event(), threading.Event()
+    seen = []
+
+    def busy(job):
+        started.set()
+        release.wait(5)
+        return "busy"
+
+    try:
+        ex.submit(busy, callback=lambda j, res, err: seen.append(res))
+        assert started.wait(2)
+        queued = ex.submit(lambda job: "never", callback=lambda j, res, err: seen.append(res))
+        assert ex.cancel(queued.id) and queued.future.cancelled()
+        assert _drain(ex, 1) == 1
+        assert queued not in ex.active_jobs()
+        release.set()
+        assert _drain(ex, 1) == 1
+        assert seen == ["busy"] and ex.active_jobs() == []
+    finally:
+        release.set()
+        ex.shutdown()
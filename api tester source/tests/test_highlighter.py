@@ -0,0 +1,32 @@
+import queue
+import threading
+from highlighter import JsonHighlighter, tokenize_line
+
+
+def test_tokenize_line_tags():
+    line = '  "id": 12.5e3, "name": "a \\"q\\" 7", "ok": true, "x": null, "n": -3'
+    tags = [(line[s:e], tag) for s, e, tag in tokenize_line(line)]
+    assert tags == [
+        ('"id"', 'json_key'), ('12.5e3', 'json_number'),
+        ('"name"', 'json_key'), ('"a \\"q\\" 7"', 'json_string'),
+        ('"ok"', 'json_key'), ('true', 'json_bool'),
+        ('"x"', 'json_key'), ('null', 'json_null'),
+        ('"n"', 'json_key'), ('-3', 'json_number'),
+    ]
+
+
+def test_visible_lines_are_tokenized_first():
+    hl = JsonHighlighter.__new__(JsonHighlighter)
+    hl.batch_lines = 10
+    out = queue.Queue()
+    source = "\n".join(f'"k{i}": {i},' for i in range(100))
+    hl._tokenize(source, 50, 60, threading.Event(), out)
+    first = out.get_nowait()
+    assert first['json_key'][:2] == ['51.0', '51.5']
+    batches = [first]
+    while True:
+        item = out.get_nowait()
+        if item is None:
+            break
+        batches.append(item)
+    assert sum(len(b['json_number']) for b in batches) == 200
@@ -0,0 +1,123 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from httpcache import CacheEntry, DiskStore, HTTPCache, parse_cache_control
+from requester import Requester
+
+
+class CachingHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    hits = {}
+
+    def do_GET(self):
+        path = self.path.split('?')[0]
+        CachingHandler.hits[path] = CachingHandler.hits.get(path, 0) + 1
+        headers = {}
+        if path == '/fresh':
+            headers['Cache-Control'] = 'max-age=60'
+        elif path == '/etag':
+            headers.update({'Cache-Control': 'no-cache', 'ETag': '"v1"'})
+            if self.headers.get('If-None-Match') == '"v1"':
+                return self._send(304, b'', headers)
+        elif path == '/nostore':
+            headers['Cache-Control'] = 'no-store'
+        elif path == '/vary':
+            headers.update({'Cache-Control': 'max-age=60', 'Vary': 'Accept'})
+        body = json.dumps({'path': path, 'n': CachingHandler.hits[path],
+                           'accept': self.headers.get('Accept')}).encode()
+        self._send(200, body, headers)
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get('Content-Length') or 0))
+        self._send(204, b'', {})
+
+    def _send(self, status, body, headers):
+        self.send_response(status)
+        for k, v in headers.items():
+            self.send_header(k, v)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def caching_server():
+    CachingHandler.hits = {}
+    server = ThreadingHTTPServer(("127.0.0.1", 0), CachingHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        yield f"http://127.0.0.1:{server.server_address[1]}"
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_parse_cache_control():
+    assert parse_cache_control('public, max-age="60", no-cache') == {'public': True, 'max-age': '60', 'no-cache': True}
+
+
+def test_fresh_responses_come_from_memory(caching_server):
+    cache = HTTPCache()
+    r = Requester(cache=cache)
+    first = r.send('GET', f'{caching_server}/fresh')
+    second = r.send('GET', f'{caching_server}/fresh')
+    assert first.cache_status == 'miss' and second.cache_status == 'hit'
+    assert second.json() == first.json() and CachingHandler.hits['/fresh'] == 1
+    # a request no-cache forces a round trip
+    r.send('GET', f'{caching_server}/fresh', headers={'Cache-Control': 'no-cache'})
+    assert CachingHandler.hits['/fresh'] == 2
+    # unsafe methods drop the entry for their URL
+    r.send('POST', f'{caching_server}/fresh', data='x')
+    assert r.send('GET', f'{caching_server}/fresh').cache_status == 'miss'
+    stats = cache.stats()
+    assert stats['hit'] == 1 and stats['miss'] == 3 and 0 < stats['hit_rate'] < 1
+
+
+def test_etag_revalidation_and_serve_stale(caching_server):
+    cache = HTTPCache()
+    r = Requester(cache=cache)
+    body = r.send('GET', f'{caching_server}/etag').json()
+    again = r.send('GET', f'{caching_server}/etag')
+    assert again.cache_status == 'revalidated' and again.status_code == 200 and again.json() == body
+    assert CachingHandler.hits['/etag'] == 2
+    cache.serve_stale = True
+    stale = r.send('GET', f'{caching_server}/etag')
+    assert stale.cache_status == 'stale' and CachingHandler.hits['/etag'] == 2
+    # a request no-cache always revalidates, even with serve_stale on
+    forced = r.send('GET', f'{caching_server}/etag', headers={'Cache-Control': 'no-cache'})
+    assert forced.cache_status == 'revalidated' and CachingHandler.hits['/etag'] == 3
+
+
+def test_no_store_and_vary_are_respected(caching_server):
+    r = Requester(cache=HTTPCache())
+    r.send('GET', f'{caching_server}/nostore')
+    assert r.send('GET', f'{caching_server}/nostore').cache_status == 'miss'
+    assert r.send('GET', f'{caching_server}/vary', headers={'Accept': 'a'}).cache_status == 'miss'
+    assert r.send('GET', f'{caching_server}/vary', headers={'Accept': 'a'}).cache_status == 'hit'
+    other = r.send('GET', f'{caching_server}/vary', headers={'Accept': 'b'})
+    assert other.cache_status == 'miss' and other.json()['accept'] == 'b'
+
+
+def test_disk_tier_persists_and_streams(tmp_path, caching_server):
+    Requester(cache=HTTPCache(str(tmp_path))).send('GET', f'{caching_server}/fresh', stream=True)
+    resp = Requester(cache=HTTPCache(str(tmp_path))).send('GET', f'{caching_server}/fresh', stream=True)
+    assert resp.cache_status == 'hit' and CachingHandler.hits['/fresh'] == 1
+    assert json.loads(b''.join(resp.iter_content(4)))['path'] == '/fresh'
+
+
+def test_disk_store_evicts_least_recently_used(tmp_path):
+    store = DiskStore(str(tmp_path), max_bytes=3000)
+    for key in ('a', 'b', 'c'):
+        store.put(key, CacheEntry(key, 200, 'OK', {}, b'x' * 800, {}, 0))
+    store.get('a')  # touch: 'b' is now the oldest
+    store.put('d', CacheEntry('d', 200, 'OK', {}, b'x' * 800, {}, 0))
+    assert store.get('b') is None and store.get('a') is not None and store.size <= 3000
+    reopened = DiskStore(str(tmp_path), max_bytes=3000)
+    assert reopened.size == store.size and reopened.get('d').body == b'x' * 800
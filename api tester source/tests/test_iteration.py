@@ -0,0 +1,69 @@
+import json
+
+import cli
+from iteration import IterationRunner, iter_rows
+from runner import RequestSpec
+from requester import Requester
+
+
+def test_iter_rows_is_lazy(tmp_path):
+    path = tmp_path / 'rows.jsonl'
+    path.write_text('{"id": 1, "tags": ["a"]}\n\n{"id": 2}\nnot json\n', encoding='utf-8')
+    rows = iter_rows(str(path))
+    assert next(rows) == {'id': 1, 'tags': ['a']}
+    assert next(rows) == {'id': 2}
+    # the bad line is only reached when it is read
+    try:
+        next(rows)
+        assert False, "expected a decode error"
+    except ValueError:
+        pass
+
+
+def test_iter_rows_reads_json_arrays(tmp_path):
+    path = tmp_path / 'rows.json'
+    path.write_text('[\n  {"id": 1},\n  {"id": 2, "name": "b"}\n]\n', encoding='utf-8')
+    assert list(iter_rows(str(path))) == [{'id': 1}, {'id': 2, 'name': 'b'}]
+    # one object per line is still accepted with a .json extension
+    path.write_text('{"id": 1}\n{"id": 2}\n', encoding='utf-8')
+    assert list(iter_rows(str(path))) == [{'id': 1}, {'id': 2}]
+
+
+def test_runner_binds_rows_in_order(local_server):
+    spec = RequestSpec('user', 'POST', '{{BASE}}/users/{{id}}', {'X-Name': '{{name}}'}, '{"tags": {{tags}}}')
+    rows = ({'id': i, 'name': f'n{i}', 'tags': [i]} for i in range(25))
+    results = []
+    runner = IterationRunner(Requester(), spec, variables={'BASE': local_server, 'name': 'env'}, workers=4)
+    summary = runner.run(rows, on_result=results.append, limit=20)
+    assert summary['rows'] == 20 and summary['ok'] == 20 and summary['failed'] == 0
+    assert [r['row'] for r in results] == list(range(20))
+    assert results[7]['url'] == f'{local_server}/users/7'
+
+
+def test_rows_in_flight_report_when_reading_fails(local_server):
+    def rows():
+        for i in range(6):
+            yield {'id': i}
+        raise ValueError("bad row")
+
+    spec = RequestSpec('user', 'GET', '{{BASE}}/users/{{id}}')
+    results = []
+    runner = IterationRunner(Requester(), spec, variables={'BASE': local_server}, workers=4)
+    try:
+        runner.run(rows(), on_result=results.append)
+        assert False, "expected the row error"
+    except ValueError:
+        pass
+    assert [r['row'] for r in results] == list(range(6))
+
+
+def test_cli_iterate_csv(tmp_path, local_server):
+    data = tmp_path / 'rows.csv'
+    data.write_text('path,q\nok,1\nfail,2\n', encoding='utf-8')
+    out = tmp_path / 'out.jsonl'
+    code = cli.main(['iterate', '{{BASE}}/{{path}}?q={{q}}', '-i', str(data), '--var', f'BASE={local_server}',
+                     '-w', '2', '-o', str(out)])
+    assert code == 1
+    rows = [json.loads(line) for line in out.read_text().splitlines()]
+    assert [(r['row'], r['status']) for r in rows] == [(0, 200), (1, 500)]
+    assert rows[0]['url'] == f'{local_server}/ok?q=1'
@@ -0,0 +1,61 @@
+import random
+from histogram import LatencyHistogram
+from loadtest import LoadRunner
+from requester import Requester
+
+
+def test_histogram_percentiles_within_precision():
+    h = LatencyHistogram()
+    values = list(range(1, 100001))  # 1µs .. 100ms
+    random.shuffle(values)
+    for v in values:
+        h.record_us(v)
+    assert h.count == 100000
+    for pct in (50, 90, 99):
+        exact = pct * 1000
+        assert abs(h.percentile_us(pct) - exact) / exact < 0.01
+    assert h.percentile_us(100) == 100000
+    # memory is bounded by bucket count, not sample count
+    assert len(h.counts) < 2500
+
+
+def test_histogram_merge():
+    a, b = LatencyHistogram(), LatencyHistogram()
+    a.record(0.010)
+    b.record(0.030)
+    a.merge(b)
+    assert a.count == 2
+    assert a.max == 30.0 and a.min == 10.0
+
+
+def test_closed_loop_total(local_server):
+    runner = LoadRunner(Requester(pool_maxsize=4), 'GET', f'{local_server}/ping', concurrency=4, total=40)
+    report = runner.run()
+    assert report.requests == 40
+    assert report.errors == 0
+    assert report.status_counts == {200: 40}
+    summary = report.summary()
+    assert summary['latency_ms']['p50'] <= summary['latency_ms']['max']
+
+
+def test_open_loop_rate_counts_errors(local_server):
+    runner = LoadRunner(Requester(), 'GET', f'{local_server}/fail', concurrency=2, rate=200, total=20)
+    report = runner.run()
+    assert report.requests == 20
+    assert report.error_rate == 1.0
+
+
+def test_dynamic_values_rendered_per_request(local_server):
+    seen = []
+
+    class Recorder(Requester):
+        def send(self, method, url, **kwargs):
+            seen.append((url, kwargs['headers']['X-Request-Id']))
+            return super().send(method, url, **kwargs)
+
+    runner = LoadRunner(Recorder(), 'GET', '{{base}}/items', headers={'X-Request-Id': '{{$uuid}}'},
+                        concurrency=2, total=6, variables={'base': local_server})
+    report = runner.run()
+    assert report.requests == 6 and report.errors == 0
+    assert {url for url, _ in seen} == {f'{local_server}/items'}
+    assert len({rid for _, rid in seen}) == 6
@@ -0,0 +1,96 @@
+import json
+import sqlite3
+from datetime import datetime, timedelta
+
+import cli
+from histogram import LatencyHistogram
+from metrics import endpoint_key
+from storage_base import RetentionPolicy
+
+
+def test_endpoint_key_folds_ids_and_query():
+    assert endpoint_key('get', 'https://api.local/orders/123?x=1') == 'GET api.local/orders/{id}'
+    assert endpoint_key('GET', 'https://api.local/u/3f2b8c1e-1d2a-4c5b-9e8f-0123456789ab/items') == \
+        'GET api.local/u/{id}/items'
+    assert endpoint_key('POST', 'http://h') == 'POST h/'
+
+
+def test_histogram_serialization_round_trip():
+    h = LatencyHistogram(6)
+    for v in (120, 3400, 3400, 98000):
+        h.record_us(v)
+    again = LatencyHistogram.from_bytes(h.to_bytes())
+    assert again.counts == h.counts and again.count == 4
+    assert again.min_us == 120 and again.max_us == 98000
+    assert LatencyHistogram.from_bytes(LatencyHistogram(6).to_bytes()).count == 0
+
+
+def test_rollups_answer_trend_queries(tmp_path, open_db):
+    path = str(tmp_path / 'm.db')
+    s = open_db(path)
+    for i in range(100):
+        s.add_to_history('GET', f'https://api.local/orders/{i}', '{}', None, 200 if i % 10 else 500, 'ok',
+                         duration_ms=float(i + 1), response_size=10)
+    s.add_to_history('GET', 'https://api.local/other', '{}', None, 200, 'ok')  # no duration: not rolled up
+    with sqlite3.connect(path) as conn:
+        endpoints = [r[0] for r in conn.execute('SELECT endpoint FROM endpoint_rollups')]
+    assert len(endpoints) <= 2 and set(endpoints) == {'GET api.local/orders/{id}'}
+    assert s.get_endpoints() == [('GET api.local/orders/{id}', 100)]
+
+    stats = s.get_endpoint_summary('GET api.local/orders/{id}')
+    assert stats['count'] == 100 and stats['errors'] == 10 and stats['bytes'] == 1000
+    assert abs(stats['p95_ms'] - 95) / 95 < 0.05
+    trend = s.get_endpoint_trend('GET api.local/orders/{id}', bucket_minutes=60 * 24)
+    assert sum(p['count'] for p in trend) == 100
+    old = datetime.utcnow() - timedelta(days=30)
+    assert s.get_endpoint_trend('GET api.local/orders/{id}', since=old, until=old + timedelta(days=1)) == []
+
+
+def test_rollups_merge_batches(tmp_path, open_db):
+    path = str(tmp_path / 'b.db')
+    s = open_db(path)
+    batch = [dict(method='GET', url='http://h/a', headers='{}', body=None, response_code=200, response_body='ok',
+                  duration_ms=ms, response_size=1, created_at=datetime(1970, 1, 1, 0, 10)) for ms in (5, 10, 15)]
+    s._write_history(batch)
+    s._write_history(batch)  # same endpoint and minute: merged into the existing rollup
+    with sqlite3.connect(path) as conn:
+        [(count, sketch)] = conn.execute("SELECT count, sketch FROM endpoint_rollups "
+                                         "WHERE endpoint = 'GET h/a' AND minute = 10").fetchall()
+    assert count == 6 and LatencyHistogram.from_bytes(sketch).count == 6
+
+
+def test_retention_drops_old_rollups(tmp_path, open_db):
+    s = open_db(str(tmp_path / 'r.db'))
+    now = datetime.utcnow()
+    s._write_history([dict(method='GET', url=f'http://h/days/{age}', headers='{}', body=None, response_code=200,
+                           response_body='ok', duration_ms=5.0, response_size=2, created_at=now - timedelta(days=age))
+                      for age in (1, 20, 40)])
+    everything = now - timedelta(days=60)
+    assert s.get_endpoint_summary('GET h/days/{id}', since=everything)['count'] == 3
+    s.prune_history(RetentionPolicy(max_rows=100, rollup_max_age_days=30))
+    assert s.get_endpoint_summary('GET h/days/{id}', since=everything)['count'] == 2
+    assert len(s.get_history()) == 3
+    # max_age_days covers rollups too unless a separate limit is given
+    assert s.prune_history(RetentionPolicy(max_age_days=10)) == 2
+    assert s.get_endpoint_summary('GET h/days/{id}', since=everything)['count'] == 1
+
+
+def test_cached_responses_stay_out_of_rollups(tmp_path, open_db):
+    s = open_db(str(tmp_path / 'c.db'))
+    s.add_to_history('GET', 'http://h/orders', '{}', None, 200, 'ok', duration_ms=80.0)
+    s.add_to_history('GET', 'http://h/orders', '{}', None, 200, 'ok', duration_ms=0.1, rollup=False)
+    s.queue_history('GET', 'http://h/orders', '{}', None, 200, 'ok', duration_ms=0.1, rollup=False)
+    s.flush_history()
+    assert len(s.get_history()) == 3
+    summary = s.get_endpoint_summary('GET h/orders')
+    assert summary['count'] == 1 and summary['p50_ms'] >= 70
+
+
+def test_cli_trend(tmp_path, capsys, open_db):
+    db = str(tmp_path / 'c.db')
+    s = open_db(db)
+    s.add_to_history('GET', 'http://h/orders', '{}', None, 200, 'ok', duration_ms=42.0)
+    assert cli.main(['trend', '/orders', '--db', db, '--bucket', '60']) == 0
+    out = json.loads(capsys.readouterr().out)
+    assert out['endpoint'] == 'GET h/orders' and out['count'] == 1 and len(out['trend']) == 1
+    assert cli.main(['trend', '/missing', '--db', db]) == 1
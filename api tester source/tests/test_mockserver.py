@@ -0,0 +1,104 @@
+import asyncio
+import io
+import json
+import time
+
+import pytest
+
+from mockserver import MockRoute, MockServer, path_of, routes_from_collection, routes_from_har, routes_from_history
+from requester import Requester
+
+
+@pytest.fixture
+def serve():
+    servers = []
+
+    def start(routes, **kwargs):
+        server = MockServer(routes, **kwargs)
+        server.start_in_thread()
+        servers.append(server)
+        return server
+
+    yield start
+    for server in servers:
+        server.stop()
+
+
+def test_path_of_handles_variables_and_full_urls():
+    assert path_of('{{baseUrl}}/orders/{{id}}?x=1') == '/orders/{{id}}'
+    assert path_of('https://api.local/v1/users#top') == '/v1/users'
+    assert path_of('orders') == '/orders'
+
+
+def test_serves_latest_history_response(tmp_path, serve, open_db):
+    s = open_db(str(tmp_path / 'm.db'))
+    s.add_to_history('GET', 'https://prod/orders/1?x=1', '{}', None, 200, '{"id": 1, "v": 1}')
+    s.add_to_history('GET', 'https://prod/orders/1', '{}', None, 200, '{"id": 1, "v": 2}')
+    s.add_to_history('DELETE', 'https://prod/orders/1', '{}', None, 404, 'gone')
+    server = serve(routes_from_history(s.iter_history(with_bodies=True)))
+    r = Requester()
+    resp = r.send('GET', f'{server.url}/orders/1?any=query')
+    assert resp.status_code == 200 and resp.json() == {'id': 1, 'v': 2}
+    assert resp.headers['Content-Type'] == 'application/json'
+    gone = r.send('DELETE', f'{server.url}/orders/1')
+    assert gone.status_code == 404 and gone.text == 'gone'
+    assert r.send('GET', f'{server.url}/missing').status_code == 404
+    assert server.stats == {'requests': 3, 'unmatched': 1, 'injected_errors': 0}
+
+
+def test_collection_routes_match_variable_segments(tmp_path, serve, open_db):
+    s = open_db(str(tmp_path / 'c.db'))
+    coll_id = s.create_collection('Orders')
+    s.save_request(coll_id, 'get order', 'GET', '{{baseUrl}}/orders/{{id}}')
+    s.save_request(coll_id, 'create', 'POST', '{{baseUrl}}/orders')
+    s.add_to_history('GET', 'https://prod/orders/7', '{}', None, 200, '{"id": 7}')
+    routes = routes_from_collection(s.get_collection_requests(coll_id), s.iter_history(with_bodies=True))
+    server = serve(routes)
+    r = Requester()
+    assert r.send('GET', f'{server.url}/orders/42').json() == {'id': 7}
+    created = r.send('POST', f'{server.url}/orders', data='{"a": 1}')
+    assert created.status_code == 200 and created.json() == {}
+
+
+def test_har_routes_keep_recorded_headers(serve):
+    har = {'log': {'entries': [{
+        'request': {'method': 'GET', 'url': 'https://prod/ping'},
+        'response': {'status': 201, 'headers': [{'name': 'X-Env', 'value': 'prod'},
+                                                {'name': 'Content-Length', 'value': '999'}],
+                     'content': {'mimeType': 'text/plain', 'text': 'pong'}}}]}}
+    server = serve(routes_from_har(io.StringIO(json.dumps(har))))
+    resp = Requester().send('GET', f'{server.url}/ping')
+    assert resp.status_code == 201 and resp.text == 'pong'
+    assert resp.headers['X-Env'] == 'prod' and resp.headers['Content-Type'] == 'text/plain'
+
+
+def test_injected_errors_are_seeded(serve):
+    routes = [MockRoute('GET', '/a', 200, {}, 'ok')]
+    statuses = []
+    for _ in range(2):
+        server = serve(routes, error_rate=0.3, error_status=503, seed=7)
+        r = Requester()
+        statuses.append([r.send('GET', f'{server.url}/a').status_code for _ in range(40)])
+    assert statuses[0] == statuses[1] and {200, 503} == set(statuses[0])
+
+
+def test_latency_keeps_pipelined_order():
+    routes = [MockRoute('GET', '/a', 200, {}, 'a'), MockRoute('GET', '/b', 200, {}, 'b')]
+
+    async def run():
+        server = MockServer(routes, latency_ms=30, jitter_ms=30, seed=1)
+        await server.start()
+        reader, writer = await asyncio.open_connection(server.host, server.port)
+        started = time.perf_counter()
+        writer.write(b'GET /a HTTP/1.1\r\nHost: x\r\n\r\nGET /b HTTP/1.1\r\nHost: x\r\n\r\n')
+        bodies = []
+        for _ in range(2):
+            await reader.readuntil(b'\r\n\r\n')
+            bodies.append(await reader.readexactly(1))
+        elapsed = time.perf_counter() - started
+        writer.close()
+        server._server.close()
+        return bodies, elapsed
+
+    bodies, elapsed = asyncio.run(run())
+    assert bodies == [b'a', b'b'] and elapsed >= 0.03
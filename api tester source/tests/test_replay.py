@@ -0,0 +1,87 @@
+import io
+import json
+import time
+
+import cli
+from interchange import write_har
+from replay import ReplayEntry, ReplayRunner, history_entries, read_har_entries
+from requester import Requester
+
+
+def _har(entries):
+    return io.StringIO(json.dumps({'log': {'version': '1.2', 'creator': {'name': 't'}, 'entries': entries}}))
+
+
+def _entry(started, url, status=200, method='GET', time_ms=5):
+    return {'startedDateTime': started, 'time': time_ms,
+            'request': {'method': method, 'url': url, 'headers': [{'name': 'Host', 'value': 'prod'},
+                                                                  {'name': 'X-Trace', 'value': '1'}]},
+            'response': {'status': status}}
+
+
+def test_har_entries_are_relative_and_ordered():
+    entries = read_har_entries(_har([
+        _entry('2026-01-01T00:00:00.500Z', 'https://prod/b'),
+        _entry('2026-01-01T00:00:00.000Z', 'https://prod/a'),
+        _entry('2026-01-01T01:00:00.250+01:00', 'https://prod/c'),
+    ]))
+    assert [(e.url, round(e.offset, 3)) for e in entries] == [
+        ('https://prod/a', 0.0), ('https://prod/c', 0.25), ('https://prod/b', 0.5)]
+    assert entries[0].headers == {'X-Trace': '1'}  # Host is recomputed for the target
+
+
+def test_replay_keeps_timing_and_compares_status(local_server):
+    entries = read_har_entries(_har([
+        _entry('2026-01-01T00:00:00.000Z', 'https://prod.example/api/a?x=1'),
+        _entry('2026-01-01T00:00:00.300Z', 'https://prod.example/fail'),
+        _entry('2026-01-01T00:00:00.600Z', 'https://prod.example/api/b', method='POST'),
+    ]))
+    results = []
+    runner = ReplayRunner(Requester(), entries, speed=2, concurrency=2, target=local_server)
+    summary = runner.run(on_result=results.append)
+    assert summary['count'] == 3 and summary['errors'] == 0
+    assert summary['status_mismatches'] == 1  # /fail answers 500, the capture had 200
+    assert 0.28 <= summary['elapsed_s'] < 2
+    assert summary['original']['count'] == 3
+    by_index = {r['index']: r for r in results}
+    assert by_index[0]['url'] == f'{local_server}/api/a?x=1' and by_index[0]['ok']
+    assert not by_index[1]['ok'] and by_index[1]['status'] == 500
+
+    started = time.perf_counter()
+    fast = ReplayRunner(Requester(), entries * 5, speed=0, concurrency=4, target=local_server).run()
+    assert fast['count'] == 15 and time.perf_counter() - started < 0.28
+
+
+def test_history_round_trips_through_har(tmp_path, local_server, open_db):
+    s = open_db(str(tmp_path / 'h.db'))
+    s.add_to_history('POST', f'{local_server}/orders?page=2', '{"Content-Type": "application/json"}', '{"a": 1}',
+                     201, '{"id": 1}', duration_ms=12.5, response_size=9)
+    s.add_to_history('GET', f'{local_server}/orders/1', '{}', None, 200, '{"id": 1}', duration_ms=3.0)
+    out = io.StringIO()
+    assert write_har(out, s.iter_history(with_bodies=True)) == 2
+    har = json.loads(out.getvalue())
+    first = har['log']['entries'][0]
+    assert first['request']['postData'] == {'mimeType': 'application/json', 'text': '{"a": 1}'}
+    assert first['request']['queryString'] == [{'name': 'page', 'value': '2'}]
+    assert first['response']['status'] == 201 and first['response']['content']['text'] == '{"id": 1}'
+
+    entries = read_har_entries(io.StringIO(out.getvalue()))
+    assert [(e.method, e.status) for e in entries] == [('POST', 201), ('GET', 200)]
+    assert [e.url for e in history_entries(s.iter_history())] == [e.url for e in entries]
+
+
+def test_cli_replay_records_history(tmp_path, local_server, open_db):
+    db = str(tmp_path / 'r.db')
+    har = tmp_path / 'cap.har'
+    har.write_text(_har([_entry('2026-01-01T00:00:00Z', 'https://prod/x')]).getvalue())
+    assert cli.main(['replay', str(har), '--db', db, '--target', local_server, '--speed', '0', '--record']) == 0
+    [row] = open_db(db).get_history()
+    assert row.url == f'{local_server}/x' and row.duration_ms is not None
+
+
+def test_replay_stops_early(local_server):
+    entries = [ReplayEntry(i * 0.5, 'GET', f'{local_server}/{i}') for i in range(10)]
+    results = []
+    summary = ReplayRunner(Requester(), entries, concurrency=1).run(
+        on_result=results.append, should_stop=lambda: len(results) >= 1)
+    assert summary['count'] == 1 and summary['elapsed_s'] < 0.5
@@ -1,5 +1,6 @@
+import asyncio
 import pytest
-from requester import Requester
+from requester import Requester, AsyncRequester, httpx
 
 def test_get_localhost_or_httpbin():
     # Basic smoke test: create Requester and ensure it can construct a request.
@@ -8,3 +9,27 @@ def test_get_localhost_or_httpbin():
     assert hasattr(r, 'send')
 
     # Additional invocation test would require network or mocking; keep simple here.
+
+
+def test_send_against_local_server(local_server):
+    r = Requester(pool_maxsize=4)
+    resp = r.send('post', f'{local_server}/items', headers={'X-Test': '1'}, data='{"a": 1}')
+    assert resp.status_code == 200
+    echoed = resp.json()
+    assert echoed['method'] == 'POST'
+    assert echoed['body'] == '{"a": 1}'
+    r.close()
+
+
+@pytest.mark.parametrize('use_httpx', [False, pytest.param(True, marks=pytest.mark.skipif(httpx is None, reason='httpx not installed'))])
+def test_async_send_many(local_server, use_httpx):
+    async def run():
+        async with AsyncRequester(max_connections=8, max_connections_per_host=4, use_httpx=use_httpx) as ar:
+            items = [{'method': 'GET', 'url': f'{local_server}/n/{i}'} for i in range(20)]
+            items.append({'method': 'GET', 'url': f'{local_server}/fail'})
+            return await ar.send_many(items, concurrency=10)
+
+    results = asyncio.run(run())
+    assert [r.json()['path'] for r in results[:20]] == [f'/n/{i}' for i in range(20)]
+    assert results[-1].status_code == 500
+    assert results[0].reason == 'OK'
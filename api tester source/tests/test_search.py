@@ -0,0 +1,55 @@
+import sqlite3
+
+from storage_base import RetentionPolicy, search_query
+
+
+def test_search_query_prefixes_words():
+    assert search_query('orders/12 "x') == '"orders"* "12"* "x"'
+    assert search_query('  ') == ''
+
+
+def test_search_ranks_names_above_bodies(tmp_path, open_db):
+    s = open_db(str(tmp_path / 's.db'))
+    s.save_template('Create invoice', 'POST', 'https://api.local/invoices', None, '{"note": "x"}')
+    s.save_template('Ping', 'GET', 'https://api.local/ping', None, '{"note": "invoice please"}')
+    s.add_to_history('GET', 'https://api.local/invoices/7', '{}', None, 200, 'ok')
+    results = s.search('invoice')
+    assert [r['title'] for r in results][:1] == ['Create invoice']
+    assert {r['kind'] for r in results} == {'template', 'history'}
+    assert s.search('inv', kinds=['history'])[0]['url'] == 'https://api.local/invoices/7'
+    assert '[please]' in s.search('please')[0]['snippet']
+    assert s.search('missingword') == []
+
+
+def test_index_follows_updates_and_deletes(tmp_path, open_db):
+    s = open_db(str(tmp_path / 's.db'))
+    tid = s.save_template('Old name', 'GET', 'https://api.local/a')
+    s.update_template(tid, name='Shiny name')
+    assert s.search('old') == []
+    assert s.search('shiny')[0]['id'] == tid
+    s.delete_template(tid)
+    assert s.search('shiny') == []
+
+    cid = s.create_collection('Payments')
+    s.save_request(cid, 'Refund', 'POST', 'https://api.local/refunds')
+    assert {r['kind'] for r in s.search('refund payments')} == set()
+    assert s.search('refund')[0]['kind'] == 'saved_request'
+    s.delete_collection(cid)
+    assert s.search('refund') == [] and s.search('payments') == []
+
+    for i in range(5):
+        s.add_to_history('GET', f'https://api.local/items/{i}', '{}', None, 200, 'ok')
+    assert s.prune_history(RetentionPolicy(max_rows=2)) == 3
+    assert len(s.search('items')) == 2
+
+
+def test_existing_database_is_backfilled(tmp_path, open_db):
+    path = str(tmp_path / 's.db')
+    s = open_db(path)
+    s.add_to_history('GET', 'https://api.local/legacy', '{}', None, 200, '{"status": "archived"}')
+    with sqlite3.connect(path) as conn:
+        conn.execute('DROP TABLE search_index')
+    s.close()
+    s = open_db(path, search_responses=True)
+    assert s.search('legacy')[0]['kind'] == 'history'
+    assert s.search('archived')[0]['url'] == 'https://api.local/legacy'
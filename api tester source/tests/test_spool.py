@@ -0,0 +1,44 @@
+import os
+from requester import Requester
+from spool import SpooledBody, read_body
+
+
+def test_small_body_stays_in_memory(tmp_path):
+    body = SpooledBody(threshold=100)
+    body.write(b'{"a": 1}')
+    body.finish()
+    assert body.in_memory and body.text() == '{"a": 1}'
+    dest = tmp_path / 'out.json'
+    body.save_to(str(dest))
+    assert dest.read_bytes() == b'{"a": 1}'
+
+
+def test_large_body_spools_to_disk(tmp_path):
+    body = SpooledBody(threshold=10)
+    payload = ('é' * 5000).encode('utf-8')
+    for i in range(0, len(payload), 7):  # split multi-byte characters across writes
+        body.write(payload[i:i + 7])
+    body.finish()
+    assert not body.in_memory and os.path.exists(body.path)
+    assert body.size == len(payload)
+    assert ''.join(body.iter_text(chunk_size=33)) == 'é' * 5000
+    assert ''.join(body.iter_text(limit=10)) == 'é' * 5
+    dest = tmp_path / 'copy.bin'
+    body.save_to(str(dest))
+    assert dest.read_bytes() == payload
+    path = body.path
+    body.close()
+    assert not os.path.exists(path)
+
+
+def test_read_body_streams_response(local_server):
+    resp = Requester().send('GET', f'{local_server}/stream', stream=True)
+    body = read_body(resp, threshold=16)
+    assert not body.in_memory
+    assert '"/stream"' in body.text()
+    body.close()
+
+
+def test_read_body_cancelled(local_server):
+    resp = Requester().send('GET', f'{local_server}/stream', stream=True)
+    assert read_body(resp, should_stop=lambda: True) is None
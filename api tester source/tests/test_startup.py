@@ -0,0 +1,54 @@
+import subprocess
+import sys
+
+import pytest
+
+import startup
+import timing
+import timing_adapter
+
+SAMPLE = """import time: self [us] | cumulative | imported package
+import time:       300 |        300 | site
+import time:       100 |        100 |     _tkinter
+import time:      2000 |       2100 |   tkinter
+import time:       500 |        500 |   json
+import time:      4000 |       6600 | ui
+import time:        50 |         50 | other
+"""
+
+
+def test_parse_importtime_keeps_the_target_subtree():
+    entries = startup.parse_importtime(SAMPLE, 'ui')
+    assert [name for name, _, _, _ in entries] == ['_tkinter', 'tkinter', 'json', 'ui']
+    assert entries[1] == ('tkinter', 2.0, 2.1, 1) and entries[0][3] == 2
+    assert entries[-1] == ('ui', 4.0, 6.6, 0)
+    assert startup.parse_importtime(SAMPLE, 'missing') == []
+
+
+def test_timing_does_not_import_requests():
+    code = "import sys, timing, cli; print(sorted(m for m in ('requests', 'urllib3', 'sqlalchemy') if m in sys.modules))"
+    out = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True).stdout
+    assert out.strip() == '[]'
+    assert timing.TimingAdapter is timing_adapter.TimingAdapter  # old import path still works
+
+
+def test_ui_startup_defers_heavy_modules():
+    data = startup.report('ui', runs=1, budget_ms=10_000)
+    assert data['deferred_imported'] == [] and data['ok']
+    assert data['total_ms'] > 0 and data['direct']
+
+
+def test_app_init_leaves_backends_unopened(tmp_path, monkeypatch):
+    tkinter = pytest.importorskip('tkinter')
+    try:
+        tkinter.Tk().destroy()
+    except tkinter.TclError:
+        pytest.skip('no display')
+    monkeypatch.chdir(tmp_path)  # a storage opened by mistake lands here, not in the repo
+    import ui
+    app = ui.App()
+    try:
+        # _finish_startup opens them once the window is mapped, not __init__
+        assert app._storage is None and app._requester is None
+    finally:
+        app._on_close()
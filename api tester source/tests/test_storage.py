@@ -1,14 +1,18 @@
 import os
+import sqlite3
 import tempfile
 import json
-from storage import Storage
 
+import pytest
 
-def test_env_crud():
+from storage_base import RetentionPolicy
+
+
+def test_env_crud(open_db):
     fd, path = tempfile.mkstemp(suffix='.db')
     os.close(fd)
     try:
-        s = Storage(db_path=path)
+        s = open_db(path)
         # create
         env_id = s.create_environment('test', '{"API_URL": "https://example.com"}')
         assert env_id is not None
@@ -28,11 +32,11 @@ def test_env_crud():
             pass
 
 
-def test_template_crud():
+def test_template_crud(open_db):
     fd, path = tempfile.mkstemp(suffix='.db')
     os.close(fd)
     try:
-        s = Storage(db_path=path)
+        s = open_db(path)
         t_id = s.save_template(name='t1', method='GET', url='https://httpbin.org/get', headers='{}', body='')
         assert t_id is not None
         templates = s.get_templates()
@@ -46,3 +50,267 @@ def test_template_crud():
             os.remove(path)
         except Exception:
             pass
+
+
+def test_history_keyset_pagination_and_retention(open_db):
+    fd, path = tempfile.mkstemp(suffix='.db')
+    os.close(fd)
+    try:
+        s = open_db(path)
+        for i in range(25):
+            s.add_to_history('GET', f'https://example.com/{i}', '{}', None, 200, f'{i:03d}' + 'x' * 97)
+        seen = []
+        cursor = None
+        while True:
+            rows, cursor = s.get_history_page(limit=10, cursor=cursor)
+            seen.extend(r.url for r in rows)
+            if cursor is None:
+                break
+        assert seen == [f'https://example.com/{i}' for i in reversed(range(25))]
+
+        assert s.prune_history(RetentionPolicy(max_rows=20)) == 5
+        assert len(s.get_history(limit=100)) == 20
+        # each row is ~122 bytes with its own 100-byte body: keep the newest 8
+        assert s.prune_history(RetentionPolicy(max_bytes=1000)) == 12
+        assert [h.url for h in s.get_history(limit=100)][-1] == 'https://example.com/17'
+        assert s.prune_history(RetentionPolicy(max_age_days=0)) == 8
+        with sqlite3.connect(path) as conn:
+            assert conn.execute('PRAGMA auto_vacuum').fetchone()[0] == 2
+            names = {r[1] for r in conn.execute("PRAGMA index_list('request_history')")}
+        assert 'ix_request_history_created_at' in names
+    finally:
+        try:
+            os.remove(path)
+        except Exception:
+            pass
+
+
+def test_response_bodies_deduplicated_and_lazy(open_db):
+    fd, path = tempfile.mkstemp(suffix='.db')
+    os.close(fd)
+    try:
+        s = open_db(path)
+        payload = json.dumps({'items': list(range(500))}, indent=2)
+        ids = [s.add_to_history('GET', 'https://example.com/items', '{}', None, 200, payload) for _ in range(5)]
+        s.add_to_history('GET', 'https://example.com/other', '{}', None, 404, 'not found')
+        with sqlite3.connect(path) as conn:
+            blobs = conn.execute('SELECT size, length(data) FROM response_blobs ORDER BY size').fetchall()
+        assert len(blobs) == 2
+        size, stored = blobs[-1]
+        assert size == len(payload) and stored < size
+        assert s.get_response_body(ids[0]) == payload
+        assert s.get_response_body(ids[-1]) == payload
+        assert s.get_response_body(999) is None
+        # pruning drops blobs no longer referenced by any history row
+        s.prune_history(RetentionPolicy(max_rows=1))
+        with sqlite3.connect(path) as conn:
+            assert conn.execute('SELECT count(*) FROM response_blobs').fetchone()[0] == 1
+    finally:
+        try:
+            os.remove(path)
+        except Exception:
+            pass
+
+
+def test_change_events(open_db):
+    fd, path = tempfile.mkstemp(suffix='.db')
+    os.close(fd)
+    try:
+        s = open_db(path)
+        events = []
+        unsubscribe = s.subscribe(lambda entity, action, payload: events.append((entity, action, payload)))
+        t_id = s.save_template(name='t', method='GET', url='https://example.com')
+        s.update_template(t_id, name='renamed')
+        h_id = s.add_to_history('GET', 'https://example.com', '{}', None, 200, 'ok')
+        s.delete_template(t_id)
+        assert [(e, a) for e, a, _ in events] == [
+            ('template', 'add'), ('template', 'update'), ('history', 'add'), ('template', 'delete'),
+        ]
+        # rows are detached but fully loaded, so listeners on other threads can read them
+        assert events[1][2].name == 'renamed'
+        assert events[2][2].id == h_id and events[2][2].url == 'https://example.com'
+        assert events[3][2] == t_id
+        unsubscribe()
+        s.create_collection('c')
+        assert len(events) == 4
+    finally:
+        try:
+            os.remove(path)
+        except Exception:
+            pass
+
+
+def test_wal_reads_do_not_wait_for_writes(tmp_path, open_db):
+    path = str(tmp_path / 'wal.db')
+    s = open_db(path)
+    s.add_to_history('GET', 'https://example.com/a', '{}', None, 200, 'ok')
+    # synchronous is per connection, so ask the backend's own
+    with s._raw_connection() as conn:
+        assert conn.execute('PRAGMA synchronous').fetchone()[0] == 1  # NORMAL
+    writer = sqlite3.connect(path, isolation_level=None)
+    try:
+        assert writer.execute('PRAGMA journal_mode').fetchone()[0] == 'wal'
+        writer.execute('BEGIN IMMEDIATE')
+        writer.execute("UPDATE request_history SET url = 'x'")
+        # a reader sees the last committed state while the write is open
+        assert [h.url for h in s.get_history()] == ['https://example.com/a']
+        writer.execute('ROLLBACK')
+    finally:
+        writer.close()
+
+
+def test_queued_history_is_written_in_batches(tmp_path, open_db):
+    path = str(tmp_path / 'q.db')
+    s = open_db(path)
+    added = []
+    s.subscribe(lambda entity, action, payload: added.append(payload.id) if entity == 'history' else None)
+    commits = []
+    if hasattr(s, 'engine'):
+        from sqlalchemy import event
+        event.listen(s.engine, 'commit', lambda conn: commits.append(1))
+    for i in range(300):
+        s.queue_history('GET', f'https://example.com/items/{i}', '{}', None, 200, 'same body', duration_ms=5.0)
+    s.flush_history()
+    assert s.history_writer.written == 300 and s.history_writer.last_error is None
+    assert s.history_writer.batches < 300
+    assert len(commits) in (0, s.history_writer.batches)
+    assert len(added) == 300
+    with sqlite3.connect(path) as conn:
+        assert conn.execute('SELECT count(*) FROM response_blobs').fetchone()[0] == 1
+    assert s.get_endpoint_summary('GET example.com/items/{id}')['count'] == 300
+    assert len(s.search('items', limit=500)) == 300
+    s.queue_history('GET', 'https://example.com/last', '{}', None, 200, 'x')
+    s.close()  # writes what is still queued
+    assert open_db(path).get_history(limit=1)[0].url == 'https://example.com/last'
+
+
+def test_one_bad_queued_row_does_not_drop_its_batch(tmp_path, open_db):
+    s = open_db(str(tmp_path / 'bad.db'))
+    errors = []
+    s.subscribe(lambda entity, action, payload: errors.append(payload) if action == 'error' else None)
+    for i in range(200):
+        body = object() if i == 100 else None  # cannot be bound as a column value
+        s.queue_history('GET', f'https://example.com/items/{i}', '{}', body, 200, 'ok', duration_ms=5.0)
+    s.flush_history()
+    writer = s.history_writer
+    assert writer.written == 199 and writer.dropped == 1
+    assert writer.last_error is not None and errors == [writer.last_error]
+    assert len(s.get_history(limit=500)) == 199
+    s.close()
+
+
+def test_blob_reuse_is_safe_from_concurrent_orphan_pruning(tmp_path, open_db):
+    import hashlib
+    import threading
+    path = str(tmp_path / 'race.db')
+    s = open_db(path)
+    body = 'shared body'
+    with sqlite3.connect(path) as conn:  # a blob no history row references yet
+        conn.execute("INSERT INTO response_blobs (hash, encoding, size, data) VALUES (?, 'raw', ?, ?)",
+                     (hashlib.sha256(body.encode()).hexdigest(), len(body), body.encode()))
+    store_blob = s._store_blob
+    pruner = threading.Thread(target=s._delete_orphan_blobs)
+
+    def store_then_prune(*args):
+        digest = store_blob(*args)
+        pruner.start()
+        pruner.join(0.3)  # the prune has to wait for the history write to commit
+        return digest
+
+    s._store_blob = store_then_prune
+    h_id = s.add_to_history('GET', 'https://example.com/a', '{}', None, 200, body)
+    pruner.join()
+    assert s.get_response_body(h_id) == body
+
+
+def test_import_indexes_each_batch_and_leaves_items_alone(tmp_path, open_db):
+    s = open_db(str(tmp_path / 'imp.db'))
+    s.save_template('existing', 'GET', 'https://example.com/existing')
+    items = [{'name': f'imported {i}', 'method': 'GET', 'url': f'https://example.com/{i}'} for i in range(25)]
+    assert s.import_requests(iter(items), batch_size=10) == 25
+    assert all(set(item) == {'name', 'method', 'url'} for item in items)
+    assert len(s.search('imported', limit=100)) == 25
+    cid = s.create_collection('c')
+    envs = [{'name': 'dev', 'variables': '{}'}]
+    assert s.import_requests(items[:3], collection_id=cid) == 3 and s.import_environment_items(envs) == 1
+    assert set(items[0]) == {'name', 'method', 'url'} and set(envs[0]) == {'name', 'variables'}
+    assert len(s.search('imported', kinds=['saved_request'])) == 3
+
+
+def test_byte_budget_counts_a_shared_body_once(tmp_path, open_db):
+    path = str(tmp_path / 'shared.db')
+    s = open_db(path)
+    body = os.urandom(2000).hex()
+    for i in range(50):
+        s.add_to_history('GET', f'https://example.com/{i}', '{}', None, 200, body)
+    with sqlite3.connect(path) as conn:
+        [(blob_size,)] = conn.execute('SELECT length(data) FROM response_blobs').fetchall()
+    # the body is stored once; the 50 rows add only ~25 bytes each
+    assert s.prune_history(RetentionPolicy(max_bytes=blob_size + 2000)) == 0
+    assert s.prune_history(RetentionPolicy(max_bytes=blob_size + 250)) == 40
+    assert [h.url for h in s.get_history(limit=100)][-1] == 'https://example.com/40'
+
+
+def test_vacuum_is_explicit_for_old_databases(tmp_path, open_db):
+    import cli
+    path = str(tmp_path / 'old.db')
+    with sqlite3.connect(path) as conn:
+        conn.execute('CREATE TABLE legacy (x)')  # auto_vacuum is fixed once the file has pages
+    s = open_db(path)
+    for i in range(20):
+        s.add_to_history('GET', f'https://example.com/{i}', '{}', None, 200, str(i) * 5000)
+    assert s.prune_history(RetentionPolicy(max_rows=1)) == 19
+    with sqlite3.connect(path) as conn:
+        # background pruning never rewrites the whole file
+        assert conn.execute('PRAGMA auto_vacuum').fetchone()[0] == 0
+    s.close()
+    assert cli.main(['vacuum', '--db', path]) == 0
+    with sqlite3.connect(path) as conn:
+        assert conn.execute('PRAGMA auto_vacuum').fetchone()[0] == 2
+    assert [h.url for h in open_db(path).get_history()] == ['https://example.com/19']
+
+
+def test_backends_share_one_database(tmp_path):
+    from sqlite_storage import SQLiteStorage
+    from storage import Storage
+    path = str(tmp_path / 'shared.db')
+    orm = Storage(db_path=path)
+    env_id = orm.create_environment('dev', '{"HOST": "api.local"}')
+    first = orm.add_to_history('GET', 'https://api.local/a', '{}', None, 200, 'body a', duration_ms=3.0)
+    orm.close()
+    lean = SQLiteStorage(db_path=path)
+    assert lean.get_environment(env_id).variables == '{"HOST": "api.local"}'
+    assert lean.get_response_body(first) == 'body a'
+    second = lean.add_to_history('GET', 'https://api.local/b', '{}', None, 200, 'body b', duration_ms=4.0)
+    lean.close()
+    orm = Storage(db_path=path)
+    assert [h.id for h in orm.get_history()] == [second, first]
+    assert orm.get_history_item(second).created_at > orm.get_history_item(first).created_at
+    assert orm.get_endpoint_summary('GET api.local/b')['count'] == 1
+    assert orm.search('api')[0]['kind'] == 'history'
+
+
+def test_connections_of_finished_threads_are_closed(tmp_path):
+    import gc
+    import threading
+    from sqlite_storage import SQLiteStorage
+    s = SQLiteStorage(db_path=str(tmp_path / 'threads.db'))
+    s.add_to_history('GET', 'https://example.com/a', '{}', None, 200, 'ok')
+    used = []
+
+    def read():
+        s.get_history()
+        used.append(s._conn())
+
+    for _ in range(20):
+        t = threading.Thread(target=read)
+        t.start()
+        t.join()
+    gc.collect()
+    assert len(s._connections) == 1  # this thread's, from add_to_history
+    for conn in used:
+        with pytest.raises(sqlite3.ProgrammingError):
+            conn.execute('SELECT 1')
+    s.close()
+    with pytest.raises(sqlite3.ProgrammingError):
+        s._local.held.conn.execute('SELECT 1')
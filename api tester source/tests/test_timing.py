@@ -0,0 +1,43 @@
+import json
+
+from runner import RequestSpec, run_one
+from requester import Requester
+from timing import RequestTimings
+
+
+def test_phases_for_new_and_reused_connections(local_server):
+    r = Requester()
+    first, second = RequestTimings(), RequestTimings()
+    assert r.send('GET', f'{local_server}/a', timings=first).status_code == 200
+    r.send('GET', f'{local_server}/b', timings=second)
+    assert not first.reused and first.phases['connect'] > 0 and first.phases['ttfb'] > 0
+    assert second.reused and second.phases['dns'] == second.phases['connect'] == 0
+    # the body was read inside send() because stream was not requested
+    assert first.phases['download'] > 0
+    assert first.phases['tls'] == 0
+
+
+def test_streamed_send_leaves_download_to_caller(local_server):
+    t = RequestTimings()
+    resp = Requester().send('GET', f'{local_server}/a', stream=True, timings=t)
+    assert t.phases['download'] == 0
+    assert resp.json()['path'] == '/a'
+
+
+def test_waterfall_round_trip():
+    t = RequestTimings()
+    t.add('dns', 0.002)
+    t.add('connect', 0.003)
+    t.add('ttfb', 0.010)
+    t.reused = False
+    again = RequestTimings.from_dict(json.loads(json.dumps(t.as_dict())))
+    assert again.waterfall() == [('dns', 0.0, 2.0), ('connect', 2.0, 3.0), ('ttfb', 5.0, 10.0)]
+    assert not again.reused and abs(again.total - 0.015) < 1e-9
+
+
+def test_timings_in_results_and_history(tmp_path, local_server, open_db):
+    res = run_one(Requester(), RequestSpec('x', 'GET', f'{local_server}/x'), {})
+    assert res['timings']['total_ms'] > 0 and res['timings']['prepare_ms'] >= 0
+    s = open_db(str(tmp_path / 't.db'))
+    s.add_to_history('GET', '/x', '{}', None, 200, 'ok', timings=json.dumps(res['timings']))
+    assert json.loads(s.get_history()[0].timings) == res['timings']
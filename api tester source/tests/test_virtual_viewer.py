@@ -0,0 +1,43 @@
+from virtual_viewer import LineIndex
+
+
+def _index(tmp_path, data, **kwargs):
+    path = tmp_path / 'body.txt'
+    path.write_bytes(data)
+    index = LineIndex(str(path), **kwargs)
+    assert index.build()
+    return index
+
+
+def test_random_access_with_sparse_offsets(tmp_path):
+    lines = [f'line {i}' for i in range(1000)]
+    index = _index(tmp_path, ('\n'.join(lines) + '\n').encode(), stride=16)
+    try:
+        assert index.line_count == 1000
+        assert len(index.offsets) == 1000 // 16 + 1
+        assert index.line(0) == 'line 0'
+        assert index.line(999) == 'line 999'
+        assert index.lines(495, 500) == lines[495:500]
+        assert index.lines(998, 2000) == lines[998:]
+    finally:
+        index.close()
+
+
+def test_long_lines_split_and_empty_file(tmp_path):
+    index = _index(tmp_path, b'x' * 10000 + b'\nend', max_line=4096)
+    try:
+        assert index.line_count == 4
+        assert [len(l) for l in index.lines(0, 4)] == [4096, 4096, 1808, 3]
+    finally:
+        index.close()
+    # a split never cuts through a multi-byte character
+    text = 'x' + '\u20ac' * 3000
+    index = _index(tmp_path, text.encode('utf-8'), max_line=4096)
+    try:
+        lines = index.lines(0, index.line_count)
+        assert ''.join(lines) == text and '\ufffd' not in ''.join(lines)
+    finally:
+        index.close()
+    empty = _index(tmp_path, b'')
+    assert empty.line_count == 0 and empty.lines(0, 10) == []
+    empty.close()
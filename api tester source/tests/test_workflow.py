@@ -0,0 +1,101 @@
+import json
+import threading
+import time
+
+import pytest
+
+import cli
+from jsonpath import compile_path
+from requester import Requester
+from workflow import Workflow, WorkflowError, WorkflowRunner
+
+
+def test_jsonpath_subset():
+    data = {'a': {'b': [{'id': 1}, {'id': 2, 'x': {'id': 3}}]}, 'k k': 5}
+    assert compile_path('$.a.b[-1].id').find(data) == [2]
+    assert compile_path('$..id').find(data) == [1, 2, 3]
+    assert compile_path('$.a.b[*].id').find(data) == [1, 2]
+    assert compile_path("$['k k']").first(data) == 5
+    assert compile_path('$.a.b[9]').first(data, 'none') == 'none'
+    with pytest.raises(ValueError):
+        compile_path('$.a[')
+
+
+def test_extraction_and_skipped_dependents(local_server):
+    wf = Workflow.from_dict({'name': 'chain', 'steps': [
+        {'name': 'login', 'method': 'POST', 'url': '{{BASE}}/login', 'body': 'tok',
+         'extract': {'token': 'json:$.body', 'ctype': 'header:Content-Type', 'path': 'regex:"path": "/(\\w+)"'}},
+        {'name': 'use', 'url': '{{BASE}}/{{path}}/{{token}}', 'depends_on': ['login'],
+         'headers': {'X-Type': '{{ctype}}'}},
+        {'name': 'broken', 'url': '{{BASE}}/fail', 'depends_on': ['login']},
+        {'name': 'after', 'url': '{{BASE}}/after', 'depends_on': ['broken', 'use']},
+    ]})
+    summary = WorkflowRunner(Requester(), wf, variables={'BASE': local_server}).run()
+    steps = {r['name']: r for r in summary['steps']}
+    assert not summary['ok']
+    assert steps['login']['extracted'] == {'token': 'tok', 'ctype': 'application/json', 'path': 'login'}
+    assert steps['use']['ok'] and steps['use']['url'] == f'{local_server}/login/tok'
+    assert steps['broken']['status'] == 500
+    assert steps['after']['skipped'] and 'broken' in steps['after']['error']
+
+
+class _SlowResponse:
+    status_code = 200
+    reason = 'OK'
+    headers = {}
+    text = '{}'
+
+    def json(self):
+        return {}
+
+
+class _SlowRequester:
+    def __init__(self, delay):
+        self.delay = delay
+        self.active = self.peak = 0
+        self.lock = threading.Lock()
+
+    def send(self, method, url, **kwargs):
+        with self.lock:
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+        time.sleep(self.delay)
+        with self.lock:
+            self.active -= 1
+        return _SlowResponse()
+
+
+def test_independent_branches_run_concurrently():
+    steps = [{'name': 'auth', 'url': 'x'}]
+    steps += [{'name': f'fan{i}', 'url': 'x', 'depends_on': ['auth']} for i in range(6)]
+    steps.append({'name': 'done', 'url': 'x', 'depends_on': [f'fan{i}' for i in range(6)]})
+    requester = _SlowRequester(0.1)
+    summary = WorkflowRunner(requester, Workflow.from_dict({'steps': steps}), workers=8).run()
+    assert summary['ok']
+    assert requester.peak == 6
+    # critical path is three steps, not eight
+    assert summary['elapsed_ms'] < 600
+
+
+def test_invalid_graphs_rejected():
+    with pytest.raises(WorkflowError):
+        Workflow.from_dict({'steps': [{'name': 'a', 'url': 'x', 'depends_on': ['b']},
+                                      {'name': 'b', 'url': 'x', 'depends_on': ['a']}]})
+    with pytest.raises(WorkflowError):
+        Workflow.from_dict({'steps': [{'name': 'a', 'url': 'x', 'depends_on': ['missing']}]})
+
+
+def test_cli_runs_saved_workflow(tmp_path, local_server, open_db):
+    db = str(tmp_path / 'wf.db')
+    s = open_db(db)
+    coll = s.create_collection('c')
+    req_id = s.save_request(coll, 'saved', 'GET', '{{BASE}}/saved')
+    s.save_workflow('flow', json.dumps({'name': 'flow', 'steps': [
+        {'name': 'one', 'request': req_id},
+        {'name': 'two', 'url': '{{BASE}}/two', 'depends_on': ['one']},
+    ]}))
+    out = tmp_path / 'out.jsonl'
+    code = cli.main(['workflow', '--db', db, '--workflow', 'flow', '--var', f'BASE={local_server}', '-o', str(out)])
+    assert code == 0
+    rows = [json.loads(line) for line in out.read_text().splitlines()]
+    assert [(r['name'], r['url']) for r in rows] == [('one', f'{local_server}/saved'), ('two', f'{local_server}/two')]
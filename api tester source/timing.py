@@ -0,0 +1,99 @@
+"""Per-phase request timing: DNS, connect, TLS, time to first byte, download.
+
+``TimingAdapter`` (in timing_adapter, so importing this module does not
+import requests) installs urllib3 connection classes that time name
+resolution, the TCP connect and the TLS handshake of new connections.
+They only do so while a ``RequestTimings`` is being captured on the
+current thread (``Requester.send(..., timings=t)``), so untimed sends pay
+nothing extra. All stamps come from ``time.perf_counter`` (monotonic).
+
+Phases run one after another, so the waterfall is their running sum:
+
+- prepare:  local work before sending (interpolation, header parsing)
+- dns, connect, tls: zero when a pooled keep-alive connection was reused
+- ttfb:     request written until response headers arrived (server time
+            plus one round trip)
+- download: reading the body
+- process:  local work after the body arrived (formatting, assertions)
+"""
+import threading
+from contextlib import contextmanager
+
+PHASES = ('prepare', 'dns', 'connect', 'tls', 'ttfb', 'download', 'process')
+PHASE_LABELS = {
+    'prepare': 'Prepare', 'dns': 'DNS', 'connect': 'Connect', 'tls': 'TLS',
+    'ttfb': 'Waiting (TTFB)', 'download': 'Download', 'process': 'Process',
+}
+
+_local = threading.local()
+
+
+class RequestTimings:
+    def __init__(self):
+        self.phases = dict.fromkeys(PHASES, 0.0)
+        self.reused = True  # no new connection was opened
+
+    def add(self, phase, seconds):
+        self.phases[phase] += max(0.0, seconds)
+
+    @property
+    def total(self):
+        return sum(self.phases.values())
+
+    @property
+    def network(self):
+        """Seconds spent opening connections (dns + connect + tls)."""
+        return self.phases['dns'] + self.phases['connect'] + self.phases['tls']
+
+    def as_dict(self):
+        out = {f"{p}_ms": round(v * 1000, 3) for p, v in self.phases.items()}
+        out['total_ms'] = round(self.total * 1000, 3)
+        out['reused'] = self.reused
+        return out
+
+    @classmethod
+    def from_dict(cls, data):
+        t = cls()
+        for p in PHASES:
+            t.phases[p] = float(data.get(f"{p}_ms") or 0) / 1000
+        t.reused = bool(data.get('reused', True))
+        return t
+
+    def waterfall(self):
+        """[(phase, start_ms, duration_ms)] for the phases that took any time."""
+        out = []
+        start = 0.0
+        for p in PHASES:
+            ms = self.phases[p] * 1000
+            if ms > 0:
+                out.append((p, start, ms))
+            start += ms
+        return out
+
+    def format(self):
+        parts = [f"{PHASE_LABELS[p]} {ms:.1f} ms" for p, _, ms in self.waterfall()]
+        return ", ".join(parts) + (" (reused connection)" if self.reused else "")
+
+
+@contextmanager
+def capture(timings):
+    """Record connection phases of requests made on this thread into ``timings``."""
+    previous = getattr(_local, 'timings', None)
+    _local.timings = timings
+    try:
+        yield timings
+    finally:
+        _local.timings = previous
+
+
+def current():
+    return getattr(_local, 'timings', None)
+
+
+def __getattr__(name):
+    # the connection classes used to live here; they need requests/urllib3
+    if name in ('TimingAdapter', 'TimedHTTPConnection', 'TimedHTTPSConnection',
+                'TimedHTTPConnectionPool', 'TimedHTTPSConnectionPool'):
+        import timing_adapter
+        return getattr(timing_adapter, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,79 @@
+"""urllib3 connection classes that report DNS, connect and TLS phases.
+
+Mounted by Requester through ``TimingAdapter``; phases are only recorded
+while ``timing.capture()`` is active on the current thread.
+"""
+import socket
+import time
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from timing import current
+
+
+class _TimedConnectionMixin:
+    def _new_conn(self):
+        timings = current()
+        if timings is None:
+            return super()._new_conn()
+        timings.reused = False
+        host = self._dns_host
+        started = time.perf_counter()
+        try:
+            infos = socket.getaddrinfo(host, self.port, 0, socket.SOCK_STREAM)
+        except OSError:
+            infos = []  # urllib3 reports the resolution error below
+        resolved = time.perf_counter()
+        timings.add('dns', resolved - started)
+        addresses = list(dict.fromkeys(info[4][0] for info in infos))
+        try:
+            if addresses:
+                # connect to the address just resolved rather than resolving again
+                self._dns_host = addresses[0]
+            try:
+                sock = super()._new_conn()
+            except Exception:
+                if len(addresses) < 2:
+                    raise
+                # let urllib3 try every address, as it normally would
+                self._dns_host = host
+                sock = super()._new_conn()
+        finally:
+            self._dns_host = host
+        timings.add('connect', time.perf_counter() - resolved)
+        return sock
+
+
+class TimedHTTPConnection(_TimedConnectionMixin, HTTPConnection):
+    pass
+
+
+class TimedHTTPSConnection(_TimedConnectionMixin, HTTPSConnection):
+    def connect(self):
+        timings = current()
+        if timings is None:
+            return super().connect()
+        before = timings.network
+        started = time.perf_counter()
+        super().connect()
+        # whatever connect() spent beyond dns + tcp connect was the handshake
+        timings.add('tls', time.perf_counter() - started - (timings.network - before))
+
+
+class TimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = TimedHTTPConnection
+
+
+class TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = TimedHTTPSConnection
+
+
+class TimingAdapter(HTTPAdapter):
+    """HTTPAdapter whose connections report phases to an active capture()."""
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            'http': TimedHTTPConnectionPool,
+            'https': TimedHTTPSConnectionPool,
+        }
@@ -1,16 +1,47 @@
 import customtkinter as ctk
 import tkinter as tk
-from tkinter import ttk
-from PIL import Image, ImageTk
+from tkinter import ttk, filedialog
 import json
-from datetime import datetime
-from requester import Requester
-from storage import Storage
+from datetime import datetime, timedelta
 import os
+import queue
+import threading
+import time
 from hover_button import HoverButton
 from modern_widgets import ModernEntry, SearchEntry
 from method_selector import MethodSelector
 from loading_spinner import LoadingSpinner
+from executor import RequestExecutor
+from loadtest import LoadRunner
+from iteration import IterationRunner, iter_rows
+from runner import RequestSpec
+from workflow import Workflow, WorkflowRunner
+from assertions import AssertionDefinitionError, ResponseContext, compile_assertions
+from timing import RequestTimings
+from waterfall import TrendChart, WaterfallView
+from environment import Interpolator, load_variables
+from spool import read_body, CHUNK_SIZE
+from virtual_viewer import VirtualTextView, LineIndex
+from highlighter import JsonHighlighter
+
+# Number of history rows shown in the sidebar
+SIDEBAR_HISTORY_LIMIT = 10
+
+# Sidebar search: results shown per query and how each kind is labelled
+SEARCH_RESULT_LIMIT = 20
+SEARCH_KIND_LABELS = {"history": "History", "template": "Template", "saved_request": "Request",
+                      "collection": "Collection"}
+
+# History pruning (RetentionPolicy arguments) applied in the background at startup
+HISTORY_RETENTION = dict(max_rows=5000, max_age_days=90, max_bytes=200 * 1024 * 1024)
+
+# Cached GET responses are kept in memory and in this directory
+RESPONSE_CACHE_DIR = "http_cache"
+
+# History keeps the first HISTORY_BODY_LIMIT bytes of spooled bodies, and
+# chunked inserts yield back to Tk after INSERT_BUDGET seconds.
+HISTORY_BODY_LIMIT = 1024 * 1024
+INSERT_BUDGET = 0.015
 
 # Modern color scheme inspired by shadcn design
 COLORS = {
@@ -66,14 +97,28 @@ class MethodLabel(ctk.CTkLabel):
         self.configure(fg_color=color)
 
 class App(ctk.CTk):
-    def __init__(self):
+    def __init__(self, on_ready=None):
         super().__init__()
         self.title("API Tester")
         self.geometry("1280x800")
         
-        # Initialize backend components
-        self.requester = Requester()
-        self.storage = Storage()
+        # Storage (open_storage) and the Requester (requests) are created on first
+        # use; _finish_startup opens both in the background once the window is up
+        self._storage = None
+        self._requester = None
+        # the HTTPCache behind the "Use cache" switch; off until it is turned on
+        self._response_cache = None
+        self._backend_lock = threading.Lock()
+        self._storage_events = queue.Queue()
+        self._on_ready = on_ready
+        # perf_counter() stamps of the startup steps, for main.py --timing
+        self.startup_marks = {}
+        # Requests run in the background; results come back through poll()
+        self.executor = RequestExecutor(max_workers=4)
+        self._latest_job = None
+        self._current_body = None
+        self._insert_job = None
+        self._index_job = None
         
         # Build UI
         self._setup_theme()
@@ -82,6 +127,79 @@ class App(ctk.CTk):
         
         # Start in dark mode like HTTPie
         self._toggle_theme("dark")
+
+        # env name -> Environment index and per-environment Interpolators
+        self._env_index = (None, {})
+        self._interpolators = {}
+
+        self.protocol("WM_DELETE_WINDOW", self._on_close)
+        self._drain_results()
+        self.bind("<Map>", self._on_first_map)
+        self.startup_marks["built"] = time.perf_counter()
+
+    @property
+    def storage(self):
+        """The Storage, opened on first use."""
+        if self._storage is None:
+            with self._backend_lock:
+                if self._storage is None:
+                    from storage_base import RetentionPolicy, open_storage
+                    storage = open_storage(retention=RetentionPolicy(**HISTORY_RETENTION))
+                    # Storage changes (from any thread) update the sidebar incrementally
+                    storage.subscribe(lambda *ev: self._storage_events.put(ev))
+                    self._storage = storage
+        return self._storage
+
+    @property
+    def requester(self):
+        """The Requester, created on first use; it sends everything until "Use cache" is on."""
+        if self._requester is None:
+            with self._backend_lock:
+                if self._requester is None:
+                    from requester import Requester
+                    self._requester = Requester()
+        return self._requester
+
+    def _apply_cache_settings(self):
+        """Route sends through the response cache only while "Use cache" is on."""
+        if not self.use_cache_var.get():
+            self.requester.cache = None
+            self.cache_label.configure(text="Cache: off")
+            return
+        if self._response_cache is None:
+            from httpcache import HTTPCache
+            self._response_cache = HTTPCache(RESPONSE_CACHE_DIR)
+        self._response_cache.serve_stale = self.serve_stale_var.get()
+        self.requester.cache = self._response_cache
+        self._update_cache_stats()
+
+    def _on_first_map(self, event):
+        if event.widget is not self:
+            return
+        self.unbind("<Map>")
+        self.startup_marks["window"] = time.perf_counter()
+        # let the first frame draw before doing anything slow
+        self.after_idle(self._finish_startup)
+
+    def _finish_startup(self):
+        """Import and open the backend off the UI thread, then fill the sidebar."""
+        self.executor.submit(lambda job: (self.storage, self.requester), callback=self._on_backend_ready,
+                             tag="startup")
+
+    def _on_backend_ready(self, job, result, error):
+        if error is not None:
+            self.status_label.configure(text=f"Could not open storage: {error}")
+            return
+        for kind in ("template", "collection", "history"):
+            self._load_sidebar_section(kind)
+        self.envs = self.storage.get_environments()
+        if self.envs:
+            self.env_cb.configure(values=[e.name for e in self.envs])
+            self.env_cb.set(self.envs[0].name)
+        self.storage.prune_history_in_background()
+        self.startup_marks["ready"] = time.perf_counter()
+        if self._on_ready is not None:
+            self._on_ready(self)
     
     def _setup_theme(self):
         self.font = ("Segoe UI", 12)
@@ -177,6 +295,17 @@ class App(ctk.CTk):
             hover_color=COLORS["sidebar_dark"]
         )
         self.collapse_btn.pack(side="right")
+
+        # Search across history, templates and collections, refreshed as you type
+        self.search_entry = SearchEntry(
+            self.sidebar,
+            placeholder_text="Search history, templates...",
+            height=32,
+            on_change=self._on_search,
+            command=lambda: self._on_search(self.search_entry.get())
+        )
+        self.search_entry.pack(fill="x", padx=16)
+        self.search_results = ctk.CTkFrame(self.sidebar, fg_color="transparent")
         
         # Collections section
         # Templates section
@@ -198,9 +327,9 @@ class App(ctk.CTk):
         new_tmpl_btn.pack(fill="x", padx=16, pady=(0,10))
 
         # Templates list
-        templates = self.storage.get_templates()
-        for tmpl in templates:
-            self._add_template_item(tmpl)
+        self._sidebar_rows = {"template": {}, "collection": {}, "history": {}}
+        self.templates_list = ctk.CTkFrame(self.sidebar, fg_color="transparent")
+        self.templates_list.pack(fill="x")
 
         ctk.CTkLabel(
             self.sidebar,
@@ -219,6 +348,50 @@ class App(ctk.CTk):
             hover_color=COLORS["sidebar_dark"]
         )
         env_mgr_btn.pack(fill="x", padx=16, pady=(12,6))
+
+        # Load test button
+        load_btn = ctk.CTkButton(
+            self.sidebar,
+            text="Load Test",
+            height=32,
+            command=self._open_load_test,
+            fg_color=COLORS["sidebar_dark"],
+            hover_color=COLORS["sidebar_dark"]
+        )
+        load_btn.pack(fill="x", padx=16, pady=(0,6))
+
+        # Data-driven run button
+        data_btn = ctk.CTkButton(
+            self.sidebar,
+            text="Run Data File",
+            height=32,
+            command=self._open_iteration_run,
+            fg_color=COLORS["sidebar_dark"],
+            hover_color=COLORS["sidebar_dark"]
+        )
+        data_btn.pack(fill="x", padx=16, pady=(0,6))
+
+        # Latency trends button
+        trend_btn = ctk.CTkButton(
+            self.sidebar,
+            text="Trends",
+            height=32,
+            command=self._open_trends,
+            fg_color=COLORS["sidebar_dark"],
+            hover_color=COLORS["sidebar_dark"]
+        )
+        trend_btn.pack(fill="x", padx=16, pady=(0,6))
+
+        # Workflows button
+        wf_btn = ctk.CTkButton(
+            self.sidebar,
+            text="Workflows",
+            height=32,
+            command=self._open_workflows,
+            fg_color=COLORS["sidebar_dark"],
+            hover_color=COLORS["sidebar_dark"]
+        )
+        wf_btn.pack(fill="x", padx=16, pady=(0,6))
         
         # New collection button
         new_coll_btn = ctk.CTkButton(
@@ -232,9 +405,8 @@ class App(ctk.CTk):
         new_coll_btn.pack(fill="x", padx=16, pady=(0,10))
         
         # Collections list
-        collections = self.storage.get_collections()
-        for collection in collections:
-            self._add_collection_item(collection)
+        self.collections_list = ctk.CTkFrame(self.sidebar, fg_color="transparent")
+        self.collections_list.pack(fill="x")
         
         # History section
         ctk.CTkLabel(
@@ -245,17 +417,83 @@ class App(ctk.CTk):
         ).pack(fill="x", pady=(20,10), padx=16)
         
         # History items
-        history = self.storage.get_history(limit=10)
-        for item in history:
-            self._add_history_item(item)
+        self.history_list = ctk.CTkFrame(self.sidebar, fg_color="transparent")
+        self.history_list.pack(fill="x")
+
+    def _load_sidebar_section(self, kind):
+        """(Re)populate one sidebar list from storage."""
+        for frame in self._sidebar_rows[kind].values():
+            frame.destroy()
+        self._sidebar_rows[kind] = {}
+        if kind == "template":
+            for tmpl in self.storage.get_templates():
+                self._add_template_item(tmpl)
+        elif kind == "collection":
+            for collection in self.storage.get_collections():
+                self._add_collection_item(collection)
+        elif kind == "history":
+            for item in self.storage.get_history(limit=SIDEBAR_HISTORY_LIMIT):
+                self._add_history_item(item)
+
+    def _place_sidebar_row(self, kind, row_id, frame, top=False):
+        """Pack a row frame into its section, newest-first when ``top`` is set."""
+        rows = self._sidebar_rows[kind]
+        old = rows.get(row_id)
+        shown = frame.master.pack_slaves()
+        if old is not None:
+            # update in place: take the old row's slot
+            frame.pack(fill="x", padx=16, pady=2, before=old)
+            old.destroy()
+        elif top and shown:
+            frame.pack(fill="x", padx=16, pady=2, before=shown[0])
+        else:
+            frame.pack(fill="x", padx=16, pady=2)
+        rows[row_id] = frame
+
+    def _remove_sidebar_row(self, kind, row_id):
+        frame = self._sidebar_rows[kind].pop(row_id, None)
+        if frame is not None:
+            frame.destroy()
 
-    def _add_template_item(self, template):
+    def _on_storage_event(self, entity, action, payload):
+        """Apply one Storage change to the sidebar, touching only the affected row."""
+        if entity == "environment":
+            self.envs = self.storage.get_environments()
+            names = [e.name for e in self.envs] if self.envs else ["(no env)"]
+            self.env_cb.configure(values=names)
+            return
+        if action == "error":
+            dropped = self.storage.history_writer.dropped
+            self.status_label.configure(
+                text=f"History not saved ({dropped} rows lost): {payload}", text_color=COLORS["method_delete"]
+            )
+            return
+        if entity not in self._sidebar_rows:
+            return
+        if action == "reload":
+            self._load_sidebar_section(entity)
+        elif action == "delete":
+            self._remove_sidebar_row(entity, payload)
+        elif entity == "template":
+            self._add_template_item(payload, top=(action == "add"))
+        elif entity == "collection":
+            self._add_collection_item(payload)
+        elif entity == "history":
+            self._add_history_item(payload, top=True)
+            rows = self._sidebar_rows["history"]
+            shown = self.history_list.pack_slaves()
+            # drop the oldest rows (packed last) beyond the sidebar limit
+            for frame in shown[SIDEBAR_HISTORY_LIMIT:]:
+                row_id = next(k for k, f in rows.items() if f is frame)
+                self._remove_sidebar_row("history", row_id)
+
+    def _add_template_item(self, template, top=False):
         frame = ctk.CTkFrame(
-            self.sidebar,
+            self.templates_list,
             corner_radius=4,
             fg_color="transparent"
         )
-        frame.pack(fill="x", padx=16, pady=2)
+        self._place_sidebar_row("template", template.id, frame, top=top)
 
         ctk.CTkLabel(
             frame,
@@ -304,12 +542,11 @@ class App(ctk.CTk):
 
         self.method_cb = _MethodAdapter(self.method_selector)
         
-        # Environment selector with modern styling
-        self.envs = self.storage.get_environments()
-        env_names = [e.name for e in self.envs] if self.envs else ["(no env)"]
+        # Environment selector with modern styling (filled once storage is open)
+        self.envs = []
         self.env_cb = ctk.CTkOptionMenu(
             url_frame,
-            values=env_names,
+            values=["(no env)"],
             width=140,
             height=28,
             font=("Segoe UI", 10),
@@ -358,76 +595,19 @@ class App(ctk.CTk):
             fg_color=COLORS["accent"],
             hover_color=COLORS["accent_hover"]
         )
-        self.send_btn.grid(row=0, column=4, padx=(8,16), pady=12)
-        # Toplevel window to manage environments (create/edit/delete)
-        win = ctk.CTkToplevel(self)
-        win.title("Environments")
-        win.geometry("600x400")
-
-        left = ctk.CTkFrame(win)
-        left.pack(side="left", fill="y", padx=8, pady=8)
-
-        right = ctk.CTkFrame(win)
-        right.pack(side="left", fill="both", expand=True, padx=8, pady=8)
-
-        listbox = tk.Listbox(left, width=30)
-        listbox.pack(fill="y", expand=True)
-
-        envs = self.storage.get_environments()
-        for e in envs:
-            listbox.insert(tk.END, f"{e.id}: {e.name}")
-
-        # Editor area
-        name_var = tk.StringVar()
-        name_entry = ctk.CTkEntry(right, textvariable=name_var, placeholder_text="Name")
-        name_entry.pack(fill="x", pady=(0,8))
-
-        vars_text = ctk.CTkTextbox(right, height=18)
-        vars_text.pack(fill="both", expand=True)
-
-        def on_select(evt):
-            sel = listbox.curselection()
-            if not sel:
-                return
-            idx = sel[0]
-            env = envs[idx]
-            name_var.set(env.name)
-            vars_text.delete("1.0", tk.END)
-            vars_text.insert(tk.END, env.variables or "{}")
-
-        listbox.bind("<<ListboxSelect>>", on_select)
-
-        def create_env():
-            n = name_var.get().strip()
-            v = vars_text.get("1.0", tk.END).strip() or "{}"
-            if n:
-                self.storage.create_environment(n, v)
-                win.destroy()
-                self._refresh_sidebar()
-
-        def update_env():
-            sel = listbox.curselection()
-            if not sel:
-                return
-            env = envs[sel[0]]
-            self.storage.update_environment(env.id, vars_text.get("1.0", tk.END).strip() or "{}")
-            win.destroy()
-            self._refresh_sidebar()
-
-        def delete_env():
-            sel = listbox.curselection()
-            if not sel:
-                return
-            env = envs[sel[0]]
-            self.storage.delete_environment(env.id)
-            win.destroy()
-            self._refresh_sidebar()
+        self.send_btn.grid(row=0, column=4, padx=(8,4), pady=12)
 
-        btn_frame = ctk.CTkFrame(right)
-        btn_frame.pack(fill="x", pady=6)
-        ctk.CTkButton(btn_frame, text="Create", command=create_env).pack(side="left", padx=6)
-        ctk.CTkButton(btn_frame, text="Update", command=update_env).pack(side="left", padx=6)
-        ctk.CTkButton(btn_frame, text="Delete", fg_color="#D64949", command=delete_env).pack(side="left", padx=6)
+        # Cancel button (enabled while requests are in flight)
+        self.cancel_btn = ctk.CTkButton(
+            url_frame,
+            text="Cancel",
+            width=80,
+            height=36,
+            command=self._cancel_requests,
+            font=self.font,
+            state="disabled"
+        )
+        self.cancel_btn.grid(row=0, column=5, padx=(4,16), pady=12)
         
     def _build_request_tab(self, parent):
         # Split into headers and body sections
@@ -501,6 +681,16 @@ class App(ctk.CTk):
         
         self.body_text = ModernScrolledText(body_frame)
         self.body_text.grid(row=1, column=0, sticky="nsew", padx=8, pady=(0,8))
+
+        # Assertions (JSON list, see assertions.py), checked on every response
+        ctk.CTkLabel(
+            body_frame,
+            text="Assertions",
+            font=self.font
+        ).grid(row=2, column=0, sticky="w", padx=8, pady=(0,4))
+
+        self.assertions_text = ModernScrolledText(body_frame, height=90)
+        self.assertions_text.grid(row=3, column=0, sticky="ew", padx=8, pady=(0,8))
         
     def _build_response_tab(self, parent):
         parent.grid_columnconfigure(0, weight=1)
@@ -523,6 +713,56 @@ class App(ctk.CTk):
             font=self.font
         )
         self.time_label.pack(side="left", padx=8, pady=8)
+
+        self.cache_label = ctk.CTkLabel(
+            info_frame,
+            text="Cache: off",
+            font=self.font,
+            text_color="#A1A1AA"
+        )
+        self.cache_label.pack(side="left", padx=8, pady=8)
+
+        # Jump to line in the response body
+        self.goto_var = tk.StringVar()
+        goto_entry = ctk.CTkEntry(
+            info_frame,
+            textvariable=self.goto_var,
+            placeholder_text="Line",
+            width=80,
+            height=28,
+            font=self.font
+        )
+        goto_entry.pack(side="right", padx=(0,8), pady=6)
+        goto_entry.bind("<Return>", self._goto_line)
+
+        # Answer stale cached GETs locally instead of revalidating them
+        self.serve_stale_var = tk.BooleanVar(value=False)
+        ctk.CTkSwitch(
+            info_frame,
+            text="Serve stale",
+            variable=self.serve_stale_var,
+            command=self._apply_cache_settings,
+            font=self.font
+        ).pack(side="right", padx=8, pady=6)
+
+        # Answer repeated GETs from the local HTTP cache; off so every send hits the network
+        self.use_cache_var = tk.BooleanVar(value=False)
+        ctk.CTkSwitch(
+            info_frame,
+            text="Use cache",
+            variable=self.use_cache_var,
+            command=self._apply_cache_settings,
+            font=self.font
+        ).pack(side="right", padx=8, pady=6)
+
+        ctk.CTkButton(
+            info_frame,
+            text="Save Body",
+            width=90,
+            height=28,
+            command=self._save_full_body,
+            font=self.font
+        ).pack(side="right", padx=8, pady=6)
         
         # Response content
         content_frame = ctk.CTkFrame(parent, corner_radius=0)
@@ -535,20 +775,31 @@ class App(ctk.CTk):
         self.resp_inner_tabs.grid(row=0, column=0, sticky="nsew", padx=8, pady=8)
         body_tab = self.resp_inner_tabs.add("Body")
         headers_tab = self.resp_inner_tabs.add("Headers")
+        tests_tab = self.resp_inner_tabs.add("Tests")
+        timing_tab = self.resp_inner_tabs.add("Timing")
 
         self.resp_text = ModernScrolledText(body_tab)
         self.resp_text.pack(fill="both", expand=True, padx=4, pady=4)
+        self.resp_highlighter = JsonHighlighter(self.resp_text)
+        # Spooled (large) bodies are shown in a virtualized viewer instead
+        self.resp_viewer = VirtualTextView(body_tab)
 
         self.resp_headers_text = ModernScrolledText(headers_tab, height=10)
         self.resp_headers_text.pack(fill="both", expand=True, padx=4, pady=4)
+
+        self.resp_tests_text = ModernScrolledText(tests_tab, height=10)
+        self.resp_tests_text.pack(fill="both", expand=True, padx=4, pady=4)
+
+        self.resp_waterfall = WaterfallView(timing_tab)
+        self.resp_waterfall.pack(fill="both", expand=True, padx=4, pady=4)
     
     def _add_collection_item(self, collection):
         frame = ctk.CTkFrame(
-            self.sidebar,
+            self.collections_list,
             corner_radius=4,
             fg_color="transparent"
         )
-        frame.pack(fill="x", padx=16, pady=2)
+        self._place_sidebar_row("collection", collection.id, frame)
         
         ctk.CTkLabel(
             frame,
@@ -557,13 +808,13 @@ class App(ctk.CTk):
             text_color=COLORS["text_dark"]
         ).pack(side="left", padx=8, pady=6)
     
-    def _add_history_item(self, history_item):
+    def _add_history_item(self, history_item, top=False):
         frame = ctk.CTkFrame(
-            self.sidebar,
+            self.history_list,
             corner_radius=4,
             fg_color="transparent"
         )
-        frame.pack(fill="x", padx=16, pady=2)
+        self._place_sidebar_row("history", history_item.id, frame, top=top)
         
         MethodLabel(
             frame,
@@ -582,6 +833,67 @@ class App(ctk.CTk):
         frame.bind("<Button-1>", lambda e: self._load_history_item(history_item))
         url_label.bind("<Button-1>", lambda e: self._load_history_item(history_item))
     
+    def _on_search(self, query):
+        """Search storage in the background; a newer query cancels the previous one."""
+        self.executor.cancel_all(tag="search")
+        if not query.strip():
+            self._show_search_results([])
+            return
+        self.executor.submit(
+            lambda job: self.storage.search(query, limit=SEARCH_RESULT_LIMIT),
+            callback=lambda job, results, error: self._show_search_results(results or [], error),
+            tag="search"
+        )
+
+    def _show_search_results(self, results, error=None):
+        for child in self.search_results.winfo_children():
+            child.destroy()
+        if not self.search_entry.get().strip():
+            self.search_results.pack_forget()
+            return
+        self.search_results.pack(fill="x", pady=(4, 0), after=self.search_entry)
+        if error is not None or not results:
+            ctk.CTkLabel(
+                self.search_results,
+                text=f"Search failed: {error}" if error is not None else "No matches",
+                font=("Segoe UI", 11),
+                text_color="#A1A1AA"
+            ).pack(fill="x", padx=16, pady=4)
+            return
+        for result in results:
+            frame = ctk.CTkFrame(self.search_results, corner_radius=4, fg_color="transparent")
+            frame.pack(fill="x", padx=16, pady=1)
+            title = result["title"] or result["url"]
+            labels = [
+                ctk.CTkLabel(frame, text=f"{SEARCH_KIND_LABELS[result['kind']]}  {title[:32]}", anchor="w",
+                             font=self.font, text_color=COLORS["text_dark"]),
+                ctk.CTkLabel(frame, text=result["snippet"][:48], anchor="w", font=("Segoe UI", 10),
+                             text_color="#A1A1AA"),
+            ]
+            for widget in [frame] + labels:
+                widget.bind("<Button-1>", lambda e, r=result: self._open_search_result(r))
+            for label in labels:
+                label.pack(fill="x", padx=8)
+
+    def _open_search_result(self, result):
+        kind, ref_id = result["kind"], result["id"]
+        if kind == "history":
+            item = self.storage.get_history_item(ref_id)
+            if item is not None:
+                self._load_history_item(item)
+        elif kind == "template":
+            item = self.storage.get_template(ref_id)
+            if item is not None:
+                self._load_template(item)
+        elif kind == "saved_request":
+            item = self.storage.get_saved_request(ref_id)
+            if item is not None:
+                self._load_template(item)
+        elif kind == "collection":
+            requests = self.storage.get_collection_requests(ref_id)
+            if requests:
+                self._load_template(requests[0])
+
     def _new_collection(self):
         dialog = ctk.CTkInputDialog(
             text="Enter collection name:",
@@ -590,7 +902,6 @@ class App(ctk.CTk):
         name = dialog.get_input()
         if name:
             self.storage.create_collection(name)
-            self._refresh_sidebar()
     
     def _load_history_item(self, item):
         self.method_cb.set(item.method)
@@ -601,6 +912,23 @@ class App(ctk.CTk):
         if item.body:
             self.body_text.delete("1.0", tk.END)
             self.body_text.insert("1.0", item.body)
+
+        # Response bodies live in the blob store and are only loaded on open
+        try:
+            response_body = self.storage.get_response_body(item.id)
+        except Exception as e:
+            response_body = f"Could not load stored response: {e}"
+        timings = None
+        if item.timings:
+            try:
+                timings = RequestTimings.from_dict(json.loads(item.timings))
+            except Exception:
+                pass
+        if response_body is not None:
+            self._set_current_body(None)
+            self._show_response(response_body, status=str(item.response_code or "-"),
+                                duration=timings.total if timings else None)
+        self.resp_waterfall.set_timings(timings)
         
         # Switch to request tab
         self.tabs.set("Request")
@@ -617,46 +945,44 @@ class App(ctk.CTk):
         url = self.url_var.get()
         headers = self.headers_text.get("1.0", tk.END).strip()
         body = self.body_text.get("1.0", tk.END).strip()
-        self.storage.save_template(name=name, method=method, url=url, headers=headers, body=body)
-        self._refresh_sidebar()
+        assertions = self.assertions_text.get("1.0", tk.END).strip() or None
+        self.storage.save_template(name=name, method=method, url=url, headers=headers, body=body, assertions=assertions)
 
     def _delete_template(self, template):
         try:
             self.storage.delete_template(template.id)
         except Exception:
             pass
-        self._refresh_sidebar()
 
-    def _apply_environment_to_string(self, text: str) -> str:
-        """Replace {{VAR}} tokens in text using the selected environment variables."""
-        if not text:
-            return text
+    def _current_interpolator(self):
+        """Interpolator for the selected environment, or None.
+
+        Interpolators are cached per environment and rebuilt only when its
+        variables change, so their compiled/rendered templates are reused.
+        """
         try:
             sel = self.env_cb.get()
         except Exception:
             sel = None
         if not sel or sel == "(no env)":
-            return text
-        # find environment object
-        env = None
-        for e in getattr(self, 'envs', []) or []:
-            if e.name == sel:
-                env = e
-                break
-        if not env:
-            return text
-        try:
-            vars_map = json.loads(env.variables or "{}")
-        except Exception:
-            vars_map = {}
-
-        def replace_token(s):
-            out = s
-            for k, v in vars_map.items():
-                out = out.replace(f"{{{{{k}}}}}", str(v))
-            return out
+            return None
+        envs = getattr(self, 'envs', None) or []
+        if self._env_index[0] is not envs:
+            self._env_index = (envs, {e.name: e for e in envs})
+        env = self._env_index[1].get(sel)
+        if env is None:
+            return None
+        cached = self._interpolators.get(env.id)
+        if cached is None or cached[0] != env.variables:
+            cached = self._interpolators[env.id] = (env.variables, Interpolator(load_variables(env.variables)))
+        return cached[1]
 
-        return replace_token(text)
+    def _apply_environment_to_string(self, text: str) -> str:
+        """Replace {{VAR}} tokens in text using the selected environment variables."""
+        if not text:
+            return text
+        env = self._current_interpolator()
+        return env.render(text) if env is not None else text
 
     def _load_template(self, template):
         # template is a Template ORM object
@@ -671,6 +997,9 @@ class App(ctk.CTk):
         if template.body:
             self.body_text.delete("1.0", tk.END)
             self.body_text.insert("1.0", template.body)
+        self.assertions_text.delete("1.0", tk.END)
+        if template.assertions:
+            self.assertions_text.insert("1.0", template.assertions)
         self.tabs.set("Request")
 
     def _manage_environments(self):
@@ -753,6 +1082,356 @@ class App(ctk.CTk):
         ctk.CTkButton(btn_frame, text="Update", command=update_env).pack(side="left", padx=6)
         ctk.CTkButton(btn_frame, text="Delete", fg_color="#D64949", command=delete_env).pack(side="left", padx=6)
     
+    def _open_load_test(self):
+        """Open a Toplevel window that load-runs the request in the editor."""
+        win = ctk.CTkToplevel(self)
+        win.title("Load Test")
+        win.geometry("560x420")
+
+        form = ctk.CTkFrame(win, fg_color="transparent")
+        form.pack(fill="x", padx=12, pady=12)
+
+        fields = {}
+        for row, (label, default) in enumerate([
+            ("Concurrency", "10"),
+            ("Rate (req/s, blank = max)", ""),
+            ("Duration (s)", "10"),
+            ("Requests (blank = no limit)", ""),
+        ]):
+            ctk.CTkLabel(form, text=label, anchor="w", width=200).grid(row=row, column=0, sticky="w", pady=4)
+            var = tk.StringVar(value=default)
+            ctk.CTkEntry(form, textvariable=var, width=120).grid(row=row, column=1, sticky="w", pady=4)
+            fields[label] = var
+
+        report_text = ModernScrolledText(win, height=10)
+        report_text.pack(fill="both", expand=True, padx=12, pady=(0,8))
+
+        state = {"job": None, "stop": None}
+
+        def number(label, cast):
+            raw = fields[label].get().strip()
+            return cast(raw) if raw else None
+
+        def on_done(job, report, error):
+            state["job"] = None
+            run_btn.configure(text="Run")
+            report_text.delete("1.0", tk.END)
+            report_text.insert(tk.END, str(error) if error is not None else report.format())
+
+        def run():
+            if state["job"] is not None:
+                # stop early but still show the partial report
+                state["stop"].set()
+                return
+            url = self.url_var.get().strip()
+            if not url:
+                return
+            from requester import Requester
+            requester = None
+            try:
+                concurrency = number("Concurrency", int) or 1
+                # a pool sized for the run and no response cache: every request goes out
+                requester = Requester(pool_maxsize=max(10, concurrency))
+                # templates are rendered by the runner so dynamic values change per request
+                runner = LoadRunner(
+                    requester,
+                    self.method_cb.get(),
+                    url,
+                    headers=self.headers_text.get("1.0", tk.END).strip() or "{}",
+                    body=self.body_text.get("1.0", tk.END).strip() or None,
+                    variables=self._current_interpolator(),
+                    assertions=self.assertions_text.get("1.0", tk.END).strip() or None,
+                    concurrency=concurrency,
+                    rate=number("Rate (req/s, blank = max)", float),
+                    duration=number("Duration (s)", float),
+                    total=number("Requests (blank = no limit)", int),
+                )
+            except ValueError as e:  # includes AssertionDefinitionError
+                if requester is not None:
+                    requester.close()
+                report_text.delete("1.0", tk.END)
+                report_text.insert(tk.END, str(e))
+                return
+            report_text.delete("1.0", tk.END)
+            report_text.insert(tk.END, "Running...")
+            run_btn.configure(text="Stop")
+            stop = state["stop"] = threading.Event()
+
+            def load(job):
+                try:
+                    return runner.run(should_stop=lambda: stop.is_set() or job.cancelled)
+                finally:
+                    requester.close()
+
+            state["job"] = self.executor.submit(load, callback=on_done, tag="load")
+
+        def on_close():
+            if state["job"] is not None:
+                state["job"].cancel()
+            win.destroy()
+
+        run_btn = ctk.CTkButton(win, text="Run", command=run, fg_color=COLORS["accent"], hover_color=COLORS["accent_hover"])
+        run_btn.pack(pady=(0,12))
+        win.protocol("WM_DELETE_WINDOW", on_close)
+
+    def _open_iteration_run(self):
+        """Send the request in the editor once per row of a CSV/JSONL/JSON file."""
+        win = ctk.CTkToplevel(self)
+        win.title("Run Data File")
+        win.geometry("560x260")
+
+        form = ctk.CTkFrame(win, fg_color="transparent")
+        form.pack(fill="x", padx=12, pady=12)
+        form.grid_columnconfigure(1, weight=1)
+
+        data_var = tk.StringVar()
+        out_var = tk.StringVar()
+        workers_var = tk.StringVar(value="4")
+
+        def browse(var, save):
+            types = [("Data", "*.csv *.jsonl *.ndjson *.json"), ("All files", "*.*")]
+            if save:
+                path = filedialog.asksaveasfilename(title="Results file", defaultextension=".jsonl")
+            else:
+                path = filedialog.askopenfilename(title="Data file", filetypes=types)
+            if path:
+                var.set(path)
+
+        for row, (label, var, save) in enumerate([("Data file (CSV/JSONL/JSON)", data_var, False),
+                                                  ("Results (JSONL)", out_var, True)]):
+            ctk.CTkLabel(form, text=label, anchor="w", width=160).grid(row=row, column=0, sticky="w", pady=4)
+            ctk.CTkEntry(form, textvariable=var).grid(row=row, column=1, sticky="ew", pady=4)
+            ctk.CTkButton(form, text="...", width=32, command=lambda v=var, sv=save: browse(v, sv)).grid(row=row, column=2, padx=(6,0))
+        ctk.CTkLabel(form, text="Workers", anchor="w", width=160).grid(row=2, column=0, sticky="w", pady=4)
+        ctk.CTkEntry(form, textvariable=workers_var, width=80).grid(row=2, column=1, sticky="w", pady=4)
+
+        status = ctk.CTkLabel(win, text="", anchor="w")
+        status.pack(fill="x", padx=12)
+        # updated from the worker thread, read by the progress timer
+        state = {"job": None, "stop": None, "done": 0, "tick": None}
+
+        def tick():
+            state["tick"] = None
+            if state["job"] is not None:
+                status.configure(text=f"{state['done']} rows sent...")
+                state["tick"] = win.after(250, tick)
+
+        def on_done(job, summary, error):
+            state["job"] = None
+            run_btn.configure(text="Run")
+            if error is not None:
+                status.configure(text=str(error))
+            else:
+                status.configure(text=f"{summary['rows']} rows: {summary['ok']} ok, "
+                                      f"{summary['failed']} failed in {summary['elapsed']}s")
+
+        def run():
+            if state["job"] is not None:
+                state["stop"].set()
+                return
+            data_path, out_path = data_var.get().strip(), out_var.get().strip()
+            if not data_path or not out_path or not self.url_var.get().strip():
+                status.configure(text="Choose a data file and a results file")
+                return
+            try:
+                spec = RequestSpec(None, self.method_cb.get(), self.url_var.get().strip(),
+                                   self.headers_text.get("1.0", tk.END).strip() or "{}",
+                                   self.body_text.get("1.0", tk.END).strip() or None,
+                                   self.assertions_text.get("1.0", tk.END).strip() or None)
+            except AssertionDefinitionError as e:
+                status.configure(text=f"Invalid assertions: {e}")
+                return
+            env = self._current_interpolator()
+            try:
+                workers = int(workers_var.get() or 4)
+            except ValueError:
+                status.configure(text="Workers must be a number")
+                return
+            runner = IterationRunner(self.requester, spec, variables=env.variables if env else None, workers=workers)
+            stop = state["stop"] = threading.Event()
+            state["done"] = 0
+
+            def work(job):
+                with open(out_path, "w", encoding="utf-8") as out:
+                    def on_result(res):
+                        out.write(json.dumps(res) + "\n")
+                        state["done"] += 1
+                    return runner.run(iter_rows(data_path), on_result=on_result,
+                                      should_stop=lambda: stop.is_set() or job.cancelled)
+
+            run_btn.configure(text="Stop")
+            state["job"] = self.executor.submit(work, callback=on_done, tag="iterate")
+            tick()
+
+        def on_close():
+            if state["job"] is not None:
+                state["job"].cancel()
+                state["job"] = None
+            if state["tick"] is not None:
+                win.after_cancel(state["tick"])
+                state["tick"] = None
+            win.destroy()
+
+        run_btn = ctk.CTkButton(win, text="Run", command=run, fg_color=COLORS["accent"], hover_color=COLORS["accent_hover"])
+        run_btn.pack(pady=12)
+        win.protocol("WM_DELETE_WINDOW", on_close)
+
+    def _open_workflows(self):
+        """Edit, save and run request-chaining workflows (see workflow.py for the format)."""
+        win = ctk.CTkToplevel(self)
+        win.title("Workflows")
+        win.geometry("760x620")
+
+        top = ctk.CTkFrame(win, fg_color="transparent")
+        top.pack(fill="x", padx=12, pady=(12,6))
+        saved = {w.name: w for w in self.storage.get_workflows()}
+        picker = ctk.CTkComboBox(top, values=list(saved) or ["(none)"], width=240)
+        picker.pack(side="left")
+        picker.set("(none)")
+
+        editor = ModernScrolledText(win, height=14)
+        editor.pack(fill="both", expand=True, padx=12, pady=6)
+        editor.insert("1.0", json.dumps({"name": "workflow", "steps": [
+            {"name": "login", "method": "POST", "url": "{{BASE}}/login", "extract": {"token": "json:$.token"}},
+            {"name": "me", "url": "{{BASE}}/me", "depends_on": ["login"],
+             "headers": {"Authorization": "Bearer {{token}}"}},
+        ]}, indent=2))
+
+        results = ModernScrolledText(win, height=10)
+        results.pack(fill="both", expand=True, padx=12, pady=(0,6))
+        state = {"job": None}
+
+        def show(text):
+            results.delete("1.0", tk.END)
+            results.insert(tk.END, text)
+
+        def parse():
+            try:
+                return Workflow.from_json(editor.get("1.0", tk.END), self.storage.get_saved_request)
+            except Exception as e:
+                show(f"Invalid workflow: {e}")
+                return None
+
+        def pick(name):
+            wf = saved.get(name)
+            if wf is not None:
+                editor.delete("1.0", tk.END)
+                editor.insert("1.0", wf.definition)
+
+        def save():
+            wf = parse()
+            if wf is None:
+                return
+            definition = editor.get("1.0", tk.END).strip()
+            existing = saved.get(wf.name)
+            if existing is not None:
+                self.storage.update_workflow(existing.id, definition_json=definition)
+            else:
+                self.storage.save_workflow(wf.name, definition)
+            saved.clear()
+            saved.update({w.name: w for w in self.storage.get_workflows()})
+            picker.configure(values=list(saved))
+            picker.set(wf.name)
+            show(f"Saved {wf.name!r}")
+
+        def on_done(job, summary, error):
+            state["job"] = None
+            if error is not None:
+                show(str(error))
+                return
+            lines = [f"{summary['name']}: {'OK' if summary['ok'] else 'FAILED'} in {summary['elapsed_ms']:.0f} ms"]
+            for r in summary["steps"]:
+                if r["skipped"]:
+                    lines.append(f"  -  {r['name']:<20} {r['error']}")
+                    continue
+                timing = f"+{r['start_ms']:.0f} ms, {r['duration_ms']:.0f} ms"
+                lines.append(f"  {'ok' if r['ok'] else '!!'} {r['name']:<20} {r['status'] or '-'}  {timing}  {r['error'] or ''}")
+                for var, value in r["extracted"].items():
+                    lines.append(f"       {var} = {value[:80]}")
+            show("\n".join(lines))
+
+        def run():
+            if state["job"] is not None:
+                return
+            wf = parse()
+            if wf is None:
+                return
+            env = self._current_interpolator()
+            runner = WorkflowRunner(self.requester, wf, variables=env.variables if env else None)
+            show("Running...")
+            state["job"] = self.executor.submit(
+                lambda job: runner.run(should_stop=lambda: job.cancelled),
+                callback=on_done,
+                tag="workflow"
+            )
+
+        def on_close():
+            if state["job"] is not None:
+                state["job"].cancel()
+            win.destroy()
+
+        picker.configure(command=pick)
+        ctk.CTkButton(top, text="Save", width=80, command=save).pack(side="left", padx=6)
+        ctk.CTkButton(top, text="Run", width=80, command=run,
+                      fg_color=COLORS["accent"], hover_color=COLORS["accent_hover"]).pack(side="left")
+        win.protocol("WM_DELETE_WINDOW", on_close)
+
+    def _open_trends(self):
+        """Per-endpoint latency percentiles over time, read from the rollup table."""
+        win = ctk.CTkToplevel(self)
+        win.title("Trends")
+        win.geometry("820x480")
+        ranges = {"Last hour": (timedelta(hours=1), 1), "Last 24 hours": (timedelta(days=1), 15),
+                  "Last 7 days": (timedelta(days=7), 60), "Last 30 days": (timedelta(days=30), 360)}
+
+        top = ctk.CTkFrame(win, fg_color="transparent")
+        top.pack(fill="x", padx=12, pady=(12,6))
+        endpoint_cb = ctk.CTkComboBox(top, values=["(loading)"], width=420)
+        endpoint_cb.pack(side="left")
+        range_cb = ctk.CTkComboBox(top, values=list(ranges), width=150)
+        range_cb.set("Last 7 days")
+        range_cb.pack(side="left", padx=8)
+        summary = ctk.CTkLabel(win, text="", anchor="w", font=("Consolas", 12))
+        summary.pack(fill="x", padx=12)
+        chart = TrendChart(win)
+        chart.pack(fill="both", expand=True, padx=12, pady=(6,12))
+
+        def query(job, endpoint, label):
+            span, bucket = ranges[label]
+            since = datetime.utcnow() - span
+            return (self.storage.get_endpoint_summary(endpoint, since=since),
+                    self.storage.get_endpoint_trend(endpoint, since=since, bucket_minutes=bucket))
+
+        def on_trend(job, result, error):
+            if not win.winfo_exists():
+                return
+            if error is not None:
+                summary.configure(text=str(error))
+                return
+            stats, points = result
+            summary.configure(text=f"{stats['count']} requests  p50 {stats['p50_ms']:.0f} ms  "
+                                   f"p95 {stats['p95_ms']:.0f} ms  p99 {stats['p99_ms']:.0f} ms  "
+                                   f"errors {stats['error_rate'] * 100:.1f}%")
+            chart.set_points(points)
+
+        def refresh(*_):
+            endpoint = endpoint_cb.get()
+            if endpoint and not endpoint.startswith("("):
+                self.executor.submit(query, endpoint, range_cb.get(), callback=on_trend, tag="trend")
+
+        def on_endpoints(job, endpoints, error):
+            if not win.winfo_exists():
+                return
+            names = [e for e, _ in endpoints or []] or ["(no timed history yet)"]
+            endpoint_cb.configure(values=names)
+            endpoint_cb.set(names[0])
+            refresh()
+
+        endpoint_cb.configure(command=refresh)
+        range_cb.configure(command=refresh)
+        self.executor.submit(lambda job: self.storage.get_endpoints(since=datetime.utcnow() - timedelta(days=30)),
+                             callback=on_endpoints, tag="trend")
+
     def _add_header(self):
         # Create a popup for adding a header
         popup = ctk.CTkToplevel(self)
@@ -857,15 +1536,10 @@ class App(ctk.CTk):
         # Force refresh for proper color updates
         self.update_idletasks()
     
-    def _refresh_sidebar(self):
-        # Clear and rebuild sidebar
-        for widget in self.sidebar.winfo_children():
-            widget.destroy()
-        self._build_sidebar()
-    
     def _setup_keyboard_shortcuts(self):
         self.bind("<Control-Return>", lambda e: self._on_send())
         self.bind("<Control-s>", lambda e: self._save_current_request())
+        self.bind("<Control-k>", lambda e: self.search_entry.focus_set())
     
     def _on_method_change(self, method: str):
         """Handle UI changes when the HTTP method changes.
@@ -899,6 +1573,7 @@ class App(ctk.CTk):
             pass
         
     def _on_send(self):
+        prepare_started = time.perf_counter()
         url = self.url_var.get().strip()
         if not url:
             self._show_response("No URL provided", status="Error")
@@ -915,76 +1590,223 @@ class App(ctk.CTk):
             return
 
         body = self._apply_environment_to_string(self.body_text.get("1.0", tk.END).strip() or None)
+        try:
+            # compiled once per distinct text; evaluated in the worker
+            assertions = compile_assertions(self.assertions_text.get("1.0", tk.END).strip())
+        except AssertionDefinitionError as e:
+            self._show_response(f"Invalid assertions: {e}", status="Error")
+            return
+        timings = RequestTimings()
+        timings.add("prepare", time.perf_counter() - prepare_started)
         
-        self.send_btn.configure(state="disabled")
         # start spinner if available
         try:
             self.loading_spinner.start()
         except Exception:
             pass
         self._show_response("Sending request...", status="Sending")
-        self.update_idletasks()
         
-        try:
-            start_time = datetime.now()
-            resp = self.requester.send(
-                method=method,
-                url=url,
-                headers=headers,
-                data=body
-            )
-            end_time = datetime.now()
-            duration = (end_time - start_time).total_seconds()
-            
-            try:
-                pretty = json.dumps(resp.json(), indent=2)
-            except Exception:
-                pretty = resp.text
-                
-            # Prepare response headers
+        self._latest_job = self.executor.submit(
+            self._perform_send,
+            method,
+            url,
+            headers,
+            body,
+            assertions,
+            timings,
+            callback=self._on_send_done,
+            tag="send",
+            on_discard=self._discard_send_result
+        )
+        self.cancel_btn.configure(state="normal")
+
+    def _perform_send(self, job, method, url, headers, body, assertions=None, timings=None):
+        """Worker-thread half of a send: network I/O and formatting only, no widgets."""
+        timings = timings or RequestTimings()
+        resp = self.requester.send(
+            method=method,
+            url=url,
+            headers=headers,
+            data=body,
+            stream=True,
+            timings=timings
+        )
+        # Large bodies are spooled to a temp file instead of held in memory
+        download_started = time.perf_counter()
+        spooled = read_body(resp, should_stop=lambda: job.cancelled)
+        process_started = time.perf_counter()
+        timings.add("download", process_started - download_started)
+        if spooled is None:
+            return None
+
+        checks = None
+        if assertions is not None:
+            elapsed = timings.total - timings.phases["prepare"]
+            ctx = ResponseContext(resp.status_code, resp.headers, elapsed, spooled.getvalue, spooled.encoding,
+                                  body_size=spooled.size)
+            checks = assertions.evaluate(ctx)
+        
+        if spooled.in_memory:
+            text = spooled.text()
             try:
-                headers_pretty = json.dumps(dict(resp.headers), indent=2)
+                pretty = json.dumps(json.loads(text), indent=2)
+                is_json = True
             except Exception:
-                headers_pretty = str(resp.headers)
-            status = f"{resp.status_code} {resp.reason}"
-            
-            # Switch to response tab
-            self.tabs.set("Response")
+                pretty = text
+                is_json = False
+            history_body = pretty
+        else:
+            # too big to pretty-print; the viewer streams it from the spool file
+            pretty = None
+            is_json = "json" in spooled.content_type.lower()
+            history_body = spooled.head(HISTORY_BODY_LIMIT).decode(spooled.encoding, errors="replace")
             
-            self._show_response(
-                pretty,
-                status=status,
-                duration=duration
-            )
+        # Prepare response headers
+        try:
+            headers_pretty = json.dumps(dict(resp.headers), indent=2)
+        except Exception:
+            headers_pretty = str(resp.headers)
+        timings.add("process", time.perf_counter() - process_started)
+        return {
+            "method": method,
+            "url": url,
+            "headers": headers,
+            "body": body,
+            "status_code": resp.status_code,
+            "status": f"{resp.status_code} {resp.reason}",
+            "cache_status": getattr(resp, "cache_status", None),
+            "duration": timings.total,
+            "timings": timings,
+            "size": spooled.size,
+            "pretty": pretty,
+            "is_json": is_json,
+            "history_body": history_body,
+            "spool": spooled,
+            "headers_pretty": headers_pretty,
+            "assertions": checks,
+        }
 
-            # Populate headers tab
-            try:
-                self.resp_headers_text.delete("1.0", tk.END)
-                self.resp_headers_text.insert(tk.END, headers_pretty)
-            except Exception:
-                pass
+    def _discard_send_result(self, result):
+        spool = result.get("spool") if isinstance(result, dict) else None
+        if spool is not None:
+            spool.close()
+
+    def _on_send_done(self, job, result, error):
+        """UI-thread half of a send, called from the executor queue."""
+        is_latest = job is self._latest_job
+        if error is not None:
+            if is_latest:
+                self._show_response(str(error), status="Error")
+        else:
+            if is_latest:
+                # Switch to response tab
+                self.tabs.set("Response")
+                
+                self._set_current_body(result["spool"])
+                if result["cache_status"] not in (None, "miss"):
+                    result["status"] = f"{result['status']} ({result['cache_status']})"
+                if result["pretty"] is not None:
+                    self._show_response(
+                        result["pretty"],
+                        status=result["status"],
+                        duration=result["duration"],
+                        highlight=result["is_json"]
+                    )
+                else:
+                    self._show_spooled_response(
+                        result["spool"],
+                        status=result["status"],
+                        duration=result["duration"],
+                        highlight=result["is_json"]
+                    )
+                # Populate headers tab
+                try:
+                    self.resp_headers_text.delete("1.0", tk.END)
+                    self.resp_headers_text.insert(tk.END, result["headers_pretty"])
+                except Exception:
+                    pass
+                self._show_assertion_results(result["assertions"])
+                self.resp_waterfall.set_timings(result["timings"])
+                self._update_cache_stats()
+            else:
+                result["spool"].close()
             
-            # Add to history and refresh sidebar
-            self.storage.add_to_history(
-                method=method,
-                url=url,
-                headers=json.dumps(headers),
-                body=body,
-                response_code=resp.status_code,
-                response_body=pretty
+            # Written by the storage writer thread; the sidebar updates from its event
+            self.storage.queue_history(
+                method=result["method"],
+                url=result["url"],
+                headers=json.dumps(result["headers"]),
+                body=result["body"],
+                response_code=result["status_code"],
+                response_body=result["history_body"],
+                timings=json.dumps(result["timings"].as_dict()),
+                duration_ms=result["duration"] * 1000,
+                response_size=result["size"],
+                # answered locally: keep it out of the endpoint's latency trends
+                rollup=result["cache_status"] not in ("hit", "stale")
             )
-            self._refresh_sidebar()
-            
-        except Exception as e:
-            self._show_response(str(e), status="Error")
-        finally:
-            self.send_btn.configure(state="normal")
+        self._update_inflight_state()
+
+    def _update_cache_stats(self):
+        if self.requester.cache is None:
+            return
+        stats = self.requester.cache.stats()
+        served = stats["hit"] + stats["revalidated"] + stats["stale"]
+        self.cache_label.configure(
+            text=f"Cache: {served} hit / {stats['miss']} miss ({stats['hit_rate']:.0%})"
+        )
+
+    def _show_assertion_results(self, checks):
+        self.resp_tests_text.delete("1.0", tk.END)
+        if not checks:
+            self.resp_tests_text.insert(tk.END, "No assertions")
+            return
+        failed = sum(1 for _, msg in checks if msg is not None)
+        self.resp_tests_text.insert(tk.END, f"{len(checks) - failed}/{len(checks)} passed\n\n")
+        for desc, msg in checks:
+            self.resp_tests_text.insert(tk.END, f"PASS  {desc}\n" if msg is None else f"FAIL  {desc}: {msg}\n")
+        self.status_label.configure(text=f"{self.status_label.cget('text')}  ({len(checks) - failed}/{len(checks)} tests)")
+
+    def _cancel_requests(self):
+        self.executor.cancel_all(tag="send")
+        self._latest_job = None
+        self._show_response("Request cancelled", status="Cancelled")
+        self._update_inflight_state()
+
+    def _update_inflight_state(self):
+        busy = any(not j.cancelled for j in self.executor.active_jobs(tag="send"))
+        self.cancel_btn.configure(state="normal" if busy else "disabled")
+        if not busy:
             try:
                 self.loading_spinner.stop()
             except Exception:
                 pass
+
+    def _drain_results(self):
+        try:
+            self.executor.poll()
+            for _ in range(100):
+                try:
+                    event = self._storage_events.get_nowait()
+                except queue.Empty:
+                    break
+                self._on_storage_event(*event)
+        finally:
+            self._drain_job = self.after(30, self._drain_results)
+
+    def _on_close(self):
+        try:
+            self.after_cancel(self._drain_job)
+        except Exception:
+            pass
+        self.executor.shutdown(wait=False)
+        self.executor.poll(max_items=1000)
+        self._set_current_body(None)
+        if self._storage is not None:
+            self._storage.close()
+        self.destroy()
     
-    def _show_response(self, body, status="-", duration=None):
+    def _show_response(self, body, status="-", duration=None, highlight=False):
         self.status_label.configure(
             text=f"Status: {status}",
             text_color=COLORS["success"] if "2" in status else COLORS["text_dark"]
@@ -996,8 +1818,99 @@ class App(ctk.CTk):
             self.resp_inner_tabs.set("Body")
         except Exception:
             pass
+        self._stream_into_viewer(
+            (body[i:i + CHUNK_SIZE] for i in range(0, len(body), CHUNK_SIZE)),
+            on_done=(lambda: self.resp_highlighter.highlight(body)) if highlight else None
+        )
+
+    def _show_spooled_response(self, spool, status="-", duration=None, highlight=False):
+        """Show a spooled body in the virtualized viewer once its line index is built."""
+        self._show_response("", status=status, duration=duration)
+        self.resp_viewer.highlight = highlight
+        self.resp_text.pack_forget()
+        self.resp_viewer.pack(fill="both", expand=True, padx=4, pady=4)
+        self.resp_viewer.show_message(f"Indexing {spool.size / 1048576:.1f} MB response...")
+
+        def build(job):
+            index = LineIndex(spool.path, encoding=spool.encoding)
+            if not index.build(should_stop=lambda: job.cancelled):
+                index.close()
+                return None
+            return index
+
+        def done(job, index, error):
+            if spool is not self._current_body:
+                if index is not None:
+                    index.close()
+                return
+            if error is not None:
+                self.resp_viewer.show_message(f"Could not index response: {error}")
+            elif index is not None:
+                self.resp_viewer.set_index(index)
+
+        self._index_job = self.executor.submit(build, callback=done, tag="index", on_discard=lambda index: index.close())
+
+    def _show_text_viewer(self):
+        """Swap the virtualized viewer back out for the plain textbox."""
+        if self._index_job is not None:
+            self._index_job.cancel()
+            self._index_job = None
+        if self.resp_viewer.index is not None:
+            self.resp_viewer.index.close()
+            self.resp_viewer.clear()
+        if self.resp_viewer.winfo_manager():
+            self.resp_viewer.pack_forget()
+            self.resp_text.pack(fill="both", expand=True, padx=4, pady=4)
+
+    def _goto_line(self, event=None):
+        try:
+            lineno = int(self.goto_var.get().strip())
+        except ValueError:
+            return
+        if self.resp_viewer.index is not None:
+            self.resp_viewer.goto_line(lineno)
+        else:
+            self.resp_text.see(f"{lineno}.0")
+
+    def _stream_into_viewer(self, chunks, on_done=None):
+        """Insert text chunks into resp_text a frame at a time so input stays responsive."""
+        self.resp_highlighter.cancel()
+        if self._insert_job is not None:
+            try:
+                self.after_cancel(self._insert_job)
+            except Exception:
+                pass
+            self._insert_job = None
+        self._show_text_viewer()
         self.resp_text.delete("1.0", tk.END)
-        self.resp_text.insert(tk.END, body)
+        chunks = iter(chunks)
+
+        def step():
+            started = time.perf_counter()
+            for chunk in chunks:
+                self.resp_text.insert(tk.END, chunk)
+                if time.perf_counter() - started > INSERT_BUDGET:
+                    self._insert_job = self.after(1, step)
+                    return
+            self._insert_job = None
+            if on_done is not None:
+                on_done()
+
+        step()
+
+    def _set_current_body(self, spool):
+        if self._current_body is not None and self._current_body is not spool:
+            # release the mmap before the spool file is removed
+            self._show_text_viewer()
+            self._current_body.close()
+        self._current_body = spool
+
+    def _save_full_body(self):
+        if self._current_body is None:
+            return
+        path = filedialog.asksaveasfilename(title="Save response body")
+        if path:
+            self._current_body.save_to(path)
     
     def _save_current_request(self, event=None):
         collections = self.storage.get_collections()
@@ -1018,9 +1931,9 @@ class App(ctk.CTk):
                 method=self.method_cb.get(),
                 url=self.url_var.get(),
                 headers=self.headers_text.get("1.0", tk.END).strip(),
-                body=self.body_text.get("1.0", tk.END).strip()
+                body=self.body_text.get("1.0", tk.END).strip(),
+                assertions=self.assertions_text.get("1.0", tk.END).strip() or None
             )
-            self._refresh_sidebar()
 
 if __name__ == '__main__':
     app = App()
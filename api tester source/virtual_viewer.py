@@ -0,0 +1,198 @@
+import codecs
+import mmap
+import tkinter as tk
+from array import array
+import customtkinter as ctk
+from highlighter import configure_tags, tag_lines
+
+
+class LineIndex:
+    """Random access to the lines of a (possibly huge) file through mmap.
+
+    Only every ``stride``-th line start is stored, so the index costs
+    8 bytes per ``stride`` lines; other lines are found by scanning forward
+    from the nearest stored offset. Lines longer than ``max_line`` bytes
+    (minified JSON, say) are split into several virtual lines so a single
+    line never has to be rendered whole; in UTF-8 the split is moved back
+    to a character boundary.
+    """
+
+    def __init__(self, path, stride=64, max_line=4096, encoding='utf-8'):
+        self.path = path
+        self.stride = stride
+        self.max_line = max_line
+        self.encoding = encoding
+        self._utf8 = codecs.lookup(encoding).name == 'utf-8'
+        self.offsets = array('Q')
+        self.line_count = 0
+        self._file = open(path, 'rb')
+        self.size = self._file.seek(0, 2)
+        self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if self.size else None
+
+    def _next_start(self, pos):
+        """Offset of the virtual line following the one starting at ``pos``."""
+        limit = min(pos + self.max_line, self.size)
+        nl = self._mm.find(b'\n', pos, limit)
+        if nl != -1:
+            return nl + 1
+        if self._utf8 and limit < self.size:
+            # don't cut a multi-byte character: back up over continuation bytes (at most 3)
+            split = limit
+            while split > pos + 1 and limit - split < 3 and self._mm[split] & 0xC0 == 0x80:
+                split -= 1
+            if self._mm[split] & 0xC0 != 0x80:
+                return split
+        return limit
+
+    def build(self, should_stop=None):
+        """Scan the file once. Returns False if ``should_stop()`` interrupted it."""
+        self.offsets = array('Q')
+        count = 0
+        pos = 0
+        while pos < self.size:
+            if count % self.stride == 0:
+                self.offsets.append(pos)
+                if should_stop is not None and count % (self.stride * 1024) == 0 and should_stop():
+                    return False
+            pos = self._next_start(pos)
+            count += 1
+        self.line_count = count
+        return True
+
+    def _line_start(self, lineno):
+        pos = self.offsets[lineno // self.stride]
+        for _ in range(lineno % self.stride):
+            pos = self._next_start(pos)
+        return pos
+
+    def lines(self, start, end):
+        """Decoded lines ``start`` (inclusive) to ``end`` (exclusive), without newlines."""
+        start = max(0, start)
+        end = min(end, self.line_count)
+        if start >= end:
+            return []
+        out = []
+        pos = self._line_start(start)
+        for _ in range(start, end):
+            nxt = self._next_start(pos)
+            out.append(self._mm[pos:nxt].rstrip(b'\r\n').decode(self.encoding, errors='replace'))
+            pos = nxt
+        return out
+
+    def line(self, lineno):
+        found = self.lines(lineno, lineno + 1)
+        return found[0] if found else ''
+
+    def close(self):
+        if self._mm is not None:
+            self._mm.close()
+            self._mm = None
+        self._file.close()
+
+
+class VirtualTextView(ctk.CTkFrame):
+    """Read-only viewer that renders only the visible lines of a LineIndex.
+
+    The Tk text widget holds the visible lines plus ``margin`` lines above
+    and below; small scrolls move within that window and larger jumps
+    re-render it, so memory and redraw cost do not grow with the file.
+    With ``highlight`` set, only the rendered window is JSON-highlighted.
+    """
+
+    def __init__(self, *args, margin=100, font=("Consolas", 12), highlight=False, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.margin = margin
+        self.highlight = highlight
+        self.index = None
+        self.top = 0
+        self._window_start = 0
+        self._window_end = 0
+        self.grid_columnconfigure(0, weight=1)
+        self.grid_rowconfigure(0, weight=1)
+        self.text = tk.Text(self, wrap="none", font=font, borderwidth=0, highlightthickness=0,
+                            bg="#09090B", fg="#FAFAFA", insertbackground="#FAFAFA")
+        self.text.grid(row=0, column=0, sticky="nsew")
+        self.vbar = ctk.CTkScrollbar(self, command=self._on_scrollbar)
+        self.vbar.grid(row=0, column=1, sticky="ns")
+        self.hbar = ctk.CTkScrollbar(self, orientation="horizontal", command=self.text.xview)
+        self.hbar.grid(row=1, column=0, sticky="ew")
+        self.text.configure(xscrollcommand=self.hbar.set, state="disabled")
+        configure_tags(self.text)
+        self.text.bind("<MouseWheel>", self._on_wheel)
+        self.text.bind("<Button-4>", lambda e: self.scroll_lines(-3) or "break")
+        self.text.bind("<Button-5>", lambda e: self.scroll_lines(3) or "break")
+        self.text.bind("<Prior>", lambda e: self.scroll_lines(-self.visible_lines()) or "break")
+        self.text.bind("<Next>", lambda e: self.scroll_lines(self.visible_lines()) or "break")
+        self.text.bind("<Configure>", lambda e: self._render())
+
+    def set_index(self, index):
+        self.index = index
+        self.top = 0
+        self._window_start = self._window_end = 0
+        self._render(force=True)
+
+    def show_message(self, message):
+        self.index = None
+        self._set_text(message)
+        self.vbar.set(0, 1)
+
+    def clear(self):
+        self.show_message("")
+
+    def visible_lines(self):
+        height = self.text.winfo_height()
+        linespace = max(1, self.text.tk.call("font", "metrics", self.text.cget("font"), "-linespace"))
+        return max(1, height // linespace)
+
+    def goto_line(self, lineno):
+        """Scroll so that 1-based ``lineno`` is the first visible line."""
+        if self.index is None:
+            return
+        self.top = max(0, min(int(lineno) - 1, self.index.line_count - 1))
+        self._render()
+
+    def scroll_lines(self, delta):
+        if self.index is None:
+            return
+        self.top += delta
+        self._render()
+
+    def _on_wheel(self, event):
+        self.scroll_lines(-3 if event.delta > 0 else 3)
+        return "break"
+
+    def _on_scrollbar(self, *args):
+        if self.index is None:
+            return
+        if args[0] == "moveto":
+            self.top = int(float(args[1]) * self.index.line_count)
+        elif args[0] == "scroll":
+            step = self.visible_lines() if args[2] == "pages" else 1
+            self.top += int(args[1]) * step
+        self._render()
+
+    def _set_text(self, text):
+        self.text.configure(state="normal")
+        self.text.delete("1.0", tk.END)
+        self.text.insert("1.0", text)
+        self.text.configure(state="disabled")
+
+    def _render(self, force=False):
+        if self.index is None:
+            return
+        total = self.index.line_count
+        visible = self.visible_lines()
+        self.top = max(0, min(self.top, max(0, total - visible)))
+        bottom = self.top + visible
+        if force or self.top < self._window_start or bottom > self._window_end:
+            self._window_start = max(0, self.top - self.margin)
+            self._window_end = min(total, bottom + self.margin)
+            lines = self.index.lines(self._window_start, self._window_end)
+            self._set_text("\n".join(lines))
+            if self.highlight:
+                tag_lines(self.text, lines, 1)
+        self.text.yview(f"{self.top - self._window_start + 1}.0")
+        if total:
+            self.vbar.set(self.top / total, min(1.0, bottom / total))
+        else:
+            self.vbar.set(0, 1)
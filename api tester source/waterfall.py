@@ -0,0 +1,114 @@
+import tkinter as tk
+import customtkinter as ctk
+from timing import PHASE_LABELS
+
+PHASE_COLORS = {
+    "prepare": "#71717A",
+    "dns": "#22D3EE",
+    "connect": "#F59E0B",
+    "tls": "#A855F7",
+    "ttfb": "#22C55E",
+    "download": "#3B82F6",
+    "process": "#71717A",
+}
+
+
+class WaterfallView(ctk.CTkFrame):
+    """Horizontal bar per timing phase, offset by when the phase started.
+
+    Bars share one time axis (the request total), so a long green
+    "Waiting" bar means the server was slow while long DNS/connect/TLS bars
+    point at the network.
+    """
+
+    ROW_HEIGHT = 26
+    LABEL_WIDTH = 120
+    VALUE_WIDTH = 90
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.timings = None
+        self.canvas = tk.Canvas(self, bg="#09090B", highlightthickness=0, borderwidth=0)
+        self.canvas.pack(fill="both", expand=True)
+        self.canvas.bind("<Configure>", lambda e: self._draw())
+
+    def set_timings(self, timings):
+        self.timings = timings
+        self._draw()
+
+    def _draw(self):
+        c = self.canvas
+        c.delete("all")
+        if self.timings is None:
+            c.create_text(12, 14, text="No timing data", anchor="w", fill="#A1A1AA", font=("Segoe UI", 11))
+            return
+        rows = self.timings.waterfall()
+        total = sum(ms for _, _, ms in rows) or 1.0
+        width = max(c.winfo_width(), 300)
+        bar_left = self.LABEL_WIDTH
+        bar_width = max(40, width - self.LABEL_WIDTH - self.VALUE_WIDTH - 12)
+        for i, (phase, start, ms) in enumerate(rows):
+            y = 8 + i * self.ROW_HEIGHT
+            x0 = bar_left + bar_width * start / total
+            x1 = max(x0 + 2, bar_left + bar_width * (start + ms) / total)
+            c.create_text(12, y + 9, text=PHASE_LABELS[phase], anchor="w", fill="#FAFAFA", font=("Segoe UI", 11))
+            c.create_rectangle(x0, y + 2, x1, y + 16, fill=PHASE_COLORS[phase], width=0)
+            c.create_text(bar_left + bar_width + 8, y + 9, text=f"{ms:.1f} ms", anchor="w",
+                          fill="#A1A1AA", font=("Consolas", 11))
+        y = 8 + len(rows) * self.ROW_HEIGHT + 6
+        note = "reused connection" if self.timings.reused else "new connection"
+        c.create_text(12, y, text=f"Total {self.timings.total * 1000:.1f} ms ({note})", anchor="w",
+                      fill="#A1A1AA", font=("Segoe UI", 11))
+
+
+TREND_SERIES = (("p50_ms", "p50", "#22C55E"), ("p95_ms", "p95", "#F59E0B"), ("p99_ms", "p99", "#EF4444"))
+
+
+class TrendChart(ctk.CTkFrame):
+    """Line chart of latency percentiles from Storage.get_endpoint_trend points."""
+
+    PAD = 48
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.points = []
+        self.canvas = tk.Canvas(self, bg="#09090B", highlightthickness=0, borderwidth=0)
+        self.canvas.pack(fill="both", expand=True)
+        self.canvas.bind("<Configure>", lambda e: self._draw())
+
+    def set_points(self, points):
+        self.points = points
+        self._draw()
+
+    def _draw(self):
+        c = self.canvas
+        c.delete("all")
+        if not self.points:
+            c.create_text(12, 14, text="No data in this range", anchor="w", fill="#A1A1AA", font=("Segoe UI", 11))
+            return
+        width, height = max(c.winfo_width(), 200), max(c.winfo_height(), 120)
+        left, top, right, bottom = self.PAD, 16, width - 16, height - 28
+        t0 = self.points[0]["start"].timestamp()
+        span = max(self.points[-1]["start"].timestamp() - t0, 1)
+        peak = max(p["p99_ms"] for p in self.points) or 1
+
+        def xy(p, key):
+            x = left + (right - left) * (p["start"].timestamp() - t0) / span
+            return x, bottom - (bottom - top) * p[key] / peak
+
+        c.create_line(left, bottom, right, bottom, fill="#3F3F46")
+        c.create_line(left, top, left, bottom, fill="#3F3F46")
+        c.create_text(left - 6, top, text=f"{peak:.0f} ms", anchor="e", fill="#A1A1AA", font=("Consolas", 10))
+        c.create_text(left - 6, bottom, text="0", anchor="e", fill="#A1A1AA", font=("Consolas", 10))
+        c.create_text(left, bottom + 14, text=self.points[0]["start"].strftime("%m-%d %H:%M"), anchor="w",
+                      fill="#A1A1AA", font=("Consolas", 10))
+        c.create_text(right, bottom + 14, text=self.points[-1]["start"].strftime("%m-%d %H:%M"), anchor="e",
+                      fill="#A1A1AA", font=("Consolas", 10))
+        for i, (key, label, color) in enumerate(TREND_SERIES):
+            coords = [v for p in self.points for v in xy(p, key)]
+            if len(coords) >= 4:
+                c.create_line(*coords, fill=color, width=2)
+            else:
+                x, y = coords
+                c.create_oval(x - 3, y - 3, x + 3, y + 3, fill=color, width=0)
+            c.create_text(right - 150 + i * 50, top, text=label, anchor="w", fill=color, font=("Segoe UI", 10))
@@ -0,0 +1,339 @@
+"""Request-chaining workflows run as a dependency graph.
+
+A workflow is a list of steps. Each step is a request that may depend on
+other steps and extract values from its response into variables for the
+steps after it::
+
+    {"name": "checkout", "steps": [
+        {"name": "login", "method": "POST", "url": "{{BASE}}/login", "body": "...",
+         "extract": {"token": "json:$.token"}},
+        {"name": "cart", "url": "{{BASE}}/cart", "depends_on": ["login"],
+         "headers": {"Authorization": "Bearer {{token}}"}},
+        {"name": "profile", "request": 12, "depends_on": ["login"]}
+    ]}
+
+Extractors are ``json:<JSONPath>``, ``header:<Name>``, ``regex:<pattern>``
+(first group, or the whole match) and ``status``. A step may also list
+``assertions`` (see assertions.py); a failing check fails the step. Steps whose
+dependencies have all finished run concurrently, so the run takes about as
+long as the critical path. A step sees the variables extracted by its own
+(transitive) dependencies only, never those of a parallel branch; if a
+dependency fails, the step is skipped.
+"""
+import argparse
+import json
+import re
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from assertions import ResponseContext, compile_assertions, status_ok
+from environment import Interpolator, parse_headers, variable_text
+from jsonpath import compile_path
+
+
+class WorkflowError(ValueError):
+    pass
+
+
+class Extractor:
+    SOURCES = ('json', 'header', 'regex', 'status')
+
+    def __init__(self, var, source, expr=None):
+        if source not in self.SOURCES:
+            raise WorkflowError(f"unknown extractor source {source!r} for {var!r}")
+        self.var = var
+        self.source = source
+        self.expr = expr
+        self._path = compile_path(expr) if source == 'json' else None
+        self._regex = re.compile(expr) if source == 'regex' else None
+
+    @classmethod
+    def parse(cls, var, spec):
+        """Build from ``"source:expr"`` (e.g. ``"json:$.data.id"``)."""
+        source, _, expr = spec.partition(':')
+        return cls(var, source.strip(), expr.strip() or None)
+
+    def __str__(self):
+        return f"{self.source}:{self.expr}" if self.expr else self.source
+
+    def extract(self, resp, parsed):
+        """Value from ``resp`` or None; ``parsed()`` returns the decoded JSON body."""
+        if self.source == 'status':
+            return resp.status_code
+        if self.source == 'header':
+            return resp.headers.get(self.expr)
+        if self.source == 'json':
+            return self._path.first(parsed())
+        m = self._regex.search(resp.text)
+        if not m:
+            return None
+        return m.group(1) if m.groups() else m.group(0)
+
+
+class Step:
+    def __init__(self, name, method='GET', url='', headers=None, body=None, depends_on=(), extract=None,
+                 assertions=None):
+        self.name = name
+        self.method = (method or 'GET').upper()
+        self.url = url or ''
+        self.headers = headers
+        self.body = body
+        self.depends_on = list(depends_on or [])
+        self.extract = [e if isinstance(e, Extractor) else Extractor.parse(var, e)
+                        for var, e in (extract or {}).items()]
+        self.assertion_definitions = assertions
+        self.assertions = compile_assertions(assertions)
+
+    @classmethod
+    def from_dict(cls, data, resolve_request=None):
+        """``data['request']`` names a SavedRequest id, looked up with ``resolve_request``."""
+        fields = dict(method=data.get('method'), url=data.get('url'), headers=data.get('headers'), body=data.get('body'),
+                      assertions=data.get('assertions'))
+        if data.get('request') is not None:
+            saved = resolve_request(data['request']) if resolve_request else None
+            if saved is None:
+                raise WorkflowError(f"step {data.get('name')!r}: saved request {data['request']!r} not found")
+            for key in fields:
+                if fields[key] is None:
+                    fields[key] = getattr(saved, key)
+        name = data.get('name') or fields['url']
+        return cls(name, depends_on=data.get('depends_on'), extract=data.get('extract'), **fields)
+
+    def to_dict(self):
+        return {'name': self.name, 'method': self.method, 'url': self.url, 'headers': self.headers,
+                'body': self.body, 'depends_on': self.depends_on,
+                'extract': {e.var: str(e) for e in self.extract}, 'assertions': self.assertion_definitions}
+
+
+class Workflow:
+    def __init__(self, name, steps):
+        self.name = name
+        self.steps = {}
+        for step in steps:
+            if step.name in self.steps:
+                raise WorkflowError(f"duplicate step name {step.name!r}")
+            self.steps[step.name] = step
+        for step in steps:
+            for dep in step.depends_on:
+                if dep not in self.steps:
+                    raise WorkflowError(f"step {step.name!r} depends on unknown step {dep!r}")
+        self.order = self._topological_order()
+        # transitive dependencies, used to scope extracted variables
+        self.ancestors = {}
+        for name in self.order:
+            anc = set()
+            for dep in self.steps[name].depends_on:
+                anc.add(dep)
+                anc |= self.ancestors[dep]
+            self.ancestors[name] = anc
+
+    def _topological_order(self):
+        remaining = {name: set(step.depends_on) for name, step in self.steps.items()}
+        order = []
+        ready = [name for name, deps in remaining.items() if not deps]
+        while ready:
+            name = ready.pop(0)
+            order.append(name)
+            del remaining[name]
+            for other, deps in remaining.items():
+                if name in deps:
+                    deps.discard(name)
+                    if not deps and other not in ready:
+                        ready.append(other)
+        if remaining:
+            raise WorkflowError(f"dependency cycle between steps: {', '.join(sorted(remaining))}")
+        return order
+
+    @classmethod
+    def from_dict(cls, data, resolve_request=None):
+        steps = [Step.from_dict(s, resolve_request) for s in data.get('steps') or []]
+        return cls(data.get('name') or 'workflow', steps)
+
+    @classmethod
+    def from_json(cls, text, resolve_request=None):
+        return cls.from_dict(json.loads(text), resolve_request)
+
+    def to_dict(self):
+        return {'name': self.name, 'steps': [self.steps[n].to_dict() for n in self.order]}
+
+
+class WorkflowRunner:
+    def __init__(self, requester, workflow, variables=None, workers=8, timeout=30):
+        self.requester = requester
+        self.workflow = workflow
+        self.variables = dict(variables or {})
+        self.workers = max(1, int(workers))
+        self.timeout = timeout
+
+    def _step_variables(self, name, extracted):
+        merged = dict(self.variables)
+        ancestors = self.workflow.ancestors[name]
+        for other in self.workflow.order:
+            if other in ancestors and other in extracted:
+                merged.update(extracted[other])
+        return merged
+
+    def _run_step(self, step, variables, started_at):
+        env = Interpolator(variables)
+        headers = step.headers if isinstance(step.headers, str) else json.dumps(step.headers or {})
+        url = env.render(step.url)
+        result = {'name': step.name, 'method': step.method, 'url': url, 'status': None, 'ok': False,
+                  'error': None, 'skipped': False, 'extracted': {},
+                  'start_ms': round((time.perf_counter() - started_at) * 1000, 2)}
+        t0 = time.perf_counter()
+        try:
+            resp = self.requester.send(step.method, url, headers=parse_headers(env.render(headers)),
+                                       data=env.render(step.body) or None, timeout=self.timeout)
+            result['status'] = resp.status_code
+            failures = []
+            if step.assertions is not None:
+                failures = step.assertions.failures(ResponseContext.from_response(resp, time.perf_counter() - t0))
+                result['assertions'] = failures
+            if not status_ok(step.assertions, resp.status_code):
+                result['error'] = f"HTTP {resp.status_code} {resp.reason}"
+            elif failures:
+                result['error'] = f"{len(failures)} assertion(s) failed: " + "; ".join(failures)
+            else:
+                body = []
+
+                def parsed():
+                    if not body:
+                        body.append(resp.json())
+                    return body[0]
+
+                for ex in step.extract:
+                    value = ex.extract(resp, parsed)
+                    if value is None:
+                        raise WorkflowError(f"extract {ex.var!r}: nothing matched {ex}")
+                    result['extracted'][ex.var] = variable_text(value)
+                result['ok'] = True
+        except Exception as e:
+            result['error'] = f"{type(e).__name__}: {e}"
+        result['duration_ms'] = round((time.perf_counter() - t0) * 1000, 2)
+        return result
+
+    @staticmethod
+    def _skipped(step, reason):
+        return {'name': step.name, 'method': step.method, 'url': step.url, 'status': None, 'ok': False,
+                'error': reason, 'skipped': True, 'extracted': {}, 'start_ms': None, 'duration_ms': 0.0}
+
+    def run(self, on_step=None, should_stop=None):
+        """Run every step; returns a summary with per-step results in graph order.
+
+        ``on_step`` is called (on this thread) as each step finishes or is skipped.
+        """
+        wf = self.workflow
+        started_at = time.perf_counter()
+        results = {}
+        extracted = {}
+        running = {}
+
+        def finish(result):
+            results[result['name']] = result
+            if result['ok']:
+                extracted[result['name']] = result['extracted']
+            if on_step:
+                on_step(result)
+
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            while len(results) < len(wf.steps):
+                stopping = should_stop is not None and should_stop()
+                for name in wf.order:
+                    if name in results or name in running:
+                        continue
+                    step = wf.steps[name]
+                    if stopping:
+                        if not running:
+                            finish(self._skipped(step, "stopped"))
+                        continue
+                    failed = [d for d in step.depends_on if d in results and not results[d]['ok']]
+                    if failed:
+                        finish(self._skipped(step, f"skipped: {', '.join(failed)} failed"))
+                    elif all(d in results for d in step.depends_on):
+                        fut = pool.submit(self._run_step, step, self._step_variables(name, extracted), started_at)
+                        running[fut] = name
+                if not running:
+                    continue
+                done, _ = wait(list(running), return_when=FIRST_COMPLETED)
+                for fut in done:
+                    del running[fut]
+                    finish(fut.result())
+
+        steps = [results[n] for n in wf.order]
+        return {
+            'name': wf.name,
+            'ok': all(r['ok'] for r in steps),
+            'elapsed_ms': round((time.perf_counter() - started_at) * 1000, 2),
+            'steps': steps,
+        }
+
+
+def build_parser(parser=None):
+    parser = parser or argparse.ArgumentParser(description="Run a request-chaining workflow.")
+    src = parser.add_mutually_exclusive_group(required=True)
+    src.add_argument('--file', help="workflow JSON file")
+    src.add_argument('--workflow', help="saved workflow name or id in the storage database")
+    parser.add_argument('--db', default='requests.db')
+    parser.add_argument('--env', help="environment name (from --env-file or the database)")
+    parser.add_argument('--env-file', help="JSON file produced by Storage.export_environments")
+    parser.add_argument('--var', action='append', default=[], help="KEY=VALUE override, repeatable")
+    parser.add_argument('-w', '--workers', type=int, default=8, help="max steps in flight")
+    parser.add_argument('--timeout', type=float, default=30)
+    parser.add_argument('--format', choices=['jsonl', 'junit'], default='jsonl')
+    parser.add_argument('-o', '--output', help="write results to a file instead of stdout")
+    return parser
+
+
+def run_from_args(args):
+    from runner import junit_xml, resolve_environment
+    from requester import Requester
+
+    storage = None
+    if args.workflow or (args.env and not args.env_file):
+        from storage_base import open_storage
+        storage = open_storage(args.db)
+    if args.file:
+        with open(args.file, 'r', encoding='utf-8') as f:
+            text = f.read()
+    else:
+        saved = next((w for w in storage.get_workflows() if str(w.id) == args.workflow or w.name == args.workflow), None)
+        if saved is None:
+            raise SystemExit(f"workflow {args.workflow!r} not found")
+        text = saved.definition
+    resolve = None
+    if storage is not None or '"request"' in text:
+        if storage is None:
+            from storage_base import open_storage
+            storage = open_storage(args.db)
+        resolve = storage.get_saved_request
+    try:
+        wf = Workflow.from_json(text, resolve)
+    except (ValueError, re.error) as e:
+        raise SystemExit(f"invalid workflow: {e}")
+
+    runner = WorkflowRunner(Requester(pool_maxsize=max(10, args.workers)), wf,
+                            variables=resolve_environment(args, storage),
+                            workers=args.workers, timeout=args.timeout)
+    out = open(args.output, 'w', encoding='utf-8') if args.output else sys.stdout
+    try:
+        on_step = None
+        if args.format == 'jsonl':
+            def on_step(res):
+                out.write(json.dumps(res) + '\n')
+                out.flush()
+        summary = runner.run(on_step=on_step)
+        if args.format == 'junit':
+            out.write(junit_xml(wf.name, summary['steps']) + '\n')
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    return summary
+
+
+def main(argv=None):
+    summary = run_from_args(build_parser().parse_args(argv))
+    return 0 if summary['ok'] else 1
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())